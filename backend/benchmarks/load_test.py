@@ -0,0 +1,72 @@
+"""
+Load test of a running api: requests from `concurrency` client threads, reporting latency percentiles and throughput.
+E.g. to compare a worker serving requests by a single thread with one multiplexing them by a pool of threads:
+
+    PYTHON_MAX_THREADS=1 gunicorn -c python:aerooffers.config.gunicorn aerooffers.api.flask_app:app
+    python benchmarks/load_test.py http://localhost:8080 --concurrency 16 --requests 2000
+    PYTHON_MAX_THREADS=8 gunicorn -c python:aerooffers.config.gunicorn aerooffers.api.flask_app:app
+    python benchmarks/load_test.py http://localhost:8080 --concurrency 16 --requests 2000
+
+Paths requested are a mix of what UI requests, with `OFFERS_CACHE_TTL=0` all of them are served from db.
+"""
+
+import argparse
+import itertools
+import statistics
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+PATHS = [
+    "/api/offers?limit=30",
+    "/api/offers?category=glider&limit=30",
+    "/api/offers?category=airplane&limit=30",
+    "/api/offers?category=ultralight&limit=30",
+    "/api/offers/Alexander Schleicher/ASK 21",
+    "/api/models",
+]
+
+
+def run(base_url: str, concurrency: int, requests_count: int) -> None:
+    paths = itertools.cycle(urllib.request.quote(path, safe="/?=&") for path in PATHS)
+    lock = threading.Lock()
+    latencies: list[float] = []
+    errors = 0
+
+    def request_once(_: int) -> None:
+        nonlocal errors
+        with lock:
+            path = next(paths)
+        started_at = time.perf_counter()
+        try:
+            with urllib.request.urlopen(base_url + path, timeout=60) as response:  # noqa: S310 - url given by user
+                response.read()
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        latencies.append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(request_once, range(requests_count)))
+    elapsed = time.perf_counter() - started_at
+
+    if len(latencies) < 2:
+        print(f"Not enough successful requests, {errors} errors")
+        return
+    percentiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{len(latencies)} requests ({errors} errors) in {elapsed:.1f}s, {len(latencies) / elapsed:.0f} req/s, "
+        f"p50={percentiles[49] * 1000:.1f}ms p90={percentiles[89] * 1000:.1f}ms p99={percentiles[98] * 1000:.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("base_url", help="e.g. http://localhost:8080")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+    run(args.base_url.rstrip("/"), args.concurrency, args.requests)
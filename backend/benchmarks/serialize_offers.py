@@ -0,0 +1,78 @@
+"""
+Micro-benchmark of serialization of a model details response (`/api/offers/<manufacturer>/<model>`) with 300 offers,
+Flask's default JSON provider (`dataclasses.asdict` of each offer) vs `aerooffers.api.serialization`.
+
+    PYTHONPATH=src python benchmarks/serialize_offers.py
+"""
+
+import timeit
+
+from aerooffers.api.flask_app import app
+from aerooffers.api.serialization import dumps, offer_json
+from aerooffers.offer import ModelSummary, Offer, OfferPrice
+
+OFFERS_COUNT = 300
+REPEATS = 200
+
+offers = [
+    Offer(
+        id=f"{i:064x}",
+        url=f"https://offers.com/{i}",
+        category="glider",
+        title=f"Schleicher ASK 21 D-{i:04d}, ready to fly",
+        published_at=f"2024-07-{i % 28 + 1:02d}",  # type: ignore[arg-type]  # as read from db
+        location="Hamburg, Germany",
+        hours=1200 + i,
+        starts=3000 + i,
+        price=OfferPrice(
+            amount="45000.00",
+            currency="EUR",
+            amount_in_euro="45000.00",
+            exchange_rate=1.0,
+        ),
+        manufacturer="Alexander Schleicher",
+        model="ASK 21",
+        spider="segelflug_de_kleinanzeigen",
+        price_history=[dict(amount_in_euro="47000.00", changed_at="2024-06-01")],
+    )
+    for i in range(OFFERS_COUNT)
+]
+summary = ModelSummary(
+    manufacturer="Alexander Schleicher",
+    model="ASK 21",
+    offers_count=OFFERS_COUNT,
+    min_price_in_euro="45000.00",
+    median_price_in_euro="45000.00",
+    max_price_in_euro="45000.00",
+    newest_published_at="2024-07-28",
+    avg_hours=1350,
+    avg_starts=3150,
+)
+
+
+def flask_json() -> bytes:
+    return app.json.dumps(
+        dict(manufacturer_website=None, summary=summary, offers=offers)
+    ).encode()
+
+
+def offers_serialization() -> bytes:
+    return dumps(
+        dict(
+            manufacturer_website=None,
+            summary=summary,
+            offers=[offer_json(offer) for offer in offers],
+        )
+    )
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        for name, serialize in [
+            ("flask json provider", flask_json),
+            ("aerooffers.api.serialization", offers_serialization),
+        ]:
+            seconds = min(timeit.repeat(serialize, number=REPEATS, repeat=5))
+            print(
+                f"{name:30} {seconds / REPEATS * 1000:7.2f} ms per response, {len(serialize())} bytes"
+            )
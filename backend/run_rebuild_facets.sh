@@ -0,0 +1,5 @@
+export PYTHONPATH=$PYTHONPATH':./src'
+
+set -e
+
+python3 ./src/aerooffers/job_rebuild_facets.py
@@ -1,2 +1,5 @@
 ./run_spiders.sh
-./run_classifier.sh
\ No newline at end of file
+./run_classifier.sh
+./run_archive_offers.sh
+./run_rebuild_model_summaries.sh
+./run_rebuild_facets.sh
\ No newline at end of file
@@ -0,0 +1,97 @@
+import gzip
+import hashlib
+from collections.abc import Callable, Hashable, Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+from flask import request, Response
+
+from aerooffers.api.serialization import dumps
+from aerooffers.offers_db import offers_query_cache
+from aerooffers.query_cache import QueryCache
+
+MIN_COMPRESSED_SIZE = 1024
+"""Smaller bodies are sent as they are, compressing them doesn't save a noticeable transfer time."""
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """
+    Serialized JSON body of a response, with its strong ETag - hash of the body, so it changes only when the data does.
+    Clients revalidating with `If-None-Match` get 304 (without the body) while the data is unchanged. Clients accepting
+    gzip get the body compressed, once per ETag (see `gzipped_bodies`).
+    """
+
+    body: bytes
+    etag: str
+    headers: Mapping[str, str] = field(default_factory=dict)
+    # compressed in advance, instead of on the first request accepting gzip
+    gzipped_body: bytes | None = None
+
+    @classmethod
+    def of(
+        cls, value: Any, headers: Mapping[str, str] | None = None
+    ) -> "CachedResponse":
+        body = dumps(value)
+        return cls(
+            body=body,
+            etag=hashlib.sha256(body).hexdigest()[:32],
+            headers=headers or {},
+        )
+
+    def to_response(self) -> Response:
+        """Full response, or 304 if ETag of the body matches `If-None-Match` of the current request."""
+        if len(self.body) < MIN_COMPRESSED_SIZE:
+            response = Response(
+                self.body, mimetype="application/json", headers=self.headers
+            )
+            response.set_etag(self.etag)
+        else:
+            gzipped = request.accept_encodings["gzip"] > 0
+            response = Response(
+                self._gzipped_body() if gzipped else self.body,
+                mimetype="application/json",
+                headers=self.headers,
+            )
+            response.vary.add("Accept-Encoding")
+            if gzipped:
+                response.content_encoding = "gzip"
+            # each representation has its own strong ETag
+            response.set_etag(f"{self.etag}-gzip" if gzipped else self.etag)
+        # conditional response is the same object, with status and body changed
+        response.make_conditional(request)
+        return response
+
+    def _gzipped_body(self) -> bytes:
+        if self.gzipped_body is not None:
+            return self.gzipped_body
+        # mtime=0, so the same body is always compressed to the same bytes
+        return gzipped_bodies.get_or_load(
+            self.etag, lambda: gzip.compress(self.body, compresslevel=6, mtime=0)
+        )
+
+
+gzipped_bodies = QueryCache[bytes](
+    max_entries=offers_query_cache.max_entries, ttl=offers_query_cache.ttl
+)
+"""Compressed bodies of responses by their ETag (hash of uncompressed body), so the same body is never compressed twice."""
+
+responses_cache = QueryCache[CachedResponse](
+    max_entries=offers_query_cache.max_entries, ttl=offers_query_cache.ttl
+)
+"""
+Serialized responses of offers queries, so requests of unchanged data (most of them, as UI polls the api) are answered
+without querying db or serializing offers again. Dropped together with `offers_query_cache`, on writes of this process.
+"""
+
+
+def cached_offers_response(
+    key: Hashable, load: Callable[[], CachedResponse]
+) -> Response:
+    # generation of offers cache is bumped on every write, making older responses unreachable
+    return cached_response((offers_query_cache.generation, key), load)
+
+
+def cached_response(key: Hashable, load: Callable[[], CachedResponse]) -> Response:
+    """:param key: identifies the data of the response, e.g. with the time it was last written (by any process)"""
+    return responses_cache.get_or_load(key, load).to_response()
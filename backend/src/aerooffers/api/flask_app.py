@@ -1,51 +1,234 @@
-from flask import abort, Flask, jsonify, request, Response
+import os
+from collections.abc import Collection, Iterator
+from contextlib import ExitStack
+from itertools import chain
+
+from flask import abort, Flask, g, request, Response, stream_with_context
 from flask_cors import CORS
 from flask_headers import headers
 
-from aerooffers.classifier.classifiers import load_all_models
-from aerooffers.offer import AircraftCategory
-from aerooffers.offers_db import get_offers
+from aerooffers.api.cached_response import (
+    cached_offers_response,
+    cached_response,
+    CachedResponse,
+)
+from aerooffers.api.serialization import dumps, offer_json
+from aerooffers.classifier.classifiers import models_catalog
+from aerooffers.db_stats import scoped_stats
+from aerooffers.offer import AircraftCategory, Offer
+from aerooffers.offers_db import (
+    get_cached_offers,
+    get_facets,
+    get_model_summary,
+    iter_offers,
+    offers_cursor,
+)
 
 app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}})
+CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=["X-Next-Cursor", "ETag"])
+# db costs of each request (RU, number of calls) are sent in `Server-Timing` header only when enabled, e.g. locally
+app.config["SERVER_TIMING"] = os.getenv("API_SERVER_TIMING", "").lower() in (
+    "true",
+    "1",
+    "yes",
+)
+
+
+@app.before_request
+def collect_cosmos_stats() -> None:
+    if not app.config["SERVER_TIMING"]:
+        return
+    g.cosmos_stats_scope = ExitStack()
+    g.cosmos_stats = g.cosmos_stats_scope.enter_context(scoped_stats())
+
+
+@app.after_request
+def add_cosmos_stats_header(response: Response) -> Response:
+    if "cosmos_stats" in g:
+        total = g.cosmos_stats.total()
+        response.headers["Server-Timing"] = (
+            f'cosmos;dur={total.duration_ms:.1f};desc="{total.request_charge:.2f} RU, {total.calls} requests"'
+        )
+    return response
+
+
+@app.teardown_request
+def stop_collecting_cosmos_stats(_: BaseException | None) -> None:
+    if "cosmos_stats_scope" in g:
+        g.pop("cosmos_stats_scope").close()
 
 
 @app.route("/api/models")
 @headers({"Cache-Control": "public, max-age=360"})
 def aircraft_models() -> Response:
-    return jsonify(load_all_models())
+    # serialized and compressed once per version of models.json, ETag is hash of its content
+    catalog = models_catalog()
+    return CachedResponse(
+        body=catalog.json_body,
+        etag=catalog.version,
+        gzipped_body=catalog.gzipped_json_body,
+    ).to_response()
 
 
 @app.route("/api/offers")
+# cached by clients, but always revalidated with ETag
+@headers({"Cache-Control": "no-cache"})
 def offers() -> Response:
     raw_category = request.args.get("category")
     try:
         category = AircraftCategory[raw_category] if raw_category is not None else None
     except Exception:
         category = AircraftCategory.unknown
-    return jsonify(
-        get_offers(
-            category=category,
-            offset=int(request.args.get("offset") or "0"),
-            limit=int(request.args.get("limit") or "30"),
+    offset = int(request.args.get("offset") or "0")
+    limit = int(request.args.get("limit") or "30")
+    cursor = request.args.get("cursor")
+    # e.g. `fields=title,price,url` - list views may request a slimmer payload than the full offer
+    raw_fields = request.args.get("fields")
+    fields = raw_fields.split(",") if raw_fields else None
+    # the same aircraft advertised on more than one portal is listed once, unless `duplicates=true`
+    collapse_duplicates = request.args.get("duplicates") != "true"
+
+    # e.g. `stream=ndjson` - large pages and exports are streamed as offers are read from db, bypassing the cache
+    stream = request.args.get("stream")
+    if stream is not None:
+        if stream not in STREAM_MIMETYPES:
+            abort(400)
+        try:
+            offers_iterator = iter_offers(
+                category=category,
+                offset=offset,
+                limit=limit,
+                cursor=cursor,
+                fields=fields,
+                collapse_duplicates=collapse_duplicates,
+            )
+            # first page is read before responding, so invalid query is still reported with status code
+            first_offer = next(offers_iterator, None)
+        except ValueError:
+            abort(400)
+        return _streamed_offers(stream, first_offer, offers_iterator, fields)
+
+    def load() -> CachedResponse:
+        try:
+            offers_page = get_cached_offers(
+                category=category,
+                offset=offset,
+                limit=limit,
+                cursor=cursor,
+                fields=fields,
+                collapse_duplicates=collapse_duplicates,
+            )
+        except ValueError:
+            abort(400)
+
+        return CachedResponse.of(
+            [offer_json(offer, fields) for offer in offers_page],
+            headers=_next_cursor_header(offers_page, limit),
         )
+
+    return cached_offers_response(
+        (
+            "offers",
+            category,
+            offset,
+            limit,
+            cursor,
+            tuple(sorted(set(fields))) if fields is not None else None,
+            collapse_duplicates,
+        ),
+        load,
     )
 
 
+def _next_cursor_header(offers_page: list[Offer], limit: int) -> dict[str, str]:
+    # full page means there might be more offers, client can pass the cursor back to fetch the next page
+    if len(offers_page) == limit:
+        return {"X-Next-Cursor": offers_cursor(offers_page[-1])}
+    return {}
+
+
+STREAM_MIMETYPES = {"json": "application/json", "ndjson": "application/x-ndjson"}
+
+
+def _streamed_offers(
+    stream: str,
+    first_offer: Offer | None,
+    offers_iterator: Iterator[Offer],
+    fields: Collection[str] | None,
+) -> Response:
+    """
+    JSON array or newline delimited JSON (one offer per line), written while offers are being read. Headers are sent
+    before the last offer is known, so there is no `X-Next-Cursor` and `Server-Timing` covers the first page only.
+    """
+
+    def generate() -> Iterator[bytes]:
+        offers_to_write = (
+            chain([first_offer], offers_iterator)
+            if first_offer is not None
+            else offers_iterator
+        )
+        if stream == "ndjson":
+            for offer in offers_to_write:
+                yield dumps(offer_json(offer, fields)) + b"\n"
+        else:
+            separator = b"["
+            for offer in offers_to_write:
+                yield separator + dumps(offer_json(offer, fields))
+                separator = b","
+            yield b"[]\n" if separator == b"[" else b"]\n"
+
+    return Response(stream_with_context(generate()), mimetype=STREAM_MIMETYPES[stream])
+
+
 @app.route("/api/offers/<manufacturer>/<model>")
+@headers({"Cache-Control": "no-cache"})
 def model_information(manufacturer: str, model: str) -> Response:
-    """Returns statistics for a specific manufacturer and model"""
-    manufacturers = load_all_models()
-    if manufacturer not in manufacturers:
+    """Returns summary of all offers of a specific manufacturer and model, with the first page of its offers"""
+    catalog = models_catalog()
+    if not catalog.has_model(manufacturer, model):
         abort(404)
 
-    return jsonify(
-        dict(
-            manufacturer_website=manufacturers[manufacturer].get(
-                "manufacturer_website", None
+    limit = int(request.args.get("limit") or "30")
+    cursor = request.args.get("cursor")
+
+    def load() -> CachedResponse:
+        try:
+            offers_page = get_cached_offers(
+                manufacturer=manufacturer,
+                model=model,
+                limit=limit,
+                cursor=cursor,
+                # counted once, same as in the summary
+                collapse_duplicates=True,
+            )
+        except ValueError:
+            abort(400)
+
+        return CachedResponse.of(
+            dict(
+                manufacturer_website=catalog.manufacturers[manufacturer].get(
+                    "manufacturer_website", None
+                ),
+                summary=get_model_summary(manufacturer, model),
+                offers=[offer_json(offer) for offer in offers_page],
             ),
-            offers=get_offers(manufacturer=manufacturer, model=model, limit=300),
+            headers=_next_cursor_header(offers_page, limit),
         )
+
+    return cached_offers_response(("model", manufacturer, model, limit, cursor), load)
+
+
+@app.route("/api/facets")
+@headers({"Cache-Control": "no-cache"})
+def facets() -> Response:
+    """
+    Numbers of offers by category, manufacturer and model - counted by a job, in another process. These are read on
+    each request (a single point read), response is serialized once per count (see `Facets.updated_at`).
+    """
+    current_facets = get_facets()
+    return cached_response(
+        ("facets", current_facets.updated_at),
+        lambda: CachedResponse.of(current_facets),
     )
 
 
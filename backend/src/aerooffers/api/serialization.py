@@ -0,0 +1,65 @@
+"""
+Serialization of api responses. Offers are the bulk of them, so these are converted to dicts field by field, rather
+than by `dataclasses.asdict` (used by Flask for dataclasses), which deep copies every value recursively.
+"""
+
+import dataclasses
+import json
+from collections.abc import Collection
+from datetime import date
+from typing import Any
+
+from aerooffers.offer import Offer
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, date):
+        return value.isoformat()
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+_encoder = json.JSONEncoder(
+    ensure_ascii=False,
+    separators=(",", ":"),
+    default=_to_json,
+)
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON, offers (see `offer_json`), dates and other dataclasses included."""
+    return _encoder.encode(value).encode()
+
+
+def offer_json(offer: Offer, fields: Collection[str] | None = None) -> dict[str, Any]:
+    """
+    :param fields: names of fields to include (e.g. the ones selected by `fields` query parameter), all if None
+    """
+    price = offer.price
+    offer_dict = {
+        "id": offer.id,
+        "url": offer.url,
+        "category": offer.category,
+        "title": offer.title,
+        "published_at": offer.published_at,
+        "location": offer.location,
+        "hours": offer.hours,
+        "starts": offer.starts,
+        "price": {
+            "amount": price.amount,
+            "currency": price.currency,
+            "amount_in_euro": price.amount_in_euro,
+            "exchange_rate": price.exchange_rate,
+        }
+        if price is not None
+        else None,
+        "manufacturer": offer.manufacturer,
+        "model": offer.model,
+        "spider": offer.spider,
+        "duplicate_of": offer.duplicate_of,
+        "price_history": offer.price_history,
+    }
+    if fields is None:
+        return offer_dict
+    return {field: value for field, value in offer_dict.items() if field in fields}
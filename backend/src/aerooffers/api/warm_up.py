@@ -0,0 +1,43 @@
+import time
+
+from aerooffers.classifier.classifiers import load_all_models
+from aerooffers.db import (
+    check_offers_indexing_policy,
+    lazy_database,
+    metadata_container,
+    offers_db_backend,
+    offers_partition_key_path,
+)
+from aerooffers.my_logging import logging
+from aerooffers.offer import AircraftCategory
+from aerooffers.offers_db import get_cached_offers, repository
+
+logger = logging.getLogger("warm_up")
+
+
+def warm_up(threads: int = 1) -> None:
+    """
+    Do in advance what is otherwise done lazily by the first requests served by an api worker: connect to db, read
+    container properties (and check indexing policy of offers container), load models and cache first page of offers
+    of each category. Failures are logged only, as the worker still can serve requests (and retries all this lazily).
+    Done in each worker (after fork), so no connection is shared with the gunicorn master or other workers.
+
+    :param threads: number of threads serving requests in this worker, connection pool is sized for them
+    """
+    started_at = time.monotonic()
+    try:
+        load_all_models()
+        if offers_db_backend() == "cosmos":
+            lazy_database(connection_pool_size=max(10, threads))
+            # also verifies offers container exists
+            offers_partition_key_path()
+            metadata_container()
+            check_offers_indexing_policy()
+        repository()
+        for category in AircraftCategory:
+            if category != AircraftCategory.unknown:
+                get_cached_offers(category=category, collapse_duplicates=True)
+    except Exception as e:
+        logger.warning("Warm-up failed, continuing without it: %s", e)
+        return
+    logger.info(f"Warmed up in {time.monotonic() - started_at:.2f}s")
@@ -1,32 +1,13 @@
+import gzip
+import hashlib
 import json
 import os
+import threading
+import time
 from dataclasses import dataclass
 from typing import Protocol
 
-from aerooffers.offer import UnclassifiedOffer
-
-
-@dataclass(frozen=True)
-class ClassificationResult:
-    """Result of aircraft classification.
-
-    :param manufacturer: The manufacturer name or None
-    :param model: The model name or None
-    """
-
-    manufacturer: str | None
-    model: str | None
-
-    @classmethod
-    def unknown(cls) -> "ClassificationResult":
-        """Factory method to create an unknown classification result.
-
-        :return: ClassificationResult with all fields set to None
-        """
-        return cls(
-            manufacturer=None,
-            model=None,
-        )
+from aerooffers.offer import ClassificationResult, UnclassifiedOffer
 
 
 class AircraftClassifier(Protocol):
@@ -48,13 +29,99 @@ class AircraftClassifier(Protocol):
         ...
 
 
+MODELS_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "models.json")
+
+MODELS_RELOAD_CHECK_INTERVAL = 10
+"""Seconds between checks whether models.json changed, so most lookups don't even touch the file system."""
+
+
+@dataclass(frozen=True)
+class ModelsCatalog:
+    """
+    Aircraft models from models.json, with everything derived from them computed once per version of the file.
+
+    :param manufacturers: mapping of manufacturer names to their website and models (by category), as in models.json
+    :param models_by_category: manufacturer -> category -> models, for lookups
+    :param version: hash of models.json content
+    :param json_body: manufacturers serialized as compact JSON, served by the api as is
+    :param gzipped_json_body: the same, gzip-compressed
+    """
+
+    manufacturers: dict[str, dict]
+    models_by_category: dict[str, dict[str, frozenset[str]]]
+    version: str
+    json_body: bytes
+    gzipped_json_body: bytes
+
+    @classmethod
+    def parse(cls, content: bytes) -> "ModelsCatalog":
+        manufacturers: dict[str, dict] = json.loads(content)
+        json_body = json.dumps(
+            manufacturers, sort_keys=True, separators=(",", ":")
+        ).encode()
+        return cls(
+            manufacturers=manufacturers,
+            models_by_category={
+                manufacturer: {
+                    category: frozenset(models)
+                    for category, models in details["models"].items()
+                }
+                for manufacturer, details in manufacturers.items()
+            },
+            version=_version(content),
+            json_body=json_body,
+            # mtime=0, so the same content is always compressed to the same bytes
+            gzipped_json_body=gzip.compress(json_body, mtime=0),
+        )
+
+    def has_model(self, manufacturer: str, model: str) -> bool:
+        return any(
+            model in models
+            for models in self.models_by_category.get(manufacturer, {}).values()
+        )
+
+
+def _version(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()[:32]
+
+
+_catalog: ModelsCatalog | None = None
+_catalog_mtime_ns = 0
+_catalog_checked_at = 0.0
+_catalog_lock = threading.Lock()
+
+
+def models_catalog() -> ModelsCatalog:
+    """
+    Catalog of models shared by the whole process, loaded on first use. It is reloaded (as a new object) when
+    models.json changes, e.g. when replaced in a running container - callers should not hold it for long.
+    """
+    global _catalog, _catalog_mtime_ns, _catalog_checked_at
+    catalog = _catalog
+    if (
+        catalog is not None
+        and time.monotonic() - _catalog_checked_at < MODELS_RELOAD_CHECK_INTERVAL
+    ):
+        return catalog
+
+    with _catalog_lock:
+        _catalog_checked_at = time.monotonic()
+        mtime_ns = os.stat(MODELS_PATH).st_mtime_ns
+        if _catalog is not None and mtime_ns == _catalog_mtime_ns:
+            return _catalog
+
+        with open(MODELS_PATH, "rb") as models_file:
+            content = models_file.read()
+        _catalog_mtime_ns = mtime_ns
+        # file touched, but not changed - derived data (and ETag of the api response) stays the same
+        if _catalog is None or _catalog.version != _version(content):
+            _catalog = ModelsCatalog.parse(content)
+        return _catalog
+
+
 def load_all_models() -> dict[str, dict]:
-    """Load all aircraft models from models.json.
+    """Aircraft models of `models_catalog`.
 
-    :return: Dictionary mapping manufacturer names to their models
+    :return: Dictionary mapping manufacturer names to their models, shared by all callers - must not be modified
     """
-    models_file = "models.json"
-    models_path = os.path.dirname(os.path.realpath(__file__)) + os.sep + models_file
-    with open(models_path) as json_file:
-        manufacturers = json.load(json_file)
-    return manufacturers
+    return models_catalog().manufacturers
@@ -4,12 +4,13 @@ import os
 from google import genai
 from google.genai.types import GenerateContentConfig
 
-from aerooffers.classifier.classifiers import (
+from aerooffers.classifier.classifiers import load_all_models
+from aerooffers.my_logging import logging
+from aerooffers.offer import (
+    AircraftCategory,
     ClassificationResult,
-    load_all_models,
+    UnclassifiedOffer,
 )
-from aerooffers.my_logging import logging
-from aerooffers.offer import AircraftCategory, UnclassifiedOffer
 
 logger = logging.getLogger("classifier.gemini_llm")
 
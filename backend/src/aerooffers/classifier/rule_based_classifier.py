@@ -6,12 +6,13 @@ from nltk.corpus import stopwords
 from nltk.metrics import distance
 from nltk.util import ngrams
 
-from aerooffers.classifier.classifiers import (
+from aerooffers.classifier.classifiers import load_all_models
+from aerooffers.my_logging import logging
+from aerooffers.offer import (
+    AircraftCategory,
     ClassificationResult,
-    load_all_models,
+    UnclassifiedOffer,
 )
-from aerooffers.my_logging import logging
-from aerooffers.offer import AircraftCategory, UnclassifiedOffer
 
 nltk.download("stopwords")
 
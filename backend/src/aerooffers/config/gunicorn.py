@@ -14,3 +14,9 @@ threads = int(os.getenv("PYTHON_MAX_THREADS", 1))
 reload = bool(strtobool(os.getenv("WEB_RELOAD", "false")))
 
 timeout = int(os.getenv("WEB_TIMEOUT", 120))
+
+
+def post_worker_init(worker: object) -> None:
+    from aerooffers.api.warm_up import warm_up
+
+    warm_up(threads=threads)
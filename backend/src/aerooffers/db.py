@@ -1,11 +1,20 @@
 import os
+from typing import Any
 
+import requests
+from azure.core.pipeline.transport import RequestsTransport
 from azure.cosmos import (
     ContainerProxy,
     CosmosClient,
     DatabaseProxy,
+    IndexingMode,
+    PartitionKey,
+    ThroughputProperties,
 )
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from aerooffers.db_stats import instrumented
 from aerooffers.my_logging import logging
 
 logger = logging.getLogger("db")
@@ -14,12 +23,24 @@ logging.getLogger("azure.cosmos").setLevel(logging.WARNING)
 
 COSMOSDB_DB_NAME = "aerooffers"
 
+
+def offers_db_backend() -> str:
+    """Where offers are stored, `cosmos` unless `OFFERS_DB` env variable says otherwise (see `offers_db.repository`)."""
+    return os.getenv("OFFERS_DB") or "cosmos"
+
+
 _database: DatabaseProxy | None = None
+_connection_pool_size = 0
 
 
-def lazy_database() -> DatabaseProxy:
-    global _database
-    if _database is not None:
+def lazy_database(connection_pool_size: int = 10) -> DatabaseProxy:
+    """
+    :param connection_pool_size: connections to Cosmos DB kept open for reuse, should not be lower than the number of
+                                 threads using the client (as each of them holds a connection during a call). Client
+                                 is created again if a larger pool is requested than the one it was created with.
+    """
+    global _database, _connection_pool_size, _offers_container, _metadata_container
+    if _database is not None and connection_pool_size <= _connection_pool_size:
         return _database
 
     cosmosdb_url = os.getenv("COSMOSDB_URL")
@@ -34,13 +55,39 @@ def lazy_database() -> DatabaseProxy:
         f"Connecting to CosmosDB, url={cosmosdb_url}, db_name={COSMOSDB_DB_NAME}"
     )
 
-    client = CosmosClient(url=cosmosdb_url, credential=cosmosdb_credential)
+    client = CosmosClient(
+        url=cosmosdb_url,
+        credential=cosmosdb_credential,
+        transport=_transport(connection_pool_size),
+    )
     _database = client.create_database_if_not_exists(COSMOSDB_DB_NAME)
+    _connection_pool_size = connection_pool_size
+    # containers of the previous client (if any) would keep using its connection pool
+    _offers_container = None
+    _metadata_container = None
 
     logger.info("Connection established successfully")
     return _database
 
 
+def _transport(connection_pool_size: int) -> RequestsTransport:
+    """Same as default transport of the SDK, but with connection pool sized for our threads."""
+    # retries are done by the SDK itself, not by the http adapter
+    adapter = HTTPAdapter(
+        pool_maxsize=connection_pool_size,
+        max_retries=Retry(total=False, redirect=False, raise_on_status=False),
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return RequestsTransport(session=session, session_owner=False)
+
+
+def offers_container_id() -> str:
+    """Offers container in use, `offers` unless switched (e.g. to a container migrated with `job_migrate_offers`)."""
+    return os.getenv("COSMOSDB_OFFERS_CONTAINER") or "offers"
+
+
 _offers_container: ContainerProxy | None = None
 
 
@@ -49,5 +96,168 @@ def offers_container() -> ContainerProxy:
     if _offers_container is not None:
         return _offers_container
 
-    _offers_container = lazy_database().get_container_client(container="offers")
+    _offers_container = instrumented(
+        lazy_database().get_container_client(container=offers_container_id())
+    )
     return _offers_container
+
+
+OFFERS_PARTITION_KEY_PATHS = ("/id", "/category")
+"""Supported layouts of offers container: partitioned by offer id (default) or by category."""
+
+_offers_partition_key_path: str | None = None
+
+
+def offers_partition_key_path() -> str:
+    """Partition key path of offers container in use, read from its properties once."""
+    global _offers_partition_key_path
+    if _offers_partition_key_path is not None:
+        return _offers_partition_key_path
+
+    path: str = offers_container().read()["partitionKey"]["paths"][0]
+    if path not in OFFERS_PARTITION_KEY_PATHS:
+        raise ValueError(f"Unsupported partition key of offers container: {path}")
+    _offers_partition_key_path = path
+    logger.info(f"Offers container is partitioned by {path}")
+    return _offers_partition_key_path
+
+
+_metadata_container: ContainerProxy | None = None
+
+
+def metadata_container() -> ContainerProxy:
+    """
+    Small container for documents derived from offers or maintained by jobs (like change feed leases or model
+    summaries), distinguished by `type`. Created on first use.
+    """
+    global _metadata_container
+    if _metadata_container is not None:
+        return _metadata_container
+
+    _metadata_container = instrumented(
+        lazy_database().create_container_if_not_exists(
+            id="metadata",
+            partition_key=PartitionKey(path="/id"),
+            offer_throughput=ThroughputProperties(offer_throughput=400),
+        )
+    )
+    return _metadata_container
+
+
+SYSTEM_PROPERTIES = ("_rid", "_self", "_etag", "_attachments", "_ts", "_lsn")
+"""Properties added to documents by Cosmos DB, not to be copied along with the document."""
+
+
+def without_system_properties(document: dict[str, Any]) -> dict[str, Any]:
+    return {k: v for k, v in document.items() if k not in SYSTEM_PROPERTIES}
+
+
+OFFERS_INDEXING_POLICY: dict[str, Any] = dict(
+    automatic=True,
+    indexingMode=IndexingMode.Consistent,
+    # only paths used in filters/sorting are indexed, everything else (like raw price or location) is not
+    includedPaths=[
+        dict(path="/id/?"),
+        dict(path="/url/?"),
+        dict(path="/published_at/?"),
+        dict(path="/category/?"),
+        dict(path="/manufacturer/?"),
+        dict(path="/model/?"),
+        dict(path="/classified/?"),
+        dict(path="/spider/?"),
+        dict(path="/duplicate_of/?"),
+        dict(path="/lsh_bands/[]/?"),
+    ],
+    excludedPaths=[dict(path="/*")],
+    # one composite index per query shape: `get_offers` (any filter combination) and `get_unclassified_offers`
+    compositeIndexes=[
+        [
+            dict(path="/published_at", order="descending"),
+            dict(path="/id", order="descending"),
+        ],
+        [
+            dict(path="/category", order="ascending"),
+            dict(path="/published_at", order="descending"),
+            dict(path="/id", order="descending"),
+        ],
+        [
+            dict(path="/manufacturer", order="ascending"),
+            dict(path="/model", order="ascending"),
+            dict(path="/published_at", order="descending"),
+            dict(path="/id", order="descending"),
+        ],
+        [
+            dict(path="/classified", order="ascending"),
+            dict(path="/id", order="ascending"),
+        ],
+    ],
+)
+
+
+def create_offers_container_if_not_exists(
+    offer_throughput: int = 600,
+    container_id: str = "offers",
+    partition_key_path: str = "/id",
+) -> ContainerProxy:
+    if partition_key_path not in OFFERS_PARTITION_KEY_PATHS:
+        raise ValueError(f"Unsupported partition key: {partition_key_path}")
+    return lazy_database().create_container_if_not_exists(
+        id=container_id,
+        partition_key=PartitionKey(path=partition_key_path),
+        offer_throughput=ThroughputProperties(offer_throughput=offer_throughput),
+        indexing_policy=OFFERS_INDEXING_POLICY,
+    )
+
+
+def indexing_policy_drift(
+    live_policy: dict[str, Any],
+    expected_policy: dict[str, Any] = OFFERS_INDEXING_POLICY,
+) -> list[str]:
+    """Returns human-readable differences between live and expected indexing policy, empty list if there are none."""
+
+    def _paths(policy: dict[str, Any], key: str) -> set[str]:
+        return {path["path"] for path in policy.get(key, [])}
+
+    def _composite_indexes(policy: dict[str, Any]) -> set[tuple[tuple[str, str], ...]]:
+        return {
+            tuple(
+                (path["path"], path.get("order", "ascending").lower()) for path in index
+            )
+            for index in policy.get("compositeIndexes", [])
+        }
+
+    drift = []
+    missing_paths = _paths(expected_policy, "includedPaths") - _paths(
+        live_policy, "includedPaths"
+    )
+    if missing_paths:
+        drift.append(f"missing included paths: {sorted(missing_paths)}")
+    missing_excluded_paths = _paths(expected_policy, "excludedPaths") - _paths(
+        live_policy, "excludedPaths"
+    )
+    if missing_excluded_paths:
+        drift.append(f"missing excluded paths: {sorted(missing_excluded_paths)}")
+    missing_indexes = _composite_indexes(expected_policy) - _composite_indexes(
+        live_policy
+    )
+    if missing_indexes:
+        drift.append(f"missing composite indexes: {sorted(missing_indexes)}")
+    return drift
+
+
+def check_offers_indexing_policy() -> None:
+    """Warns when indexing policy of the live offers container is not the one queries were designed for."""
+    if offers_db_backend() != "cosmos":
+        return
+
+    try:
+        live_policy = offers_container().read()["indexingPolicy"]
+    except Exception as e:
+        logger.warning("Could not read indexing policy of offers container: %s", e)
+        return
+
+    for difference in indexing_policy_drift(live_policy):
+        logger.warning(
+            "Indexing policy of offers container drifted, %s (see OFFERS_INDEXING_POLICY)",
+            difference,
+        )
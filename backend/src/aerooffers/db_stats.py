@@ -0,0 +1,196 @@
+"""Request units (RU) and latency of Cosmos DB calls, aggregated per call site (offers_db function calling Cosmos)."""
+
+import sys
+import threading
+import time
+from collections.abc import Generator, Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, cast
+
+from azure.cosmos import ContainerProxy
+
+from aerooffers.my_logging import logging
+
+logger = logging.getLogger("db_stats")
+
+
+@dataclass
+class CallStats:
+    calls: int = 0
+    """Number of requests sent to Cosmos, each page of query results is a separate request."""
+    request_charge: float = 0.0
+    duration_ms: float = 0.0
+    item_count: int = 0
+    query: str | None = None
+
+
+@dataclass
+class CosmosStats:
+    by_call_site: dict[str, CallStats] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(
+        self,
+        call_site: str,
+        request_charge: float,
+        duration_ms: float,
+        item_count: int,
+        query: str | None = None,
+    ) -> None:
+        with self._lock:
+            stats = self.by_call_site.setdefault(call_site, CallStats(query=query))
+            stats.calls += 1
+            stats.request_charge += request_charge
+            stats.duration_ms += duration_ms
+            stats.item_count += item_count
+
+    def total(self) -> CallStats:
+        with self._lock:
+            return CallStats(
+                calls=sum(stats.calls for stats in self.by_call_site.values()),
+                request_charge=sum(
+                    stats.request_charge for stats in self.by_call_site.values()
+                ),
+                duration_ms=sum(
+                    stats.duration_ms for stats in self.by_call_site.values()
+                ),
+                item_count=sum(
+                    stats.item_count for stats in self.by_call_site.values()
+                ),
+            )
+
+    def reset(self) -> None:
+        with self._lock:
+            self.by_call_site.clear()
+
+    def log_summary(self, title: str) -> None:
+        total = self.total()
+        logger.info(
+            "%s: %d cosmos requests, %.2f RU, %.0f ms, %d items",
+            title,
+            total.calls,
+            total.request_charge,
+            total.duration_ms,
+            total.item_count,
+        )
+        with self._lock:
+            by_call_site = sorted(
+                self.by_call_site.items(),
+                key=lambda item: item[1].request_charge,
+                reverse=True,
+            )
+        for call_site, stats in by_call_site:
+            logger.info(
+                "  %s: %d requests, %.2f RU, %.0f ms, %d items%s",
+                call_site,
+                stats.calls,
+                stats.request_charge,
+                stats.duration_ms,
+                stats.item_count,
+                f", query: {stats.query}" if stats.query else "",
+            )
+
+
+process_stats = CosmosStats()
+"""All calls since process started (or since last reset), which is the whole run for jobs."""
+
+_scoped_stats: ContextVar[CosmosStats | None] = ContextVar(
+    "scoped_cosmos_stats", default=None
+)
+
+
+@contextmanager
+def scoped_stats() -> Generator[CosmosStats]:
+    """
+    Collect stats of calls made within this block (by current thread or task), e.g. for a single api request.
+    Calls made from other threads (like `run_concurrently`) are counted in `process_stats` only.
+    """
+    stats = CosmosStats()
+    token = _scoped_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _scoped_stats.reset(token)
+
+
+def _record(
+    call_site: str,
+    headers: Mapping[str, Any],
+    body: object,
+    duration_ms: float,
+    query: str | None,
+) -> None:
+    request_charge = float(headers.get("x-ms-request-charge") or 0)
+    if "x-ms-item-count" in headers:
+        item_count = int(headers["x-ms-item-count"])
+    elif isinstance(body, list):
+        item_count = len(body)
+    else:
+        item_count = 0 if body is None else 1
+
+    process_stats.record(call_site, request_charge, duration_ms, item_count, query)
+    current_scoped_stats = _scoped_stats.get()
+    if current_scoped_stats is not None:
+        current_scoped_stats.record(
+            call_site, request_charge, duration_ms, item_count, query
+        )
+
+
+_INSTRUMENTED_METHODS = {
+    "create_item",
+    "delete_item",
+    "patch_item",
+    "query_items",
+    "query_items_change_feed",
+    "read",
+    "read_all_items",
+    "read_item",
+    "read_items",
+    "replace_item",
+    "upsert_item",
+}
+
+
+class _InstrumentedContainer:
+    """Delegates to the container, passing `response_hook` which records RU charge of each response."""
+
+    def __init__(self, container: ContainerProxy) -> None:
+        self._container = container
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._container, name)
+        if name not in _INSTRUMENTED_METHODS:
+            return attribute
+
+        def instrumented(*args: Any, **kwargs: Any) -> Any:
+            if "response_hook" in kwargs:
+                return attribute(*args, **kwargs)
+
+            # caller of the container method, e.g. `store_offer`
+            call_site = sys._getframe(1).f_code.co_name
+            query = kwargs.get("query")
+            # paged calls (queries) invoke the hook once per page, lazily while results are iterated, so the duration
+            # of a page is measured from the previous page (including time spent by caller processing it)
+            last_response_at = time.perf_counter()
+
+            def response_hook(headers: Mapping[str, Any], body: object) -> None:
+                nonlocal last_response_at
+                now = time.perf_counter()
+                _record(
+                    call_site,
+                    headers,
+                    body,
+                    (now - last_response_at) * 1000,
+                    query,
+                )
+                last_response_at = now
+
+            return attribute(*args, response_hook=response_hook, **kwargs)
+
+        return instrumented
+
+
+def instrumented(container: ContainerProxy) -> ContainerProxy:
+    return cast(ContainerProxy, _InstrumentedContainer(container))
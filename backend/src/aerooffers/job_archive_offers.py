@@ -0,0 +1,26 @@
+import os
+from datetime import date, timedelta
+
+from aerooffers.db_stats import process_stats
+from aerooffers.my_logging import logging
+from aerooffers.offers_db import archive_offers
+
+logger = logging.getLogger("archive_offers_job")
+
+
+def archive_old_offers(max_age_days: int) -> int:
+    """Archive offers published more than `max_age_days` ago (see `offers_db.archive_offers`)."""
+    published_before = date.today() - timedelta(days=max_age_days)
+    logger.info(f"Archiving offers published before {published_before}...")
+    archived_offers = archive_offers(published_before)
+    logger.info(f"Finished archiving {archived_offers} offers")
+    return archived_offers
+
+
+if __name__ == "__main__":
+    from aerooffers.utils import load_env
+
+    load_env()
+
+    archive_old_offers(int(os.getenv("OFFERS_ARCHIVE_AFTER_DAYS") or 730))
+    process_stats.log_summary("Archiving offers cosmos usage")
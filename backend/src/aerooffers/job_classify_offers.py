@@ -1,19 +1,35 @@
 import os
+import time
+from itertools import batched
 
-from aerooffers.classifier.classifiers import AircraftClassifier, ClassificationResult
+from aerooffers.classifier.classifiers import AircraftClassifier
+from aerooffers.db import check_offers_indexing_policy
+from aerooffers.db_stats import process_stats
 from aerooffers.my_logging import logging
-from aerooffers.offer import UnclassifiedOffer
-from aerooffers.offers_db import classify_offer, get_unclassified_offers
+from aerooffers.offer import ClassificationResult, UnclassifiedOffer
+from aerooffers.offers_db import (
+    classify_offers_bulk,
+    get_lease,
+    get_unclassified_offer_changes,
+    get_unclassified_offers,
+    store_lease,
+    update_model_summaries,
+)
 
 logger = logging.getLogger("classify_job")
 
+CHANGE_FEED_LEASE_ID = "classify_offers"
+
 
 def _classify(
-    unclassified_offers: list[UnclassifiedOffer], model_classifier: AircraftClassifier
+    unclassified_offers: list[UnclassifiedOffer],
+    model_classifier: AircraftClassifier,
+    touched_models: set[tuple[str, str]],
 ) -> None:
     results = model_classifier.classify_many(unclassified_offers)
 
     # Process results
+    offer_results: dict[str, ClassificationResult] = {}
     for offer in unclassified_offers:
         offer_id = offer.id
         result = results.get(offer_id, ClassificationResult.unknown())
@@ -31,11 +47,30 @@ def _classify(
                 result.model,
             )
 
-        classify_offer(
-            offer_id=offer_id,
-            classifier_name=model_classifier.name,
-            manufacturer=result.manufacturer,
-            model=result.model,
+        offer_results[offer_id] = result
+
+    outcomes = classify_offers_bulk(
+        offer_results,
+        classifier_name=model_classifier.name,
+        categories={offer.id: offer.category for offer in unclassified_offers},
+        previous_models={
+            offer.id: (offer.manufacturer, offer.model) for offer in unclassified_offers
+        },
+        touched_models=touched_models,
+    )
+    failed_offer_ids = [
+        offer_id for offer_id, error in outcomes.items() if error is not None
+    ]
+    for offer_id in failed_offer_ids:
+        logger.error(
+            "Could not store classification of offer id %s: %s",
+            offer_id,
+            outcomes[offer_id],
+        )
+    if failed_offer_ids:
+        # failed offers stay unclassified and would be loaded again and again, so stop the job instead
+        raise Exception(
+            f"Could not store classification of {len(failed_offer_ids)} offers"
         )
 
 
@@ -44,16 +79,27 @@ def classify_pending(model_classifier: AircraftClassifier) -> int:
 
     offers_processed = 0
     limit = 10
-    while True:
-        offers = get_unclassified_offers(limit=limit)
-        if len(offers) == 0:
-            break
+    # summaries of models are updated once per run, not once per batch (see `classify_offers_bulk`)
+    touched_models: set[tuple[str, str]] = set()
+    try:
+        while True:
+            offers = get_unclassified_offers(limit=limit)
+            if len(offers) == 0:
+                break
 
-        logger.info(f"Loaded {len(offers)} unclassified offers, calling classifier...")
+            logger.info(
+                f"Loaded {len(offers)} unclassified offers, calling classifier..."
+            )
 
-        _classify(unclassified_offers=offers, model_classifier=model_classifier)
+            _classify(
+                unclassified_offers=offers,
+                model_classifier=model_classifier,
+                touched_models=touched_models,
+            )
 
-        offers_processed += len(offers)
+            offers_processed += len(offers)
+    finally:
+        update_model_summaries(touched_models)
 
     if offers_processed == 0:
         logger.info("No unclassified offers found in the database")
@@ -63,10 +109,57 @@ def classify_pending(model_classifier: AircraftClassifier) -> int:
     return offers_processed
 
 
+def classify_from_change_feed(
+    model_classifier: AircraftClassifier, poll_interval: float | None = None
+) -> int:
+    """
+    Classify offers as they are written, consuming offers container change feed instead of repeatedly querying for
+    unclassified offers. Progress is persisted after each page of changes, so next run continues where this one ended.
+
+    :param poll_interval: seconds to wait for new changes once change feed is drained, None to return instead
+    """
+    logger.info(f"Using '{model_classifier.name}' classifier, reading change feed")
+
+    offers_processed = 0
+    continuation = get_lease(CHANGE_FEED_LEASE_ID)
+    while True:
+        # summaries of models are updated once the change feed is drained, not once per batch
+        touched_models: set[tuple[str, str]] = set()
+        try:
+            for offers, page_continuation in get_unclassified_offer_changes(
+                continuation
+            ):
+                if len(offers) > 0:
+                    logger.info(
+                        f"Loaded {len(offers)} unclassified offers from change feed, calling classifier..."
+                    )
+                    for offers_batch in batched(offers, 10, strict=False):
+                        _classify(
+                            unclassified_offers=list(offers_batch),
+                            model_classifier=model_classifier,
+                            touched_models=touched_models,
+                        )
+                    offers_processed += len(offers)
+
+                if page_continuation is not None and page_continuation != continuation:
+                    continuation = page_continuation
+                    store_lease(CHANGE_FEED_LEASE_ID, continuation)
+        finally:
+            update_model_summaries(touched_models)
+
+        if poll_interval is None:
+            break
+        time.sleep(poll_interval)
+
+    logger.info(f"Finished classifying {offers_processed} offers from change feed")
+    return offers_processed
+
+
 if __name__ == "__main__":
     from aerooffers.utils import load_env
 
     load_env()
+    check_offers_indexing_policy()
 
     if os.getenv("USE_LLM_CLASSIFIER", "").lower() in ("true", "1", "yes"):
         from aerooffers.classifier.gemini_llm_classifier import GeminiLLMClassifier
@@ -77,4 +170,14 @@ if __name__ == "__main__":
 
         classifier = RuleBasedClassifier()
 
-    classify_pending(classifier)
+    if os.getenv("CLASSIFY_FROM_CHANGE_FEED", "").lower() in ("true", "1", "yes"):
+        # when poll interval is set, worker runs continuously instead of stopping once change feed is drained
+        raw_poll_interval = os.getenv("CHANGE_FEED_POLL_INTERVAL")
+        classify_from_change_feed(
+            classifier,
+            poll_interval=float(raw_poll_interval) if raw_poll_interval else None,
+        )
+    else:
+        classify_pending(classifier)
+
+    process_stats.log_summary("Classifying offers cosmos usage")
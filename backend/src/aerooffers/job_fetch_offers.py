@@ -4,6 +4,7 @@ from scrapy.crawler import Crawler, CrawlerProcess, Spider
 from scrapy.utils.log import configure_logging
 from scrapy.utils.project import get_project_settings
 
+from aerooffers.db_stats import process_stats
 from aerooffers.my_logging import logging, remove_scrapy_handlers
 from aerooffers.spiders import FlugzeugMarktDeSpider, SegelflugDeSpider
 
@@ -49,3 +50,4 @@ if __name__ == "__main__":
     process.start()  # the script will block here until all crawling jobs are finished
 
     logger.info("Crawling offers completed")
+    process_stats.log_summary("Crawling offers cosmos usage")
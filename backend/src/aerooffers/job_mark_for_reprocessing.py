@@ -2,15 +2,18 @@
 
 from aerooffers.db import offers_container
 from aerooffers.my_logging import logging
+from aerooffers.offer import AircraftCategory
 from aerooffers.offers_db import unclassify_offer
 
 logger = logging.getLogger("classified_offers_missing_fields_job")
 
 
-def _get_poorly_classified_offer_ids(offset: int = 0, limit: int = 100) -> list[str]:
-    """Returns offers from db for which legacy rule-based classifier failed to classify correctly."""
+def _get_poorly_classified_offers(
+    offset: int = 0, limit: int = 100
+) -> list[tuple[str, AircraftCategory]]:
+    """Returns offers (id and category) from db for which legacy rule-based classifier failed to classify correctly."""
     query = (
-        "SELECT o.id FROM offers o "
+        "SELECT o.id, o.category FROM offers o "
         "WHERE o.classified = true "
         "AND o.category in ('glider', 'tmg') "
         "AND (o.manufacturer = null OR o.model = null) "
@@ -22,26 +25,26 @@ def _get_poorly_classified_offer_ids(offset: int = 0, limit: int = 100) -> list[
     result_set = offers_container().query_items(
         query=query, parameters=params, enable_cross_partition_query=True
     )
-    return [result["id"] for result in result_set]
+    return [
+        (result["id"], AircraftCategory[result["category"]]) for result in result_set
+    ]
 
 
 def _mark_poorly_classified_offers_for_reprocessing(count: int) -> None:
     """Unclassify offers that were poorly classified in the past by legacy rule-based classifier."""
-    offer_ids = _get_poorly_classified_offer_ids(offset=0, limit=count)
+    offers = _get_poorly_classified_offers(offset=0, limit=count)
 
-    if len(offer_ids) == 0:
+    if len(offers) == 0:
         logger.info("No classified offers missing manufacturer or model found")
         return
 
-    logger.info(
-        f"Unclassifying {len(offer_ids)} offers missing manufacturer or model..."
-    )
+    logger.info(f"Unclassifying {len(offers)} offers missing manufacturer or model...")
 
-    for offer_id in offer_ids:
-        unclassify_offer(offer_id)
+    for offer_id, category in offers:
+        unclassify_offer(offer_id, category)
         logger.info(f"Unclassified offer {offer_id}")
 
-    logger.info(f"Successfully unclassified {len(offer_ids)} offers")
+    logger.info(f"Successfully unclassified {len(offers)} offers")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,91 @@
+"""
+Copies offers into another container, e.g. one partitioned by category (see `OFFERS_PARTITION_KEY_PATHS`), as
+partition key of existing container can't be changed. Source container is read through its change feed, so the job
+can be run again to catch up with offers stored (or classified) in the meantime, right before
+`COSMOSDB_OFFERS_CONTAINER` is switched to the target container. Offers deleted from source container are not
+deleted from target container (change feed doesn't expose deletes).
+"""
+
+import os
+from typing import Any, cast
+
+from azure.core.paging import PageIterator
+
+from aerooffers.db import (
+    create_offers_container_if_not_exists,
+    lazy_database,
+    without_system_properties,
+)
+from aerooffers.db_stats import instrumented, process_stats
+from aerooffers.my_logging import logging
+from aerooffers.offers_db import get_lease, store_lease
+from aerooffers.utils import run_concurrently
+
+logger = logging.getLogger("migrate_offers_job")
+
+
+def migrate_offers(
+    target_container_id: str,
+    partition_key_path: str = "/category",
+    source_container_id: str = "offers",
+    max_concurrency: int = 8,
+) -> int:
+    """
+    :return: number of offers copied by this run (offers changed more than once since last run are copied once)
+    """
+    lease_id = f"migrate_offers:{source_container_id}:{target_container_id}"
+    source = instrumented(
+        lazy_database().get_container_client(container=source_container_id)
+    )
+    target = instrumented(
+        create_offers_container_if_not_exists(
+            container_id=target_container_id, partition_key_path=partition_key_path
+        )
+    )
+    logger.info(
+        f"Migrating offers from '{source_container_id}' to '{target_container_id}' partitioned by {partition_key_path}"
+    )
+
+    continuation = get_lease(lease_id)
+    if continuation is None:
+        changes = source.query_items_change_feed(start_time="Beginning")
+    else:
+        changes = source.query_items_change_feed(continuation=continuation)
+
+    def copy(document: dict[str, Any]) -> None:
+        target.upsert_item(without_system_properties(document))
+
+    offers_migrated = 0
+    # `by_page` is typed as plain iterator, but it's a page iterator exposing continuation of the last page read
+    pages = cast(PageIterator[dict[str, Any]], changes.by_page())
+    for page in pages:
+        documents = list(page)
+        outcomes = run_concurrently(copy, documents, max_concurrency)
+        errors = [outcome for outcome in outcomes if isinstance(outcome, Exception)]
+        if errors:
+            # lease is not moved, so next run copies this page again
+            raise Exception(f"Could not copy {len(errors)} offers") from errors[0]
+        offers_migrated += len(documents)
+
+        if pages.continuation_token is not None:
+            store_lease(lease_id, pages.continuation_token)
+        logger.info(f"Migrated {offers_migrated} offers so far")
+
+    logger.info(f"Finished migrating {offers_migrated} offers")
+    return offers_migrated
+
+
+if __name__ == "__main__":
+    from aerooffers.utils import load_env
+
+    load_env()
+
+    target_container_id = os.getenv("MIGRATION_TARGET_CONTAINER")
+    if not target_container_id:
+        raise ValueError("MIGRATION_TARGET_CONTAINER environment variable is required")
+
+    migrate_offers(
+        target_container_id,
+        partition_key_path=os.getenv("MIGRATION_PARTITION_KEY") or "/category",
+    )
+    process_stats.log_summary("Migrating offers cosmos usage")
@@ -0,0 +1,17 @@
+"""Recounts offers by category, manufacturer and model (see `offers_db.rebuild_facets`), after offers were updated."""
+
+from aerooffers.my_logging import logging
+from aerooffers.offers_db import rebuild_facets
+
+logger = logging.getLogger("rebuild_facets_job")
+
+if __name__ == "__main__":
+    from aerooffers.db_stats import process_stats
+    from aerooffers.utils import load_env
+
+    load_env()
+
+    logger.info("Rebuilding facets...")
+    facets = rebuild_facets()
+    logger.info(f"Facets rebuilt, {sum(facets.categories.values())} offers counted")
+    process_stats.log_summary("Rebuilding facets cosmos usage")
@@ -0,0 +1,30 @@
+"""Recomputes summaries of all models, e.g. after offers were reclassified or models were renamed in models.json."""
+
+from aerooffers.classifier.classifiers import load_all_models
+from aerooffers.my_logging import logging
+from aerooffers.offers_db import update_model_summaries
+
+logger = logging.getLogger("rebuild_model_summaries_job")
+
+
+def rebuild_model_summaries() -> int:
+    models = [
+        (manufacturer, model)
+        for manufacturer, manufacturer_info in load_all_models().items()
+        for category_models in manufacturer_info["models"].values()
+        for model in category_models
+    ]
+    logger.info(f"Rebuilding summaries of {len(models)} models...")
+    update_model_summaries(models)
+    logger.info("Model summaries rebuilt")
+    return len(models)
+
+
+if __name__ == "__main__":
+    from aerooffers.db_stats import process_stats
+    from aerooffers.utils import load_env
+
+    load_env()
+
+    rebuild_model_summaries()
+    process_stats.log_summary("Rebuilding model summaries cosmos usage")
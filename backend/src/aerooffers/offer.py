@@ -1,4 +1,5 @@
 import hashlib
+import json
 from dataclasses import dataclass
 from datetime import date
 from enum import auto, StrEnum
@@ -33,7 +34,7 @@ class OfferPageItem:
     exchange_rate: float | None = None  # e.g. 1.0
 
 
-@dataclass
+@dataclass(slots=True)
 class OfferPrice:
     amount: str
     currency: str
@@ -41,19 +42,54 @@ class OfferPrice:
     exchange_rate: float
 
 
-@dataclass
+@dataclass(slots=True)
 class Offer:
-    url: str
-    category: str
-    title: str
+    """Offer as presented by the api, fields not selected when querying offers (see `offers_db.get_offers`) are None."""
+
+    id: str
+    url: str | None
+    category: str | None
+    title: str | None
     published_at: date
-    location: str
-    hours: int
-    starts: int
-    price: OfferPrice
+    location: str | None
+    hours: int | None
+    starts: int | None
+    price: OfferPrice | None
+    manufacturer: str | None
+    model: str | None
+    spider: str | None
+    # id of the first stored offer of the same aircraft, e.g. on another portal
+    duplicate_of: str | None = None
+    # previous prices, each with the date it was changed at, oldest first
+    price_history: list[dict] | None = None
+
+
+@dataclass
+class ModelSummary:
+    """Market summary of all offers classified as given model, maintained when offers are classified."""
+
     manufacturer: str
     model: str
-    spider: str | None
+    offers_count: int
+    min_price_in_euro: str | None
+    median_price_in_euro: str | None
+    max_price_in_euro: str | None
+    newest_published_at: str | None
+    avg_hours: int | None
+    avg_starts: int | None
+
+
+@dataclass
+class Facets:
+    """
+    Numbers of offers (duplicates of offers of other portals not counted) by category, manufacturer and model, rebuilt
+    from all offers by `job_rebuild_facets`.
+    """
+
+    categories: dict[str, int]
+    manufacturers: dict[str, int]
+    models: dict[str, dict[str, int]]  # by manufacturer, then model
+    updated_at: str | None = None
 
 
 @dataclass(frozen=True)
@@ -61,6 +97,32 @@ class UnclassifiedOffer:
     id: str
     title: str
     category: AircraftCategory
+    # classification the offer had before it was unclassified, if any
+    manufacturer: str | None = None
+    model: str | None = None
+
+
+@dataclass(frozen=True)
+class ClassificationResult:
+    """Result of aircraft classification.
+
+    :param manufacturer: The manufacturer name or None
+    :param model: The model name or None
+    """
+
+    manufacturer: str | None
+    model: str | None
+
+    @classmethod
+    def unknown(cls) -> "ClassificationResult":
+        """Factory method to create an unknown classification result.
+
+        :return: ClassificationResult with all fields set to None
+        """
+        return cls(
+            manufacturer=None,
+            model=None,
+        )
 
 
 def url_to_id(url: str) -> str:
@@ -75,3 +137,24 @@ def url_to_id(url: str) -> str:
     enabling efficient lookups and preventing duplicates.
     """
     return hashlib.sha256(url.encode()).hexdigest()
+
+
+def offer_content_hash(offer: OfferPageItem) -> str:
+    """
+    Hash of parsed fields and page content of the offer, stored with it - so offer crawled again can be compared with
+    the stored one without reading (and writing) all its fields and page content.
+    """
+    content = json.dumps(
+        [
+            offer.category.name,
+            offer.title,
+            offer.published_at.isoformat(),
+            offer.price,
+            offer.currency,
+            offer.location,
+            offer.hours,
+            offer.starts,
+            offer.page_content,
+        ]
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
@@ -0,0 +1,128 @@
+"""
+Near-duplicate detection of offers, e.g. the same aircraft advertised on more than one portal (with different urls,
+thus different ids). Each offer gets a MinHash signature of its features (normalized title tokens, price, hours and
+location), signature is split into bands - offers sharing at least one band are candidates, compared by estimated
+similarity of their whole signatures. Bands are indexed, so finding candidates doesn't require scanning all offers.
+"""
+
+import hashlib
+import math
+import re
+import unicodedata
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+
+from aerooffers.offer import OfferPageItem
+
+NUM_PERMUTATIONS = 32
+BANDS = 8
+"""Bands of 4 rows each, offers with similarity above ~0.6 are likely to share at least one band."""
+
+DUPLICATE_SIMILARITY = 0.7
+"""Minimal estimated (Jaccard) similarity of offers to be considered duplicates."""
+
+_PRIME = (1 << 31) - 1
+"""Mersenne prime, signature values stay below 2^53 - so these survive JSON numbers (doubles) of Cosmos DB exactly."""
+
+
+def _hash(value: str) -> int:
+    """Stable across processes and runs, unlike built-in `hash`."""
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest())
+
+
+_PERMUTATIONS = [
+    (_hash(f"a{i}") % (_PRIME - 1) + 1, _hash(f"b{i}") % _PRIME)
+    for i in range(NUM_PERMUTATIONS)
+]
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    minhash: list[int]
+    bands: list[str]
+
+
+@dataclass(frozen=True)
+class DuplicateCandidate:
+    """Stored offer sharing at least one band with a new offer."""
+
+    id: str
+    minhash: list[int]
+    duplicate_of: str | None
+
+
+def offer_features(
+    title: str,
+    price: str | None = None,
+    hours: int | None = None,
+    location: str | None = None,
+) -> set[str]:
+    """Title words, with bucketed price and hours, and location words."""
+    features = set(_words(title))
+
+    try:
+        amount = float(price) if price is not None else 0
+    except ValueError:
+        amount = 0
+    if amount > 0:
+        # ~10% wide buckets, portals round prices differently
+        features.add(f"price:{round(math.log(amount, 1.1))}")
+    if hours is not None:
+        features.add(f"hours:{hours // 250}")
+    features.update(f"location:{word}" for word in _words(location or ""))
+    return features
+
+
+def _words(text: str) -> list[str]:
+    """Lowercase ascii words, letters and digits split (so `ASK21`, `ASK-21` and `ASK 21` have the same words)."""
+    ascii_text = (
+        unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+    )
+    return re.findall(r"[a-z]+|[0-9]+", ascii_text)
+
+
+def fingerprint(features: Iterable[str]) -> Fingerprint:
+    hashes = [_hash(feature) for feature in set(features)]
+    if len(hashes) == 0:
+        return Fingerprint(minhash=[], bands=[])
+
+    minhash = [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+    rows = NUM_PERMUTATIONS // BANDS
+    bands = [
+        f"{band}:{_hash(str(minhash[band * rows : (band + 1) * rows])):016x}"
+        for band in range(BANDS)
+    ]
+    return Fingerprint(minhash=minhash, bands=bands)
+
+
+def offer_fingerprint(offer: OfferPageItem) -> Fingerprint:
+    return fingerprint(
+        offer_features(
+            offer.title,
+            price=offer.price_in_euro or offer.price,
+            hours=offer.hours,
+            location=offer.location,
+        )
+    )
+
+
+def similarity(minhash: Sequence[int], other_minhash: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of features the signatures were computed from."""
+    if len(minhash) == 0 or len(minhash) != len(other_minhash):
+        return 0
+    matching = sum(1 for a, b in zip(minhash, other_minhash, strict=True) if a == b)
+    return matching / len(minhash)
+
+
+def find_duplicate(
+    new_fingerprint: Fingerprint, candidates: Iterable[DuplicateCandidate]
+) -> str | None:
+    """:return: id of the offer (first stored one of the group) the most similar candidate is a duplicate of, if any"""
+    best_similarity = DUPLICATE_SIMILARITY
+    duplicate_of = None
+    for candidate in candidates:
+        candidate_similarity = similarity(new_fingerprint.minhash, candidate.minhash)
+        if candidate_similarity >= best_similarity:
+            best_similarity = candidate_similarity
+            duplicate_of = candidate.duplicate_of or candidate.id
+    return duplicate_of
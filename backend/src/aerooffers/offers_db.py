@@ -1,96 +1,379 @@
-from datetime import datetime, UTC
-from typing import Any
+import base64
+import dataclasses
+import json
+import os
+import statistics
+from collections import Counter
+from collections.abc import Collection, Iterable, Iterator, Mapping, Sequence
+from datetime import date, datetime, UTC
+from decimal import Decimal
+from enum import auto, StrEnum
+from typing import Any, cast, Protocol
 
+from azure.core.paging import PageIterator
 from azure.cosmos.exceptions import CosmosResourceNotFoundError
 
-from aerooffers.db import offers_container
+from aerooffers.db import (
+    metadata_container,
+    offers_container,
+    offers_db_backend,
+    offers_partition_key_path,
+    without_system_properties,
+)
 from aerooffers.my_logging import logging
 from aerooffers.offer import (
     AircraftCategory,
+    ClassificationResult,
+    Facets,
+    ModelSummary,
     Offer,
+    offer_content_hash,
     OfferPageItem,
     OfferPrice,
     UnclassifiedOffer,
     url_to_id,
 )
+from aerooffers.offer_fingerprint import (
+    DuplicateCandidate,
+    find_duplicate,
+    Fingerprint,
+    offer_fingerprint,
+)
+from aerooffers.page_content_storage import store_archived_offer
+from aerooffers.query_cache import QueryCache
+from aerooffers.utils import run_concurrently
 
 logger = logging.getLogger("offers_db")
 
 
-def store_offer(offer: OfferPageItem, spider: str) -> str:
-    offer_id = url_to_id(offer.url)
+class RefreshOutcome(StrEnum):
+    """What happened to an offer crawled again, see `refresh_offer`."""
 
-    # Store offer WITHOUT page_content
-    offers_container().upsert_item(
-        dict(
-            id=offer_id,
-            spider=spider,
-            category=offer.category.name,
-            url=offer.url,
-            title=offer.title,
-            published_at=offer.published_at.isoformat(),
-            indexed_at=datetime.now(UTC).isoformat(),
-            price=dict(
-                amount=offer.price,
-                currency=offer.currency,
-                amount_in_euro=offer.price_in_euro,
-                exchange_rate=offer.exchange_rate,
-            ),
-            location=offer.location,
-            hours=offer.hours,
-            starts=offer.starts,
-            classified=False,
-            manufacturer=None,
-            model=None,
+    stored = auto()
+    updated = auto()
+    unchanged = auto()
+
+
+REFRESHED_FIELDS = ("title", "published_at", "price", "location", "hours", "starts")
+"""Fields of offer document updated when offer crawled again has changed (other fields are not parsed from its page)."""
+
+SUMMARIZED_FIELDS = ("published_at", "price", "hours", "starts")
+"""Refreshed fields the summary of offer's model is computed from (see `summarize_model_offers`)."""
+
+
+@dataclasses.dataclass(frozen=True)
+class OfferRefresh:
+    """Result of `OffersRepository.update_changed_offer` for an offer already stored."""
+
+    outcome: RefreshOutcome
+    manufacturer: str | None = None
+    model: str | None = None
+    summarized_fields_changed: bool = False
+
+
+class OffersRepository(Protocol):
+    """Storage of offers, see module level functions of the same names for details."""
+
+    def store_offer(
+        self,
+        offer: OfferPageItem,
+        spider: str,
+        fingerprint: Fingerprint | None = None,
+        duplicate_of: str | None = None,
+    ) -> str: ...
+
+    def duplicate_candidates(
+        self, bands: Sequence[str], spider: str
+    ) -> list[DuplicateCandidate]: ...
+
+    def update_changed_offer(
+        self, offer: OfferPageItem, content_hash: str
+    ) -> OfferRefresh | None: ...
+
+    def classify_offer(
+        self,
+        offer_id: str,
+        classifier_name: str,
+        manufacturer: str | None = None,
+        model: str | None = None,
+        category: AircraftCategory | None = None,
+        previous_model: tuple[str | None, str | None] | None = None,
+    ) -> tuple[str | None, str | None]: ...
+
+    def unclassify_offer(
+        self, offer_id: str, category: AircraftCategory | None = None
+    ) -> tuple[str | None, str | None]: ...
+
+    def offer_url_exists(self, url: str) -> bool: ...
+
+    def existing_offer_ids(self, urls: Iterable[str]) -> set[str]: ...
+
+    def get_offer_ids(self, url_prefix: str) -> set[str]: ...
+
+    def get_archived_offer_ids(self, url_prefix: str) -> set[str]: ...
+
+    def get_offers(
+        self,
+        offset: int = 0,
+        limit: int = 30,
+        category: AircraftCategory | None = None,
+        manufacturer: str | None = None,
+        model: str | None = None,
+        cursor: str | None = None,
+        fields: Collection[str] | None = None,
+        collapse_duplicates: bool = False,
+    ) -> list[Offer]: ...
+
+    def iter_offers(
+        self,
+        offset: int = 0,
+        limit: int = 30,
+        category: AircraftCategory | None = None,
+        manufacturer: str | None = None,
+        model: str | None = None,
+        cursor: str | None = None,
+        fields: Collection[str] | None = None,
+        collapse_duplicates: bool = False,
+        page_size: int = 100,
+    ) -> Iterator[Offer]: ...
+
+    def get_unclassified_offers(self, limit: int = 100) -> list[UnclassifiedOffer]: ...
+
+    def archive_offers(
+        self, published_before: date, limit: int = 100
+    ) -> list[tuple[str | None, str | None]]: ...
+
+    def get_model_summary(
+        self, manufacturer: str, model: str
+    ) -> ModelSummary | None: ...
+
+    def update_model_summary(self, manufacturer: str, model: str) -> ModelSummary: ...
+
+    def get_facets(self) -> Facets | None: ...
+
+    def rebuild_facets(self) -> Facets: ...
+
+
+_repository: OffersRepository | None = None
+
+
+def repository() -> OffersRepository:
+    """
+    Offers repository selected with `OFFERS_DB` env variable: `cosmos` (default) or `sqlite` - stored in a local file
+    given by `OFFERS_DB_SQLITE_PATH`, or in memory of the process if the path is not set.
+    """
+    global _repository
+    if _repository is not None:
+        return _repository
+
+    backend = offers_db_backend()
+    if backend == "cosmos":
+        _repository = CosmosOffersRepository()
+    elif backend == "sqlite":
+        from aerooffers.sqlite_offers_db import SqliteOffersRepository
+
+        _repository = SqliteOffersRepository(
+            os.getenv("OFFERS_DB_SQLITE_PATH") or ":memory:"
         )
-    )
+    else:
+        raise ValueError(f"Unsupported OFFERS_DB: {backend}")
+
+    logger.info(f"Using {type(_repository).__name__}")
+    return _repository
+
+
+def store_offer(offer: OfferPageItem, spider: str, new: bool = False) -> str:
+    """
+    Offer is linked to an offer of another portal it is a near-duplicate of, if there is one (see `offer_fingerprint`).
+    Offer already stored is updated as by `refresh_offer` instead - keeping its classification, duplicate link and
+    price history, without looking for duplicates again.
 
+    :param new: offer is known not to be stored yet (e.g. spiders skip stored offers, see `existing_offer_ids`) - saves
+                reading it first
+    :return: id of stored offer (see `url_to_id`)
+    """
+    if new:
+        return _store_new_offer(offer, spider)
+    refresh_offer(offer, spider)
+    return url_to_id(offer.url)
+
+
+def _store_new_offer(offer: OfferPageItem, spider: str) -> str:
+    fingerprint = offer_fingerprint(offer)
+    duplicate_of = None
+    if len(fingerprint.bands) > 0:
+        try:
+            candidates = repository().duplicate_candidates(fingerprint.bands, spider)
+            duplicate_of = find_duplicate(fingerprint, candidates)
+        except Exception as e:
+            logger.warning("Could not look for duplicates of %s: %s", offer.url, e)
+    offer_id = repository().store_offer(offer, spider, fingerprint, duplicate_of)
+    offers_query_cache.invalidate()
     return offer_id
 
 
+def store_offers(
+    offers: Sequence[OfferPageItem],
+    spider: str,
+    max_concurrency: int = 8,
+    new: bool = False,
+) -> list[str | Exception]:
+    """
+    Store many offers at once, with concurrent upserts (transactional batches are not an option, as they are limited
+    to a single partition, which is a single offer here).
+
+    :param new: offers are known not to be stored yet (see `store_offer`)
+    :return: id of stored offer, or error why it could not be stored - for each offer, in the same order
+    """
+    return run_concurrently(
+        lambda offer: store_offer(offer, spider, new), offers, max_concurrency
+    )
+
+
+def refresh_offer(offer: OfferPageItem, spider: str) -> RefreshOutcome:
+    """
+    Store offer crawled again: new offer is stored (see `store_offer`), already stored one is updated only if its
+    content hash (see `offer_content_hash`) differs - with changed fields and fingerprint only, and previous price
+    appended to its price history if the price has changed. Unchanged offer costs a single point read. Summary of the
+    model of the offer is updated if fields it is computed from have changed.
+    """
+    refresh = repository().update_changed_offer(offer, offer_content_hash(offer))
+    if refresh is None:
+        _store_new_offer(offer, spider)
+        return RefreshOutcome.stored
+    if refresh.outcome == RefreshOutcome.updated:
+        offers_query_cache.invalidate()
+    if refresh.summarized_fields_changed:
+        update_model_summaries(_known_models([(refresh.manufacturer, refresh.model)]))
+    return refresh.outcome
+
+
+def refresh_offers(
+    offers: Sequence[OfferPageItem], spider: str, max_concurrency: int = 8
+) -> list[RefreshOutcome | Exception]:
+    """Same as `store_offers`, but with `refresh_offer`."""
+    return run_concurrently(
+        lambda offer: refresh_offer(offer, spider), offers, max_concurrency
+    )
+
+
 def classify_offer(
     offer_id: str,
     classifier_name: str,
     manufacturer: str | None = None,
     model: str | None = None,
+    category: AircraftCategory | None = None,
 ) -> None:
-    operations: list[dict[str, Any]] = [
-        dict(op="replace", path="/classified", value=True),
-        dict(op="replace", path="/manufacturer", value=manufacturer),
-        dict(op="replace", path="/model", value=model),
-        dict(op="add", path="/classifier_name", value=classifier_name),
-    ]
+    """
+    Summaries of both the model the offer was classified as before (if any) and the new one are updated.
 
-    offers_container().patch_item(
-        partition_key=offer_id, item=offer_id, patch_operations=operations
+    :param category: category of the offer if known, saves looking it up when offers are partitioned by category
+    """
+    previous_model = repository().classify_offer(
+        offer_id, classifier_name, manufacturer, model, category
     )
+    offers_query_cache.invalidate()
+    update_model_summaries(_known_models([previous_model, (manufacturer, model)]))
+
 
+def _known_models(
+    models: Iterable[tuple[str | None, str | None]],
+) -> set[tuple[str, str]]:
+    return {
+        (manufacturer, model)
+        for manufacturer, model in models
+        if manufacturer is not None and model is not None
+    }
+
+
+def classify_offers_bulk(
+    results: Mapping[str, ClassificationResult],
+    classifier_name: str,
+    max_concurrency: int = 8,
+    categories: Mapping[str, AircraftCategory] | None = None,
+    previous_models: Mapping[str, tuple[str | None, str | None]] | None = None,
+    touched_models: set[tuple[str, str]] | None = None,
+) -> dict[str, Exception | None]:
+    """
+    Persist classification results of many offers at once, with concurrent patches (one per offer, as patches can't
+    span partitions).
 
-def unclassify_offer(offer_id: str) -> None:
-    """Set classified flag to false for an offer."""
-    operations: list[dict[str, Any]] = [
-        dict(op="replace", path="/classified", value=False),
-    ]
+    :param results: classification result by offer id
+    :param categories: category by offer id, if known (see `classify_offer`)
+    :param previous_models: manufacturer and model by offer id, if known (see `UnclassifiedOffer`) - saves reading
+                            each offer before its patch
+    :param touched_models: if given, models with outdated summaries are added to it instead of being updated - so a job
+                           classifying many batches updates each of them once (see `update_model_summaries`)
+    :return: None if offer was classified, or error why it could not be - by offer id
+    """
+    offer_ids = list(results.keys())
+    outcomes = run_concurrently(
+        lambda offer_id: repository().classify_offer(
+            offer_id=offer_id,
+            classifier_name=classifier_name,
+            manufacturer=results[offer_id].manufacturer,
+            model=results[offer_id].model,
+            category=categories.get(offer_id) if categories is not None else None,
+            previous_model=previous_models.get(offer_id)
+            if previous_models is not None
+            else None,
+        ),
+        offer_ids,
+        max_concurrency,
+    )
+    offers_query_cache.invalidate()
 
-    offers_container().patch_item(
-        partition_key=offer_id, item=offer_id, patch_operations=operations
+    errors = {
+        offer_id: outcome if isinstance(outcome, Exception) else None
+        for offer_id, outcome in zip(offer_ids, outcomes, strict=True)
+    }
+    # summary of each model is recomputed once per batch (or per job), no matter how many of its offers were classified
+    # (or were classified as it before)
+    models = _known_models(
+        [
+            (results[offer_id].manufacturer, results[offer_id].model)
+            for offer_id in offer_ids
+            if errors[offer_id] is None
+        ]
+        + [outcome for outcome in outcomes if not isinstance(outcome, Exception)]
     )
+    if touched_models is not None:
+        touched_models.update(models)
+    else:
+        update_model_summaries(models)
+    return errors
+
+
+def unclassify_offer(offer_id: str, category: AircraftCategory | None = None) -> None:
+    """Set classified flag to false for an offer, it is still listed as its model until classified again."""
+    model = repository().unclassify_offer(offer_id, category)
+    offers_query_cache.invalidate()
+    update_model_summaries(_known_models([model]))
 
 
 def offer_url_exists(url: str) -> bool:
+    return repository().offer_url_exists(url)
+
+
+def existing_offer_ids(urls: Iterable[str]) -> set[str]:
     """
-    Check if an offer with the given URL exists using a fast point read.
-    Uses a deterministic ID derived from the URL for optimal performance.
+    Return ids (see `url_to_id`) of offers already stored for any of the given urls, with a single db call instead of
+    one `offer_url_exists` round-trip per url.
     """
-    try:
-        offer_id = url_to_id(url)
-        offers_container().read_item(item=offer_id, partition_key=offer_id)
-        return True
-    except CosmosResourceNotFoundError:
-        return False
-    except Exception as e:
-        logger.error("database error, assuming we don't have this offer yet", e)
-        return False
+    return repository().existing_offer_ids(urls)
+
+
+def get_offer_ids(url_prefix: str) -> set[str]:
+    """Return ids of all stored offers with url starting with given prefix (e.g. all offers of one portal)."""
+    return repository().get_offer_ids(url_prefix)
+
+
+def get_archived_offer_ids(url_prefix: str) -> set[str]:
+    """
+    Return ids of archived offers (see `archive_offers`) with url starting with given prefix, so spiders can skip old
+    offers the portal still lists, instead of storing and archiving them again.
+    """
+    return repository().get_archived_offer_ids(url_prefix)
 
 
 def get_offers(
@@ -99,77 +382,885 @@ def get_offers(
     category: AircraftCategory | None = None,
     manufacturer: str | None = None,
     model: str | None = None,
+    cursor: str | None = None,
+    fields: Collection[str] | None = None,
+    collapse_duplicates: bool = False,
 ) -> list[Offer]:
-    query = "SELECT * FROM offers o "
-    params: list[dict[str, object]] = []
+    """
+    Return offers ordered from the newest ones.
 
-    where = list()
-    if category is not None:
-        where.append("o.category = @category")
-        params.append(dict(name="@category", value=category.name))
-    else:
-        where.append("o.category != null")
-
-    if manufacturer is not None:
-        where.append("o.manufacturer = @manufacturer")
-        params.append(dict(name="@manufacturer", value=manufacturer))
-
-    if model is not None:
-        where.append("o.model = @model")
-        params.append(dict(name="@model", value=model))
-
-    if len(where) > 0:
-        query += "WHERE " + " AND ".join(where) + " "
-
-    query += "ORDER BY o.published_at DESC "
-
-    query += "OFFSET @offset LIMIT @limit"
-    params.append(dict(name="@offset", value=offset))
-    params.append(dict(name="@limit", value=limit))
-
-    db_offers = offers_container().query_items(
-        query=query, parameters=params, enable_cross_partition_query=True
-    )
-    return list(
-        map(
-            lambda db_offer: Offer(
-                url=db_offer["url"],
-                category=db_offer["category"],
-                title=db_offer["title"],
-                published_at=db_offer["published_at"],
-                price=OfferPrice(
-                    amount=db_offer["price"]["amount"],
-                    currency=db_offer["price"]["currency"],
-                    amount_in_euro=db_offer["price"]["amount_in_euro"],
-                    exchange_rate=db_offer["price"]["exchange_rate"],
-                ),
-                hours=db_offer["hours"],
-                starts=db_offer["starts"],
-                location=db_offer["location"],
-                manufacturer=db_offer["manufacturer"],
-                model=db_offer["model"],
-                spider=db_offer.get("spider"),
+    :param cursor: opaque cursor (see `offers_cursor`) - only offers after the one it points to are returned. Unlike
+                   `offset`, cost of fetching next page with cursor doesn't grow with the number of preceding offers.
+    :param fields: names of `Offer` fields to fetch, others are None in returned offers (`id` and `published_at` are
+                   always fetched, as pagination relies on them). All fields are fetched by default.
+    :param collapse_duplicates: skip offers which are duplicates of another offer (see `offer_fingerprint`), so each
+                                aircraft is returned once, as its first stored offer
+    """
+    return repository().get_offers(
+        offset=offset,
+        limit=limit,
+        category=category,
+        manufacturer=manufacturer,
+        model=model,
+        cursor=cursor,
+        fields=fields,
+        collapse_duplicates=collapse_duplicates,
+    )
+
+
+def iter_offers(
+    offset: int = 0,
+    limit: int = 30,
+    category: AircraftCategory | None = None,
+    manufacturer: str | None = None,
+    model: str | None = None,
+    cursor: str | None = None,
+    fields: Collection[str] | None = None,
+    collapse_duplicates: bool = False,
+    page_size: int = 100,
+) -> Iterator[Offer]:
+    """
+    Same as `get_offers`, but offers are fetched lazily, `page_size` at a time, as the caller iterates - so the first
+    offers are available right away and only one page is held in memory, no matter how large `limit` is.
+    """
+    return repository().iter_offers(
+        offset=offset,
+        limit=limit,
+        category=category,
+        manufacturer=manufacturer,
+        model=model,
+        cursor=cursor,
+        fields=fields,
+        collapse_duplicates=collapse_duplicates,
+        page_size=page_size,
+    )
+
+
+offers_query_cache = QueryCache[list[Offer]](
+    max_entries=int(os.getenv("OFFERS_CACHE_MAX_ENTRIES") or 1000),
+    ttl=float(os.getenv("OFFERS_CACHE_TTL") or 300),
+)
+"""Results of `get_cached_offers`, invalidated by writes of this process, writes of others are visible after ttl."""
+
+
+def get_cached_offers(
+    offset: int = 0,
+    limit: int = 30,
+    category: AircraftCategory | None = None,
+    manufacturer: str | None = None,
+    model: str | None = None,
+    cursor: str | None = None,
+    fields: Collection[str] | None = None,
+    collapse_duplicates: bool = False,
+) -> list[Offer]:
+    """Same as `get_offers`, served from `offers_query_cache` if the same query was made recently."""
+    key = (
+        offset,
+        limit,
+        category,
+        manufacturer,
+        model,
+        cursor,
+        tuple(sorted(set(fields))) if fields is not None else None,
+        collapse_duplicates,
+    )
+    return offers_query_cache.get_or_load(
+        key,
+        lambda: get_offers(
+            offset=offset,
+            limit=limit,
+            category=category,
+            manufacturer=manufacturer,
+            model=model,
+            cursor=cursor,
+            fields=fields,
+            collapse_duplicates=collapse_duplicates,
+        ),
+    )
+
+
+def get_unclassified_offers(limit: int = 100) -> list[UnclassifiedOffer]:
+    return repository().get_unclassified_offers(limit)
+
+
+def archive_offers(published_before: date, batch_size: int = 100) -> int:
+    """
+    Move offers published before given date out of the offers container (to blob storage, or to archive table of
+    SQLite), so queries only touch offers of the live market - their cost doesn't grow with the age of the project.
+    Ids of archived offers are kept (see `get_archived_offer_ids`). Offers linked as duplicates (see `offer_fingerprint`) of archived ones are unlinked, summaries of models of
+    archived offers are updated.
+
+    :return: number of archived offers
+    """
+    archived_offers = 0
+    archived_models: set[tuple[str, str]] = set()
+    while True:
+        batch = repository().archive_offers(published_before, limit=batch_size)
+        if len(batch) == 0:
+            break
+        archived_offers += len(batch)
+        archived_models.update(
+            (manufacturer, model)
+            for manufacturer, model in batch
+            if manufacturer is not None and model is not None
+        )
+        offers_query_cache.invalidate()
+        logger.info(f"Archived {archived_offers} offers so far")
+
+    update_model_summaries(archived_models)
+    return archived_offers
+
+
+def get_model_summary(manufacturer: str, model: str) -> ModelSummary | None:
+    """:return: summary of model offers (see `update_model_summary`), None if no offer was classified as this model yet"""
+    return repository().get_model_summary(manufacturer, model)
+
+
+def update_model_summary(manufacturer: str, model: str) -> ModelSummary:
+    """
+    Recompute summary from all offers of the model (duplicates of offers of other portals not counted, same as in
+    facets) and store it, so it can be read at constant cost. Called for models of classified offers, summaries of all
+    models can be rebuilt with `job_rebuild_model_summaries`.
+    """
+    return repository().update_model_summary(manufacturer, model)
+
+
+def update_model_summaries(models: Iterable[tuple[str, str]]) -> None:
+    """Update summaries of given (manufacturer, model) pairs, failures are logged only, rebuild job recovers them."""
+    for manufacturer, model in models:
+        try:
+            update_model_summary(manufacturer, model)
+        except Exception as e:
+            logger.error(
+                "Could not update summary of '%s' '%s': %s", manufacturer, model, e
+            )
+
+
+def summarize_model_offers(
+    manufacturer: str, model: str, offers: Iterable[Mapping[str, Any]]
+) -> ModelSummary:
+    """:param offers: `amount_in_euro`, `published_at`, `hours` and `starts` of each offer of the model"""
+    prices: list[Decimal] = []
+    published_ats: list[str] = []
+    hours: list[int] = []
+    starts: list[int] = []
+    for offer in offers:
+        try:
+            prices.append(Decimal(offer.get("amount_in_euro")))  # type: ignore[arg-type]
+        except (TypeError, ArithmeticError):
+            pass  # price unknown or not converted to EUR
+        if offer.get("published_at"):
+            published_ats.append(offer["published_at"])
+        if isinstance(offer.get("hours"), int):
+            hours.append(offer["hours"])
+        if isinstance(offer.get("starts"), int):
+            starts.append(offer["starts"])
+
+    def _price(price: Decimal) -> str:
+        return str(price.quantize(Decimal("0.01")))
+
+    return ModelSummary(
+        manufacturer=manufacturer,
+        model=model,
+        offers_count=len(published_ats),
+        min_price_in_euro=_price(min(prices)) if prices else None,
+        median_price_in_euro=_price(statistics.median(prices)) if prices else None,
+        max_price_in_euro=_price(max(prices)) if prices else None,
+        newest_published_at=max(published_ats) if published_ats else None,
+        avg_hours=round(statistics.mean(hours)) if hours else None,
+        avg_starts=round(statistics.mean(starts)) if starts else None,
+    )
+
+
+def get_facets() -> Facets:
+    """:return: numbers of offers (see `rebuild_facets`), all empty if these were not counted yet"""
+    facets = repository().get_facets()
+    if facets is None:
+        return Facets(categories={}, manufacturers={}, models={})
+    return facets
+
+
+def rebuild_facets() -> Facets:
+    """
+    Count offers by category, manufacturer and model in one pass over all offers and store the counts, so they can be
+    read at constant cost. Counts are not maintained by each store or classification, as neither tells what the offer
+    was counted as before (re-stored offer, reclassified offer) - these would drift.
+    """
+    return repository().rebuild_facets()
+
+
+def count_facets(offers: Iterable[Mapping[str, Any]]) -> Facets:
+    """:param offers: `category`, `manufacturer` and `model` of each offer, with `offers` count if grouped already"""
+    categories: Counter[str] = Counter()
+    manufacturers: Counter[str] = Counter()
+    models: dict[str, Counter[str]] = {}
+    for offer in offers:
+        count = offer.get("offers", 1)
+        if offer.get("category"):
+            categories[offer["category"]] += count
+        manufacturer = offer.get("manufacturer")
+        if manufacturer:
+            manufacturers[manufacturer] += count
+            if offer.get("model"):
+                models.setdefault(manufacturer, Counter())[offer["model"]] += count
+    return Facets(
+        categories=dict(categories),
+        manufacturers=dict(manufacturers),
+        models={manufacturer: dict(counts) for manufacturer, counts in models.items()},
+        updated_at=datetime.now(UTC).isoformat(),
+    )
+
+
+class CosmosOffersRepository:
+    """
+    Offers stored in Cosmos DB offers container (see `db.py`), one document per offer. Container is partitioned either
+    by id (point operations only need the id, every list query fans out to all partitions) or by category (queries of
+    a single category are served by a single partition, point operations need category or look it up).
+    """
+
+    def store_offer(
+        self,
+        offer: OfferPageItem,
+        spider: str,
+        fingerprint: Fingerprint | None = None,
+        duplicate_of: str | None = None,
+    ) -> str:
+        offer_id = url_to_id(offer.url)
+
+        # Store offer WITHOUT page_content
+        offers_container().upsert_item(
+            _to_document(offer_id, offer, spider, fingerprint, duplicate_of)
+        )
+
+        return offer_id
+
+    def duplicate_candidates(
+        self, bands: Sequence[str], spider: str
+    ) -> list[DuplicateCandidate]:
+        """Offers of other spiders sharing any of the bands, served by index of `lsh_bands`."""
+        params: list[dict[str, object]] = [dict(name="@spider", value=spider)]
+        band_conditions = []
+        for i, band in enumerate(bands):
+            band_conditions.append(f"ARRAY_CONTAINS(o.lsh_bands, @band{i})")
+            params.append(dict(name=f"@band{i}", value=band))
+        # conditions consist of parameter names only
+        query = (
+            "SELECT o.id, o.minhash, o.duplicate_of FROM offers o "  # noqa: S608
+            f"WHERE o.spider != @spider AND ({' OR '.join(band_conditions)})"
+        )
+        db_candidates = offers_container().query_items(
+            query=query, parameters=params, enable_cross_partition_query=True
+        )
+        return [
+            DuplicateCandidate(
+                id=candidate["id"],
+                minhash=candidate["minhash"],
+                duplicate_of=candidate.get("duplicate_of"),
+            )
+            for candidate in db_candidates
+        ]
+
+    def update_changed_offer(
+        self, offer: OfferPageItem, content_hash: str
+    ) -> OfferRefresh | None:
+        """:return: None if offer is not stored yet"""
+        offer_id = url_to_id(offer.url)
+        partition_key = (
+            offer_id if offers_partition_key_path() == "/id" else offer.category.name
+        )
+        try:
+            stored = offers_container().read_item(
+                item=offer_id, partition_key=partition_key
+            )
+        except CosmosResourceNotFoundError:
+            return None
+        if stored.get("content_hash") == content_hash:
+            return OfferRefresh(RefreshOutcome.unchanged)
+
+        refreshed = _to_document(
+            offer_id, offer, stored.get("spider") or "unknown", offer_fingerprint(offer)
+        )
+        changed_fields = [
+            field for field in REFRESHED_FIELDS if stored.get(field) != refreshed[field]
+        ]
+        operations: list[dict[str, Any]] = [
+            dict(op="set", path=f"/{field}", value=refreshed[field])
+            for field in changed_fields
+        ]
+        if stored.get("price") is not None and stored["price"] != refreshed["price"]:
+            price_history = stored.get("price_history") or []
+            operations.append(
+                dict(
+                    op="set",
+                    path="/price_history",
+                    value=[
+                        *price_history,
+                        price_history_entry(stored["price"]),
+                    ],
+                )
+            )
+        # fingerprint is computed from (some of) the refreshed fields, so it may have changed too
+        operations.extend(
+            dict(op="set", path=f"/{field}", value=refreshed[field])
+            for field in ("minhash", "lsh_bands")
+            if stored.get(field) != refreshed[field]
+        )
+        # content hash is set by the last patch, so offer is refreshed again if any of the patches fails
+        operations.append(
+            dict(op="set", path="/refreshed_at", value=datetime.now(UTC).isoformat())
+        )
+        operations.append(dict(op="set", path="/content_hash", value=content_hash))
+        # Cosmos DB allows at most 10 operations per patch
+        for first in range(0, len(operations), 10):
+            offers_container().patch_item(
+                partition_key=partition_key,
+                item=offer_id,
+                patch_operations=operations[first : first + 10],
+            )
+        return OfferRefresh(
+            RefreshOutcome.updated,
+            manufacturer=stored.get("manufacturer"),
+            model=stored.get("model"),
+            summarized_fields_changed=any(
+                field in SUMMARIZED_FIELDS for field in changed_fields
             ),
-            db_offers,
         )
+
+    def classify_offer(
+        self,
+        offer_id: str,
+        classifier_name: str,
+        manufacturer: str | None = None,
+        model: str | None = None,
+        category: AircraftCategory | None = None,
+        previous_model: tuple[str | None, str | None] | None = None,
+    ) -> tuple[str | None, str | None]:
+        operations: list[dict[str, Any]] = [
+            dict(op="replace", path="/classified", value=True),
+            dict(op="replace", path="/manufacturer", value=manufacturer),
+            dict(op="replace", path="/model", value=model),
+            dict(op="add", path="/classifier_name", value=classifier_name),
+        ]
+
+        partition_key = self._partition_key(offer_id, category)
+        if previous_model is None:
+            # patch returns the document after the change only, previous classification is read first (a point read)
+            previous = offers_container().read_item(
+                item=offer_id, partition_key=partition_key
+            )
+            previous_model = previous.get("manufacturer"), previous.get("model")
+        offers_container().patch_item(
+            partition_key=partition_key,
+            item=offer_id,
+            patch_operations=operations,
+        )
+        return previous_model
+
+    def unclassify_offer(
+        self, offer_id: str, category: AircraftCategory | None = None
+    ) -> tuple[str | None, str | None]:
+        operations: list[dict[str, Any]] = [
+            dict(op="replace", path="/classified", value=False),
+        ]
+
+        document = offers_container().patch_item(
+            partition_key=self._partition_key(offer_id, category),
+            item=offer_id,
+            patch_operations=operations,
+        )
+        return document.get("manufacturer"), document.get("model")
+
+    def _partition_key(self, offer_id: str, category: AircraftCategory | None) -> str:
+        if offers_partition_key_path() == "/id":
+            return offer_id
+        if category is not None:
+            return category.name
+
+        query = "SELECT VALUE o.category FROM offers o WHERE o.id = @id"
+        params: list[dict[str, object]] = [dict(name="@id", value=offer_id)]
+        categories = list(
+            offers_container().query_items(
+                query=query, parameters=params, enable_cross_partition_query=True
+            )
+        )
+        if len(categories) == 0:
+            raise CosmosResourceNotFoundError(message=f"Offer {offer_id} not found")
+        return cast(str, categories[0])
+
+    def offer_url_exists(self, url: str) -> bool:
+        """
+        Check if an offer with the given URL exists using a fast point read.
+        Uses a deterministic ID derived from the URL for optimal performance.
+        """
+        if offers_partition_key_path() != "/id":
+            return len(self.existing_offer_ids([url])) > 0
+
+        try:
+            offer_id = url_to_id(url)
+            offers_container().read_item(item=offer_id, partition_key=offer_id)
+            return True
+        except CosmosResourceNotFoundError:
+            return False
+        except Exception as e:
+            logger.error("database error, assuming we don't have this offer yet", e)
+            return False
+
+    def existing_offer_ids(self, urls: Iterable[str]) -> set[str]:
+        """Uses a single batched point read, or a single query when offers are not partitioned by id."""
+        offer_ids = {url_to_id(url) for url in urls}
+        if len(offer_ids) == 0:
+            return set()
+
+        try:
+            stored_offers: Iterable[dict[str, Any]]
+            if offers_partition_key_path() == "/id":
+                stored_offers = offers_container().read_items(
+                    items=[(offer_id, offer_id) for offer_id in offer_ids]
+                )
+            else:
+                stored_offers = offers_container().query_items(
+                    query="SELECT o.id FROM offers o WHERE ARRAY_CONTAINS(@ids, o.id)",
+                    parameters=[dict(name="@ids", value=list(offer_ids))],
+                    enable_cross_partition_query=True,
+                )
+            return {stored_offer["id"] for stored_offer in stored_offers}
+        except Exception as e:
+            logger.error(
+                "database error, assuming we don't have these offers yet: %s", e
+            )
+            return set()
+
+    def get_offer_ids(self, url_prefix: str) -> set[str]:
+        query = "SELECT o.id FROM offers o WHERE STARTSWITH(o.url, @url_prefix)"
+        params: list[dict[str, object]] = [dict(name="@url_prefix", value=url_prefix)]
+        result_set = offers_container().query_items(
+            query=query,
+            parameters=params,
+            enable_cross_partition_query=True,
+            max_item_count=1000,
+        )
+        # ids are streamed page by page straight into the set, without materializing whole result set first
+        return {result["id"] for result in result_set}
+
+    def get_archived_offer_ids(self, url_prefix: str) -> set[str]:
+        query = (
+            "SELECT m.offer_id FROM metadata m "
+            "WHERE m.type = 'archived_offer' AND STARTSWITH(m.url, @url_prefix)"
+        )
+        params: list[dict[str, object]] = [dict(name="@url_prefix", value=url_prefix)]
+        result_set = metadata_container().query_items(
+            query=query,
+            parameters=params,
+            enable_cross_partition_query=True,
+            max_item_count=1000,
+        )
+        return {result["offer_id"] for result in result_set}
+
+    def get_offers(
+        self,
+        offset: int = 0,
+        limit: int = 30,
+        category: AircraftCategory | None = None,
+        manufacturer: str | None = None,
+        model: str | None = None,
+        cursor: str | None = None,
+        fields: Collection[str] | None = None,
+        collapse_duplicates: bool = False,
+    ) -> list[Offer]:
+        return list(
+            self.iter_offers(
+                offset=offset,
+                limit=limit,
+                category=category,
+                manufacturer=manufacturer,
+                model=model,
+                cursor=cursor,
+                fields=fields,
+                collapse_duplicates=collapse_duplicates,
+                # whole result is materialized anyway, so in as few round-trips as possible
+                page_size=max(limit, 1),
+            )
+        )
+
+    def iter_offers(
+        self,
+        offset: int = 0,
+        limit: int = 30,
+        category: AircraftCategory | None = None,
+        manufacturer: str | None = None,
+        model: str | None = None,
+        cursor: str | None = None,
+        fields: Collection[str] | None = None,
+        collapse_duplicates: bool = False,
+        page_size: int = 100,
+    ) -> Iterator[Offer]:
+        # projection consists of whitelisted field names only
+        projection = ", ".join(f"o.{field}" for field in selected_offer_fields(fields))
+        query = f"SELECT {projection} FROM offers o "  # noqa: S608
+        params: list[dict[str, object]] = []
+
+        where = list()
+        if category is not None:
+            where.append("o.category = @category")
+            params.append(dict(name="@category", value=category.name))
+        else:
+            where.append("o.category != null")
+
+        if collapse_duplicates:
+            # offers stored before duplicates were detected have no `duplicate_of` at all
+            where.append("NOT IS_STRING(o.duplicate_of)")
+
+        if manufacturer is not None:
+            where.append("o.manufacturer = @manufacturer")
+            params.append(dict(name="@manufacturer", value=manufacturer))
+
+        if model is not None:
+            where.append("o.model = @model")
+            params.append(dict(name="@model", value=model))
+
+        if cursor is not None:
+            (cursor_published_at, cursor_id) = decode_offers_cursor(cursor)
+            where.append(
+                "(o.published_at < @cursor_published_at "
+                "OR (o.published_at = @cursor_published_at AND o.id < @cursor_id))"
+            )
+            params.append(dict(name="@cursor_published_at", value=cursor_published_at))
+            params.append(dict(name="@cursor_id", value=cursor_id))
+
+        if len(where) > 0:
+            query += "WHERE " + " AND ".join(where) + " "
+
+        # id makes the order deterministic for offers published on the same day, which keyset pagination relies on
+        query += "ORDER BY o.published_at DESC, o.id DESC "
+
+        query += "OFFSET @offset LIMIT @limit"
+        params.append(dict(name="@offset", value=offset))
+        params.append(dict(name="@limit", value=limit))
+
+        # query results are paged lazily, next page is requested only once the previous one was consumed
+        if category is not None and offers_partition_key_path() == "/category":
+            db_offers = offers_container().query_items(
+                query=query,
+                parameters=params,
+                partition_key=category.name,
+                max_item_count=page_size,
+            )
+        else:
+            db_offers = offers_container().query_items(
+                query=query,
+                parameters=params,
+                enable_cross_partition_query=True,
+                max_item_count=page_size,
+            )
+        return (_to_offer(db_offer) for db_offer in db_offers)
+
+    def get_unclassified_offers(self, limit: int = 100) -> list[UnclassifiedOffer]:
+        query = (
+            "SELECT o.id, o.title, o.category, o.manufacturer, o.model FROM offers o "
+            "WHERE o.classified = false "
+            "AND IS_DEFINED(o.category) "
+            "AND o.category != null "
+            "AND o.category != 'undefined' "
+            "ORDER BY o.id ASC "
+            "OFFSET 0 LIMIT @limit"
+        )
+        params = [dict(name="@limit", value=limit)]
+        result_set = offers_container().query_items(
+            query=query, parameters=params, enable_cross_partition_query=True
+        )
+
+        return [_to_unclassified_offer(result) for result in result_set]
+
+    def archive_offers(
+        self, published_before: date, limit: int = 100
+    ) -> list[tuple[str | None, str | None]]:
+        query = (
+            "SELECT * FROM offers o WHERE o.published_at < @published_before "
+            "OFFSET 0 LIMIT @limit"
+        )
+        params: list[dict[str, object]] = [
+            dict(name="@published_before", value=published_before.isoformat()),
+            dict(name="@limit", value=limit),
+        ]
+        documents = list(
+            offers_container().query_items(
+                query=query, parameters=params, enable_cross_partition_query=True
+            )
+        )
+
+        def archive(document: dict[str, Any]) -> None:
+            # offer is deleted only once it's safely stored in the archive
+            store_archived_offer(document["id"], without_system_properties(document))
+            metadata_container().upsert_item(
+                dict(
+                    id=_archived_offer_id(document["id"]),
+                    type="archived_offer",
+                    offer_id=document["id"],
+                    url=document["url"],
+                    archived_at=datetime.now(UTC).isoformat(),
+                )
+            )
+            offers_container().delete_item(
+                item=document["id"],
+                partition_key=document[offers_partition_key_path().lstrip("/")],
+            )
+
+        errors = [
+            outcome
+            for outcome in run_concurrently(archive, documents)
+            if isinstance(outcome, Exception)
+        ]
+        if errors:
+            raise Exception(f"Could not archive {len(errors)} offers") from errors[0]
+
+        archived_ids = [document["id"] for document in documents]
+        if archived_ids:
+            self._unlink_duplicates_of(archived_ids)
+        return [
+            (document.get("manufacturer"), document.get("model"))
+            for document in documents
+        ]
+
+    def _unlink_duplicates_of(self, offer_ids: list[str]) -> None:
+        query = (
+            "SELECT o.id, o.category FROM offers o "
+            "WHERE ARRAY_CONTAINS(@offer_ids, o.duplicate_of)"
+        )
+        params: list[dict[str, object]] = [dict(name="@offer_ids", value=offer_ids)]
+        for duplicate in offers_container().query_items(
+            query=query, parameters=params, enable_cross_partition_query=True
+        ):
+            offers_container().patch_item(
+                item=duplicate["id"],
+                partition_key=self._partition_key(
+                    duplicate["id"], AircraftCategory[duplicate["category"]]
+                ),
+                patch_operations=[dict(op="set", path="/duplicate_of", value=None)],
+            )
+
+    def get_model_summary(self, manufacturer: str, model: str) -> ModelSummary | None:
+        document_id = _model_summary_id(manufacturer, model)
+        try:
+            document = metadata_container().read_item(
+                item=document_id, partition_key=document_id
+            )
+        except CosmosResourceNotFoundError:
+            return None
+        return ModelSummary(
+            **{
+                field.name: document[field.name]
+                for field in dataclasses.fields(ModelSummary)
+            }
+        )
+
+    def update_model_summary(self, manufacturer: str, model: str) -> ModelSummary:
+        query = (
+            "SELECT o.price.amount_in_euro, o.published_at, o.hours, o.starts FROM offers o "
+            # duplicates are not counted, same as in facets and collapsed offers lists
+            "WHERE o.manufacturer = @manufacturer AND o.model = @model AND NOT IS_STRING(o.duplicate_of)"
+        )
+        params: list[dict[str, object]] = [
+            dict(name="@manufacturer", value=manufacturer),
+            dict(name="@model", value=model),
+        ]
+        result_set = offers_container().query_items(
+            query=query, parameters=params, enable_cross_partition_query=True
+        )
+        summary = summarize_model_offers(manufacturer, model, result_set)
+        metadata_container().upsert_item(
+            dict(
+                id=_model_summary_id(manufacturer, model),
+                type="model_summary",
+                updated_at=datetime.now(UTC).isoformat(),
+                **dataclasses.asdict(summary),
+            )
+        )
+        return summary
+
+    def get_facets(self) -> Facets | None:
+        try:
+            document = metadata_container().read_item(
+                item=_FACETS_ID, partition_key=_FACETS_ID
+            )
+        except CosmosResourceNotFoundError:
+            return None
+        return Facets(
+            **{field.name: document[field.name] for field in dataclasses.fields(Facets)}
+        )
+
+    def rebuild_facets(self) -> Facets:
+        # single pass over the smallest projection, counted here - cross-partition GROUP BY is not supported by the SDK
+        query = (
+            "SELECT o.category, o.manufacturer, o.model FROM offers o "
+            "WHERE NOT IS_STRING(o.duplicate_of)"
+        )
+        facets = count_facets(
+            offers_container().query_items(
+                query=query, enable_cross_partition_query=True
+            )
+        )
+        metadata_container().upsert_item(
+            dict(id=_FACETS_ID, type="facets", **dataclasses.asdict(facets))
+        )
+        return facets
+
+
+_FACETS_ID = "facets"
+
+
+def _archived_offer_id(offer_id: str) -> str:
+    return "archived_offer:" + offer_id
+
+
+def _model_summary_id(manufacturer: str, model: str) -> str:
+    # names may contain characters not allowed in document ids, like `/`
+    return "model_summary:" + url_to_id(f"{manufacturer}/{model}")
+
+
+def _to_document(
+    offer_id: str,
+    offer: OfferPageItem,
+    spider: str,
+    fingerprint: Fingerprint | None = None,
+    duplicate_of: str | None = None,
+) -> dict[str, Any]:
+    return dict(
+        id=offer_id,
+        spider=spider,
+        category=offer.category.name,
+        url=offer.url,
+        title=offer.title,
+        published_at=offer.published_at.isoformat(),
+        indexed_at=datetime.now(UTC).isoformat(),
+        price=dict(
+            amount=offer.price,
+            currency=offer.currency,
+            amount_in_euro=offer.price_in_euro,
+            exchange_rate=offer.exchange_rate,
+        ),
+        location=offer.location,
+        hours=offer.hours,
+        starts=offer.starts,
+        classified=False,
+        manufacturer=None,
+        model=None,
+        minhash=fingerprint.minhash if fingerprint is not None else [],
+        lsh_bands=fingerprint.bands if fingerprint is not None else [],
+        duplicate_of=duplicate_of,
+        content_hash=offer_content_hash(offer),
     )
 
 
-def get_unclassified_offers(limit: int = 100) -> list[UnclassifiedOffer]:
-    query = (
-        "SELECT o.id, o.title, o.category FROM offers o "
-        "WHERE o.classified = false "
-        "AND IS_DEFINED(o.category) "
-        "AND o.category != null "
-        "AND o.category != 'undefined' "
-        "ORDER BY o.id ASC "
-        "OFFSET 0 LIMIT @limit"
+def price_history_entry(price: dict[str, Any]) -> dict[str, Any]:
+    """Previous price of the offer, with date it was changed (noticed by refresh crawl)."""
+    return dict(
+        amount=price.get("amount"),
+        currency=price.get("currency"),
+        amount_in_euro=price.get("amount_in_euro"),
+        changed_at=datetime.now(UTC).date().isoformat(),
+    )
+
+
+OFFER_FIELDS: tuple[str, ...] = tuple(field.name for field in dataclasses.fields(Offer))
+
+
+def selected_offer_fields(fields: Collection[str] | None) -> tuple[str, ...]:
+    """
+    Offer fields to fetch from db, explicitly, so internal fields of stored offers (like Cosmos `_rid`, `_etag` or
+    `indexed_at`) are not sent over the wire.
+    """
+    if fields is None:
+        return OFFER_FIELDS
+
+    unknown_fields = set(fields) - set(OFFER_FIELDS)
+    if len(unknown_fields) > 0:
+        raise ValueError(f"Unknown offer fields: {sorted(unknown_fields)}")
+    return tuple(
+        field
+        for field in OFFER_FIELDS
+        if field in fields or field in ("id", "published_at")
     )
-    params = [dict(name="@limit", value=limit)]
-    result_set = offers_container().query_items(
-        query=query, parameters=params, enable_cross_partition_query=True
+
+
+def _to_offer(db_offer: dict[str, Any]) -> Offer:
+    """Fields not selected by query projection (or not defined in the document, like `spider` of old offers) are None."""
+    db_price = db_offer.get("price")
+    return Offer(
+        id=db_offer["id"],
+        url=db_offer.get("url"),
+        category=db_offer.get("category"),
+        title=db_offer.get("title"),
+        published_at=db_offer["published_at"],
+        price=OfferPrice(
+            amount=db_price["amount"],
+            currency=db_price["currency"],
+            amount_in_euro=db_price["amount_in_euro"],
+            exchange_rate=db_price["exchange_rate"],
+        )
+        if db_price is not None
+        else None,
+        hours=db_offer.get("hours"),
+        starts=db_offer.get("starts"),
+        location=db_offer.get("location"),
+        manufacturer=db_offer.get("manufacturer"),
+        model=db_offer.get("model"),
+        spider=db_offer.get("spider"),
+        duplicate_of=db_offer.get("duplicate_of"),
+        price_history=db_offer.get("price_history"),
     )
 
+
+def offers_cursor(offer: Offer) -> str:
+    """Opaque cursor pointing right after given offer, to be passed to `get_offers` to fetch the next page."""
+    raw_cursor = json.dumps([str(offer.published_at), offer.id])
+    return base64.urlsafe_b64encode(raw_cursor.encode()).decode()
+
+
+def decode_offers_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        (published_at, offer_id) = json.loads(base64.urlsafe_b64decode(cursor))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(published_at, str) or not isinstance(offer_id, str):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return published_at, offer_id
+
+
+# change feed and leases below are specific to Cosmos DB, used by change feed classification worker only
+
+
+def get_unclassified_offer_changes(
+    continuation: str | None, max_item_count: int = 100
+) -> Iterator[tuple[list[UnclassifiedOffer], str | None]]:
+    """
+    Read offers container change feed, from the beginning if there is no continuation yet.
+
+    :return: pages of offers changed since continuation which still need classification, each with continuation
+        pointing right after that page (to be persisted once page is processed)
+    """
+    if continuation is None:
+        changes = offers_container().query_items_change_feed(
+            start_time="Beginning", max_item_count=max_item_count
+        )
+    else:
+        changes = offers_container().query_items_change_feed(
+            continuation=continuation, max_item_count=max_item_count
+        )
+
+    # `by_page` is typed as plain iterator, but it's a page iterator exposing continuation of the last page read
+    pages = cast(PageIterator[dict[str, Any]], changes.by_page())
+    for page in pages:
+        # classification patches are changes too, these (and any other classified offer) are skipped here
+        unclassified_offers = [
+            _to_unclassified_offer(document)
+            for document in page
+            if document.get("classified") is False
+            and document.get("category") not in (None, "undefined")
+        ]
+        yield unclassified_offers, pages.continuation_token
+
+
+def _to_unclassified_offer(document: dict[str, Any]) -> UnclassifiedOffer:
     def _to_category(raw: object) -> AircraftCategory:
         if not isinstance(raw, str) or not raw:
             return AircraftCategory.unknown
@@ -181,14 +1272,37 @@ def get_unclassified_offers(limit: int = 100) -> list[UnclassifiedOffer]:
             except (KeyError, ValueError):
                 return AircraftCategory.unknown
 
-    return [
-        UnclassifiedOffer(
-            id=result["id"],
-            title=result["title"],
-            category=_to_category(result.get("category")),
+    return UnclassifiedOffer(
+        id=document["id"],
+        title=document["title"],
+        category=_to_category(document.get("category")),
+        manufacturer=document.get("manufacturer"),
+        model=document.get("model"),
+    )
+
+
+def get_lease(lease_id: str) -> str | None:
+    """Returns continuation persisted by change feed consumer with given id, None if it has not started yet."""
+    document_id = f"lease:{lease_id}"
+    try:
+        lease = metadata_container().read_item(
+            item=document_id, partition_key=document_id
+        )
+    except CosmosResourceNotFoundError:
+        return None
+    continuation: str | None = lease.get("continuation")
+    return continuation
+
+
+def store_lease(lease_id: str, continuation: str) -> None:
+    metadata_container().upsert_item(
+        dict(
+            id=f"lease:{lease_id}",
+            type="lease",
+            continuation=continuation,
+            updated_at=datetime.now(UTC).isoformat(),
         )
-        for result in result_set
-    ]
+    )
 
 
 if __name__ == "__main__":
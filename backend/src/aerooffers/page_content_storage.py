@@ -1,5 +1,7 @@
+import json
 import os
 from datetime import datetime, UTC
+from typing import Any
 
 from azure.storage.blob import BlobServiceClient, ContentSettings
 
@@ -9,6 +11,7 @@ logger = logging.getLogger("page_content_storage")
 
 _blob_service_client: BlobServiceClient | None = None
 _container_name = "offer-pages"
+_archive_container_name = "offers-archive"
 
 
 def _get_blob_service_client() -> BlobServiceClient:
@@ -45,3 +48,16 @@ def store_page_content(offer_id: str, page_content: str, url: str) -> None:
         logger.debug(f"Stored page_content for offer_id: {offer_id}")
     except Exception as e:
         logger.error(f"Could not upload page content for offer {offer_id}", e)
+
+
+def store_archived_offer(offer_id: str, document: dict[str, Any]) -> None:
+    """Offer document removed from the database (see `offers_db.archive_offers`), errors are raised - not logged only."""
+    blob_client = _get_blob_service_client().get_blob_client(
+        container=_archive_container_name, blob=f"{offer_id}.json"
+    )
+    blob_client.upload_blob(
+        data=json.dumps(document),
+        overwrite=True,
+        content_settings=ContentSettings(content_type="application/json"),
+        metadata={"archived_at": datetime.now(UTC).isoformat()},
+    )
@@ -1,4 +1,6 @@
+import asyncio
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from typing import override
 
 from price_parser import Price
@@ -7,9 +9,16 @@ from scrapy.exceptions import DropItem
 
 from aerooffers.fx import to_price_in_euro
 from aerooffers.my_logging import logging
-from aerooffers.offer import OfferPageItem
-from aerooffers.offers_db import store_offer
+from aerooffers.offer import OfferPageItem, url_to_id
+from aerooffers.offers_db import (
+    refresh_offer,
+    refresh_offers,
+    RefreshOutcome,
+    store_offer,
+    store_offers,
+)
 from aerooffers.page_content_storage import store_page_content
+from aerooffers.utils import run_concurrently
 
 
 class OfferPipelineFilter(ABC):
@@ -76,11 +85,19 @@ class ParsePrice(OfferPipelineFilter):
             raise DropItem(msg) from e
 
 
+_STATS_BY_OUTCOME = {
+    RefreshOutcome.stored: "items_stored",
+    RefreshOutcome.updated: "items_updated",
+    RefreshOutcome.unchanged: "items_unchanged",
+}
+
+
 class StoreOffer(OfferPipelineFilter):
     logger = logging.getLogger("StoragePipeline")
 
     def __init__(self, crawler: Crawler):
         self._crawler = crawler
+        self._refresh = crawler.settings.getbool("REFRESH_KNOWN_OFFERS")
 
     @classmethod
     def from_crawler(cls, crawler: Crawler) -> "StoreOffer":
@@ -88,22 +105,167 @@ class StoreOffer(OfferPipelineFilter):
 
     @override
     def process_item(self, item: OfferPageItem) -> OfferPageItem:
+        outcome = self.store(item)
+        self.count_stored_item(outcome)
+        return item
+
+    def store(self, item: OfferPageItem) -> RefreshOutcome:
+        """Blocking write of the offer to db and its page content to blob storage (skipped if unchanged)."""
         self.logger.info(
             "Storing '%s' offer title='%s', url=%s", item.category, item.title, item.url
         )
 
         spider = self._crawler.spider
-        if spider is not None:
-            spider_name = spider.name or "unknown"
-            if self._crawler.stats:
-                self._crawler.stats.inc_value("items_stored")
-        else:
-            spider_name = "unknown"
+        spider_name = (spider.name or "unknown") if spider is not None else "unknown"
 
-        offer_id = store_offer(offer=item, spider=spider_name)
+        if self._refresh:
+            outcome = refresh_offer(offer=item, spider=spider_name)
+        else:
+            # spiders pass only offers not stored yet, unless refreshing (see `OffersSpider._filter_new_offer_urls`)
+            store_offer(offer=item, spider=spider_name, new=True)
+            outcome = RefreshOutcome.stored
 
         # Store page content in blob storage if present
-        if item.page_content:
-            store_page_content(offer_id, item.page_content, item.url)
+        if item.page_content and outcome != RefreshOutcome.unchanged:
+            store_page_content(url_to_id(item.url), item.page_content, item.url)
+        return outcome
+
+    def count_stored_item(
+        self, outcome: RefreshOutcome = RefreshOutcome.stored
+    ) -> None:
+        if self._crawler.spider is not None and self._crawler.stats:
+            self._crawler.stats.inc_value(_STATS_BY_OUTCOME[outcome])
+
+
+class StoreOfferInBackground:
+    """
+    Non-blocking, buffering variant of StoreOffer. Offers are accumulated and stored in batches (when
+    STORE_OFFER_BATCH_SIZE offers are buffered, STORE_OFFER_FLUSH_INTERVAL seconds after the first buffered one, or when
+    the spider is closed). Each batch is written off the reactor thread with up to STORE_OFFER_CONCURRENCY concurrent
+    db upserts and blob uploads, so writes don't stall in-flight downloads. Offers which failed to be stored are
+    dropped and counted in `items_store_failed` crawler stat.
+
+    Back-pressure: process_item completes only after the offer is stored. Until then scrapy keeps the item's response
+    in the scraper slot and stops scheduling new downloads once SCRAPER_SLOT_MAX_ACTIVE_SIZE is exceeded, so the queue
+    of offers waiting to be stored can't grow unbounded.
 
+    Requires asyncio reactor (scrapy default, pinned in settings.py).
+    """
+
+    logger = logging.getLogger("StoragePipeline")
+
+    def __init__(self, crawler: Crawler):
+        self._crawler = crawler
+        self._batch_size = crawler.settings.getint("STORE_OFFER_BATCH_SIZE", 25)
+        self._flush_interval = crawler.settings.getfloat(
+            "STORE_OFFER_FLUSH_INTERVAL", 5.0
+        )
+        self._concurrency = crawler.settings.getint("STORE_OFFER_CONCURRENCY", 4)
+        self._refresh = crawler.settings.getbool("REFRESH_KNOWN_OFFERS")
+        # batches are flushed one at a time, concurrency is applied within a batch
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="StoreOffer"
+        )
+        self._buffer: list[tuple[OfferPageItem, asyncio.Future[None]]] = []
+        self._flush_timer: asyncio.TimerHandle | None = None
+        self._flushes_in_progress: set[asyncio.Task[None]] = set()
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> "StoreOfferInBackground":
+        return cls(crawler)
+
+    async def process_item(self, item: OfferPageItem) -> OfferPageItem:
+        loop = asyncio.get_running_loop()
+        stored: asyncio.Future[None] = loop.create_future()
+        self._buffer.append((item, stored))
+
+        if len(self._buffer) >= self._batch_size:
+            self._flush()
+        elif self._flush_timer is None:
+            self._flush_timer = loop.call_later(self._flush_interval, self._flush)
+
+        await stored
         return item
+
+    async def close_spider(self) -> None:
+        self._flush()
+        if self._flushes_in_progress:
+            await asyncio.gather(*self._flushes_in_progress)
+        self._executor.shutdown(wait=True)
+
+    def _flush(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if len(self._buffer) == 0:
+            return
+
+        batch, self._buffer = self._buffer, []
+        flush = asyncio.get_running_loop().create_task(self._store_batch(batch))
+        self._flushes_in_progress.add(flush)
+        flush.add_done_callback(self._flushes_in_progress.discard)
+
+    async def _store_batch(
+        self, batch: list[tuple[OfferPageItem, asyncio.Future[None]]]
+    ) -> None:
+        items = [item for item, _ in batch]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._store_batch_blocking, items
+            )
+        except Exception as e:
+            results = [e] * len(items)
+
+        # stats are not thread safe, thus updated back on the reactor thread
+        stats = self._crawler.stats
+        for (item, stored), result in zip(batch, results, strict=True):
+            if isinstance(result, Exception):
+                msg = f"Could not store offer {item.url}, error: {result}"
+                self.logger.error(msg)
+                if stats:
+                    stats.inc_value("items_store_failed")
+                stored.set_exception(DropItem(msg))
+            else:
+                if stats:
+                    stats.inc_value(_STATS_BY_OUTCOME[result])
+                stored.set_result(None)
+
+    def _store_batch_blocking(
+        self, items: list[OfferPageItem]
+    ) -> list[RefreshOutcome | Exception]:
+        spider = self._crawler.spider
+        spider_name = (spider.name or "unknown") if spider is not None else "unknown"
+
+        self.logger.info("Storing batch of %d offers", len(items))
+        results: list[RefreshOutcome | Exception]
+        if self._refresh:
+            results = refresh_offers(
+                offers=items, spider=spider_name, max_concurrency=self._concurrency
+            )
+        else:
+            results = [
+                result if isinstance(result, Exception) else RefreshOutcome.stored
+                for result in store_offers(
+                    offers=items,
+                    spider=spider_name,
+                    max_concurrency=self._concurrency,
+                    # spiders pass only offers not stored yet, unless refreshing
+                    new=True,
+                )
+            ]
+
+        # Store page content in blob storage if present (and changed)
+        stored_pages = [
+            (url_to_id(item.url), item)
+            for item, result in zip(items, results, strict=True)
+            if result in (RefreshOutcome.stored, RefreshOutcome.updated)
+            and item.page_content
+        ]
+        run_concurrently(
+            lambda stored_page: store_page_content(
+                stored_page[0], stored_page[1].page_content, stored_page[1].url
+            ),
+            stored_pages,
+            max_concurrency=self._concurrency,
+        )
+        return results
@@ -0,0 +1,55 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+
+
+class QueryCache[V]:
+    """
+    In-process cache of query results, with time-to-live and least recently used eviction once `max_entries` is
+    reached. `invalidate` bumps the generation, so all entries cached before are considered stale at once (these are
+    evicted lazily), e.g. after offers were stored or classified by this process.
+
+    :param ttl: seconds for which a cached result is served, also bounds staleness of results when offers are changed
+                by other processes (like jobs). Cache is disabled if ttl is 0.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 300) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = 0
+        self._entries: OrderedDict[Hashable, tuple[int, float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key: Hashable, load: Callable[[], V]) -> V:
+        if self.ttl <= 0:
+            return load()
+
+        with self._lock:
+            generation = self.generation
+            entry = self._entries.get(key)
+            if entry is not None:
+                (entry_generation, expires_at, value) = entry
+                if entry_generation == generation and expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+
+        # loaded without holding the lock, concurrent misses of the same key may load it more than once
+        value = load()
+
+        with self._lock:
+            # result loaded while cache was invalidated may be stale already
+            if generation == self.generation:
+                self._entries[key] = (generation, time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.generation += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -12,9 +13,26 @@ load_dotenv(env_path, override=False)
 ITEM_PIPELINES = {
     "aerooffers.pipelines.SkipSearchAndCharterOffers": 100,
     "aerooffers.pipelines.ParsePrice": 300,
-    "aerooffers.pipelines.StoreOffer": 400,
+    "aerooffers.pipelines.StoreOfferInBackground": 400,
 }
 
+# StoreOfferInBackground pipeline stores offers in batches of STORE_OFFER_BATCH_SIZE offers, partial batch is stored
+# STORE_OFFER_FLUSH_INTERVAL seconds after its first offer was buffered
+STORE_OFFER_BATCH_SIZE = 25
+STORE_OFFER_FLUSH_INTERVAL = 5.0
+# Max number of offers stored (db upsert + blob upload) concurrently within a batch
+STORE_OFFER_CONCURRENCY = 4
+
+# Opt-in refresh crawl: offers already stored are crawled again, and written only if their content has changed
+REFRESH_KNOWN_OFFERS = os.getenv("REFRESH_KNOWN_OFFERS", "").lower() in (
+    "true",
+    "1",
+    "yes",
+)
+
+# StoreOfferInBackground pipeline awaits asyncio futures, which requires asyncio reactor (scrapy default)
+TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
+
 # Scrapy logging configuration
 # Set to INFO to prevent DEBUG messages from appearing
 # This works together with logging.conf to control log levels
@@ -10,14 +10,15 @@ from twisted.python.failure import Failure
 
 from aerooffers.my_logging import logging
 from aerooffers.offer import AircraftCategory, OfferPageItem
-from aerooffers.offers_db import offer_url_exists
+from aerooffers.spiders.offers_spider import OffersSpider
 
 BASE_URL = "https://www.flugzeugmarkt.de/"
 
 
-class FlugzeugMarktDeSpider(scrapy.Spider):
+class FlugzeugMarktDeSpider(OffersSpider):
     name = "flugzeugmarkt_de"
     _logger = logging.getLogger(name)
+    offers_url_prefix = BASE_URL
 
     # Rate limiting to avoid 429 throttling responses
     custom_settings = {
@@ -50,6 +51,7 @@ class FlugzeugMarktDeSpider(scrapy.Spider):
             # fallback for older markup
             detail_urls = response.css("div.content-inner a::attr(href)").extract()
 
+        full_urls_to_crawl: list[str] = []
         for detail_url in detail_urls:
             if not detail_url or not detail_url.startswith("./"):
                 continue
@@ -57,13 +59,10 @@ class FlugzeugMarktDeSpider(scrapy.Spider):
                 continue
             seen.add(detail_url)
 
-            full_url_to_crawl = BASE_URL + detail_url[2:]
-
-            # Check if already exists in DB (duplication detection)
-            if offer_url_exists(full_url_to_crawl):
-                self._logger.debug("Skipping existing offer: %s", full_url_to_crawl)
-                continue
+            full_urls_to_crawl.append(BASE_URL + detail_url[2:])
 
+        # Skip offers which already exist in DB (duplication detection)
+        for full_url_to_crawl in self._filter_new_offer_urls(full_urls_to_crawl):
             self._logger.debug("Adding detail page for scraping %s", full_url_to_crawl)
             yield scrapy.Request(
                 full_url_to_crawl,
@@ -11,7 +11,7 @@ from twisted.python.failure import Failure
 
 from aerooffers.my_logging import logging
 from aerooffers.offer import AircraftCategory, OfferPageItem
-from aerooffers.offers_db import offer_url_exists
+from aerooffers.spiders.offers_spider import OffersSpider
 
 ROOT_URL = "https://www.segelflug.de"
 
@@ -20,9 +20,10 @@ def _parse_int_or_none(param: str) -> int:
     return int(param) if param is not None else None
 
 
-class SegelflugDeSpider(scrapy.Spider):
+class SegelflugDeSpider(OffersSpider):
     name = "segelflug_de_2026"
     _logger = logging.getLogger(name)
+    offers_url_prefix = ROOT_URL
 
     start_urls_with_category: dict[str, AircraftCategory] = {
         "https://www.segelflug.de/index.php/de/kleinanzeigen/filterseite-de/com-djclassifieds-cat-sailplanes,5": AircraftCategory.glider,
@@ -97,19 +98,17 @@ class SegelflugDeSpider(scrapy.Spider):
         category = self.start_urls_with_category.get(
             response.request.url, AircraftCategory.unknown
         )
+        full_urls: list[str] = []
         for detail_url in response.css("h3.el-title a::attr(href)").extract():
             if detail_url in visited or "task=addFavourite" in detail_url:
                 continue
 
             visited.add(detail_url)
 
-            full_url = ROOT_URL + detail_url
-
-            # Check if already exists in DB (duplication detection)
-            if offer_url_exists(full_url):
-                self._logger.debug("Skipping existing offer: %s", full_url)
-                continue
+            full_urls.append(ROOT_URL + detail_url)
 
+        # Skip offers which already exist in DB (duplication detection)
+        for full_url in self._filter_new_offer_urls(full_urls):
             self._logger.debug("Adding offer for scraping %s", full_url)
             yield scrapy.Request(
                 full_url,
@@ -0,0 +1,86 @@
+from typing import Any, Self
+
+import scrapy
+from scrapy import signals
+from scrapy.crawler import Crawler
+
+from aerooffers import offers_db
+from aerooffers.my_logging import logging
+from aerooffers.offer import url_to_id
+
+
+class OffersSpider(scrapy.Spider):
+    """
+    Base class for spiders crawling offer portals.
+
+    Ids of all offers already stored for the portal are loaded once when the spider is opened, so listing pages can
+    skip known offers without querying the database for every detail link. With `REFRESH_KNOWN_OFFERS` setting known
+    offers are crawled again instead, so their changes are picked up (see `offers_db.refresh_offer`). Archived offers
+    (see `offers_db.archive_offers`) still listed by the portal are skipped either way, they would be archived again.
+    """
+
+    offers_url_prefix: str
+    """All offer urls of the portal start with this prefix."""
+
+    _logger: logging.Logger
+
+    _known_offer_ids: set[str] | None = None
+
+    _archived_offer_ids: set[str] | None = None
+
+    refresh_known_offers: bool = False
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler, *args: Any, **kwargs: Any) -> Self:
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        spider.refresh_known_offers = crawler.settings.getbool("REFRESH_KNOWN_OFFERS")
+        crawler.signals.connect(spider.load_known_offers, signal=signals.spider_opened)
+        return spider
+
+    def load_known_offers(self) -> None:
+        try:
+            self._archived_offer_ids = offers_db.get_archived_offer_ids(
+                self.offers_url_prefix
+            )
+        except Exception as e:
+            self._logger.error("Could not load archived offers: %s", e)
+            self._archived_offer_ids = None
+        if self.refresh_known_offers:
+            return
+
+        try:
+            self._known_offer_ids = offers_db.get_offer_ids(self.offers_url_prefix)
+            self._logger.info(
+                "Loaded %d known offers for %s",
+                len(self._known_offer_ids),
+                self.offers_url_prefix,
+            )
+        except Exception as e:
+            self._logger.error(
+                "Could not load known offers, falling back to checking each listing page in db: %s",
+                e,
+            )
+            self._known_offer_ids = None
+
+    def _filter_new_offer_urls(self, urls: list[str]) -> list[str]:
+        """Returns urls of offers not stored in the database yet (all urls when refreshing), preserving order."""
+        archived_offer_ids = self._archived_offer_ids or set()
+        urls = [url for url in urls if url_to_id(url) not in archived_offer_ids]
+        if self.refresh_known_offers:
+            return urls
+
+        known_offer_ids = self._known_offer_ids or set()
+        unknown_urls = [url for url in urls if url_to_id(url) not in known_offer_ids]
+        if len(unknown_urls) == 0:
+            return []
+
+        # offers missing in the in-memory index are double-checked in db (single call per listing page),
+        # it also covers the case when the index could not be loaded at all
+        existing_ids = offers_db.existing_offer_ids(unknown_urls)
+        new_urls = [url for url in unknown_urls if url_to_id(url) not in existing_ids]
+        self._logger.debug(
+            "Skipping %d existing offers out of %d",
+            len(urls) - len(new_urls),
+            len(urls),
+        )
+        return new_urls
@@ -0,0 +1,555 @@
+import dataclasses
+import json
+import sqlite3
+import threading
+from collections.abc import Collection, Iterable, Iterator, Sequence
+from datetime import date, datetime, UTC
+from typing import Any
+
+from aerooffers.my_logging import logging
+from aerooffers.offer import (
+    AircraftCategory,
+    Facets,
+    ModelSummary,
+    Offer,
+    offer_content_hash,
+    OfferPageItem,
+    OfferPrice,
+    UnclassifiedOffer,
+    url_to_id,
+)
+from aerooffers.offer_fingerprint import (
+    DuplicateCandidate,
+    Fingerprint,
+    offer_fingerprint,
+)
+from aerooffers.offers_db import (
+    count_facets,
+    decode_offers_cursor,
+    OfferRefresh,
+    offers_cursor,
+    price_history_entry,
+    RefreshOutcome,
+    selected_offer_fields,
+    summarize_model_offers,
+)
+
+logger = logging.getLogger("sqlite_offers_db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS offers (
+    id TEXT PRIMARY KEY,
+    spider TEXT,
+    category TEXT,
+    url TEXT NOT NULL,
+    title TEXT,
+    published_at TEXT NOT NULL,
+    indexed_at TEXT NOT NULL,
+    price_amount TEXT,
+    price_currency TEXT,
+    price_amount_in_euro TEXT,
+    price_exchange_rate REAL,
+    location TEXT,
+    hours INTEGER,
+    starts INTEGER,
+    classified INTEGER NOT NULL DEFAULT 0,
+    manufacturer TEXT,
+    model TEXT,
+    classifier_name TEXT,
+    minhash TEXT,
+    duplicate_of TEXT,
+    content_hash TEXT,
+    price_history TEXT,
+    refreshed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS offers_url ON offers (url);
+CREATE INDEX IF NOT EXISTS offers_published_at ON offers (published_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS offers_category ON offers (category, published_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS offers_model ON offers (manufacturer, model, published_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS offers_classified ON offers (classified, id);
+CREATE TABLE IF NOT EXISTS offer_bands (
+    band TEXT NOT NULL,
+    offer_id TEXT NOT NULL,
+    PRIMARY KEY (band, offer_id)
+);
+CREATE TABLE IF NOT EXISTS offers_archive (
+    id TEXT PRIMARY KEY,
+    document TEXT NOT NULL,
+    archived_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS model_summaries (
+    manufacturer TEXT NOT NULL,
+    model TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (manufacturer, model)
+);
+CREATE TABLE IF NOT EXISTS facets (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    facets TEXT NOT NULL
+);
+"""
+
+_ADDED_COLUMNS = {
+    "offers": {
+        "minhash": "TEXT",
+        "duplicate_of": "TEXT",
+        "content_hash": "TEXT",
+        "price_history": "TEXT",
+        "refreshed_at": "TEXT",
+    }
+}
+"""Columns added to tables after they were created, added to existing database files when opened."""
+
+_SUMMARIZED_COLUMNS = (
+    "published_at",
+    "price_amount",
+    "price_currency",
+    "price_amount_in_euro",
+    "hours",
+    "starts",
+)
+"""Columns of `SUMMARIZED_FIELDS`, changes of which make the summary of offer's model outdated."""
+
+
+class SqliteOffersRepository:
+    """
+    Offers stored in a SQLite database (stdlib, no server needed), for local runs, tests, benchmarks and small
+    self-hosted deployments. Same semantics as `CosmosOffersRepository`, with the same query shapes backed by indexes.
+
+    :param path: database file, or `:memory:` for a database living as long as this repository
+    """
+
+    def __init__(self, path: str = ":memory:") -> None:
+        # single connection shared by all threads (api threads, `run_concurrently`), writes are serialized anyway
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.executescript(_SCHEMA)
+            for table, columns in _ADDED_COLUMNS.items():
+                existing_columns = {
+                    row["name"]
+                    for row in self._connection.execute(f"PRAGMA table_info({table})")
+                }
+                for column, column_type in columns.items():
+                    if column not in existing_columns:
+                        self._connection.execute(
+                            f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"
+                        )
+        logger.info(f"SQLite offers database opened, path={path}")
+
+    def _execute(self, sql: str, params: Iterable[Any] = ()) -> list[sqlite3.Row]:
+        with self._lock, self._connection:
+            return self._connection.execute(sql, tuple(params)).fetchall()
+
+    def store_offer(
+        self,
+        offer: OfferPageItem,
+        spider: str,
+        fingerprint: Fingerprint | None = None,
+        duplicate_of: str | None = None,
+    ) -> str:
+        offer_id = url_to_id(offer.url)
+        bands = fingerprint.bands if fingerprint is not None else []
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO offers ("
+                "id, spider, category, url, title, published_at, indexed_at, "
+                "price_amount, price_currency, price_amount_in_euro, price_exchange_rate, "
+                "location, hours, starts, classified, manufacturer, model, minhash, duplicate_of, content_hash"
+                ") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, NULL, NULL, ?, ?, ?)",
+                (
+                    offer_id,
+                    spider,
+                    offer.category.name,
+                    offer.url,
+                    offer.title,
+                    offer.published_at.isoformat(),
+                    datetime.now(UTC).isoformat(),
+                    offer.price,
+                    offer.currency,
+                    offer.price_in_euro,
+                    offer.exchange_rate,
+                    offer.location,
+                    offer.hours,
+                    offer.starts,
+                    json.dumps(fingerprint.minhash)
+                    if fingerprint is not None
+                    else None,
+                    duplicate_of,
+                    offer_content_hash(offer),
+                ),
+            )
+            self._connection.execute(
+                "DELETE FROM offer_bands WHERE offer_id = ?", (offer_id,)
+            )
+            self._connection.executemany(
+                "INSERT INTO offer_bands (band, offer_id) VALUES (?, ?)",
+                [(band, offer_id) for band in bands],
+            )
+        return offer_id
+
+    def duplicate_candidates(
+        self, bands: Sequence[str], spider: str
+    ) -> list[DuplicateCandidate]:
+        if len(bands) == 0:
+            return []
+
+        placeholders = ", ".join("?" for _ in bands)
+        rows = self._execute(
+            "SELECT DISTINCT o.id, o.minhash, o.duplicate_of FROM offer_bands b "  # noqa: S608
+            "JOIN offers o ON o.id = b.offer_id "
+            f"WHERE b.band IN ({placeholders}) AND o.spider != ?",
+            (*bands, spider),
+        )
+        return [
+            DuplicateCandidate(
+                id=row["id"],
+                minhash=json.loads(row["minhash"]),
+                duplicate_of=row["duplicate_of"],
+            )
+            for row in rows
+        ]
+
+    def update_changed_offer(
+        self, offer: OfferPageItem, content_hash: str
+    ) -> OfferRefresh | None:
+        offer_id = url_to_id(offer.url)
+        rows = self._execute("SELECT * FROM offers WHERE id = ?", (offer_id,))
+        if len(rows) == 0:
+            return None
+        stored = rows[0]
+        if stored["content_hash"] == content_hash:
+            return OfferRefresh(RefreshOutcome.unchanged)
+
+        # fingerprint is computed from (some of) the refreshed fields, so it may have changed too
+        fingerprint = offer_fingerprint(offer)
+        refreshed = dict(
+            title=offer.title,
+            published_at=offer.published_at.isoformat(),
+            price_amount=offer.price,
+            price_currency=offer.currency,
+            price_amount_in_euro=offer.price_in_euro,
+            price_exchange_rate=offer.exchange_rate,
+            location=offer.location,
+            hours=offer.hours,
+            starts=offer.starts,
+            minhash=json.dumps(fingerprint.minhash),
+            content_hash=content_hash,
+            refreshed_at=datetime.now(UTC).isoformat(),
+        )
+        changed = {
+            column: value
+            for column, value in refreshed.items()
+            if stored[column] != value
+        }
+        if stored["price_amount"] is not None and (
+            stored["price_amount"],
+            stored["price_currency"],
+        ) != (offer.price, offer.currency):
+            price_history = json.loads(stored["price_history"] or "[]")
+            price_history.append(
+                price_history_entry(
+                    dict(
+                        amount=stored["price_amount"],
+                        currency=stored["price_currency"],
+                        amount_in_euro=stored["price_amount_in_euro"],
+                    )
+                )
+            )
+            changed["price_history"] = json.dumps(price_history)
+
+        # column names are constant, all values are bound as parameters
+        self._update(
+            offer_id,
+            ", ".join(f"{column} = ?" for column in changed),
+            changed.values(),
+        )
+        if "minhash" in changed:
+            with self._lock, self._connection:
+                self._connection.execute(
+                    "DELETE FROM offer_bands WHERE offer_id = ?", (offer_id,)
+                )
+                self._connection.executemany(
+                    "INSERT INTO offer_bands (band, offer_id) VALUES (?, ?)",
+                    [(band, offer_id) for band in fingerprint.bands],
+                )
+        return OfferRefresh(
+            RefreshOutcome.updated,
+            manufacturer=stored["manufacturer"],
+            model=stored["model"],
+            summarized_fields_changed=any(
+                column in changed for column in _SUMMARIZED_COLUMNS
+            ),
+        )
+
+    def classify_offer(
+        self,
+        offer_id: str,
+        classifier_name: str,
+        manufacturer: str | None = None,
+        model: str | None = None,
+        category: AircraftCategory | None = None,
+        previous_model: tuple[str | None, str | None] | None = None,
+    ) -> tuple[str | None, str | None]:
+        # previous classification is read anyway, in the same transaction
+        return self._update(
+            offer_id,
+            "classified = 1, manufacturer = ?, model = ?, classifier_name = ?",
+            (manufacturer, model, classifier_name),
+        )
+
+    def unclassify_offer(
+        self, offer_id: str, category: AircraftCategory | None = None
+    ) -> tuple[str | None, str | None]:
+        return self._update(offer_id, "classified = 0", ())
+
+    def _update(
+        self, offer_id: str, assignments: str, params: Iterable[Any]
+    ) -> tuple[str | None, str | None]:
+        """:return: manufacturer and model of the offer before the update"""
+        with self._lock, self._connection:
+            previous = self._connection.execute(
+                "SELECT manufacturer, model FROM offers WHERE id = ?", (offer_id,)
+            ).fetchone()
+            if previous is None:
+                raise LookupError(f"Offer {offer_id} not found")
+            self._connection.execute(
+                f"UPDATE offers SET {assignments} WHERE id = ?",  # noqa: S608
+                (*params, offer_id),
+            )
+        return previous["manufacturer"], previous["model"]
+
+    def offer_url_exists(self, url: str) -> bool:
+        return len(self.existing_offer_ids([url])) > 0
+
+    def existing_offer_ids(self, urls: Iterable[str]) -> set[str]:
+        offer_ids = list({url_to_id(url) for url in urls})
+        if len(offer_ids) == 0:
+            return set()
+
+        placeholders = ", ".join("?" for _ in offer_ids)
+        rows = self._execute(
+            f"SELECT id FROM offers WHERE id IN ({placeholders})",  # noqa: S608
+            offer_ids,
+        )
+        return {row["id"] for row in rows}
+
+    def get_offer_ids(self, url_prefix: str) -> set[str]:
+        rows = self._execute(
+            "SELECT id FROM offers WHERE substr(url, 1, length(?)) = ?",
+            (url_prefix, url_prefix),
+        )
+        return {row["id"] for row in rows}
+
+    def get_archived_offer_ids(self, url_prefix: str) -> set[str]:
+        rows = self._execute(
+            "SELECT id FROM offers_archive WHERE substr(json_extract(document, '$.url'), 1, length(?)) = ?",
+            (url_prefix, url_prefix),
+        )
+        return {row["id"] for row in rows}
+
+    def get_offers(
+        self,
+        offset: int = 0,
+        limit: int = 30,
+        category: AircraftCategory | None = None,
+        manufacturer: str | None = None,
+        model: str | None = None,
+        cursor: str | None = None,
+        fields: Collection[str] | None = None,
+        collapse_duplicates: bool = False,
+    ) -> list[Offer]:
+        selected_fields = selected_offer_fields(fields)
+        params: list[Any] = []
+
+        where = list()
+        if category is not None:
+            where.append("category = ?")
+            params.append(category.name)
+        else:
+            where.append("category IS NOT NULL")
+
+        if collapse_duplicates:
+            where.append("duplicate_of IS NULL")
+
+        if manufacturer is not None:
+            where.append("manufacturer = ?")
+            params.append(manufacturer)
+
+        if model is not None:
+            where.append("model = ?")
+            params.append(model)
+
+        if cursor is not None:
+            (cursor_published_at, cursor_id) = decode_offers_cursor(cursor)
+            where.append("(published_at < ? OR (published_at = ? AND id < ?))")
+            params.extend([cursor_published_at, cursor_published_at, cursor_id])
+
+        # conditions are constant, all values are bound as parameters
+        query = "SELECT * FROM offers WHERE " + " AND ".join(where)  # noqa: S608
+        query += " ORDER BY published_at DESC, id DESC LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+
+        return [_to_offer(row, selected_fields) for row in self._execute(query, params)]
+
+    def iter_offers(
+        self,
+        offset: int = 0,
+        limit: int = 30,
+        category: AircraftCategory | None = None,
+        manufacturer: str | None = None,
+        model: str | None = None,
+        cursor: str | None = None,
+        fields: Collection[str] | None = None,
+        collapse_duplicates: bool = False,
+        page_size: int = 100,
+    ) -> Iterator[Offer]:
+        # pages are fetched with keyset pagination, so connection lock is not held while caller consumes offers
+        remaining = limit
+        while remaining > 0:
+            page = self.get_offers(
+                offset=offset,
+                limit=min(page_size, remaining),
+                category=category,
+                manufacturer=manufacturer,
+                model=model,
+                cursor=cursor,
+                fields=fields,
+                collapse_duplicates=collapse_duplicates,
+            )
+            yield from page
+            if len(page) < min(page_size, remaining):
+                return
+            remaining -= len(page)
+            offset = 0
+            cursor = offers_cursor(page[-1])
+
+    def get_unclassified_offers(self, limit: int = 100) -> list[UnclassifiedOffer]:
+        rows = self._execute(
+            "SELECT id, title, category, manufacturer, model FROM offers "
+            "WHERE classified = 0 "
+            "AND category IS NOT NULL "
+            "AND category != 'undefined' "
+            "ORDER BY id ASC "
+            "LIMIT ?",
+            (limit,),
+        )
+        return [
+            UnclassifiedOffer(
+                id=row["id"],
+                title=row["title"],
+                category=AircraftCategory[row["category"]]
+                if row["category"] in AircraftCategory.__members__
+                else AircraftCategory.unknown,
+                manufacturer=row["manufacturer"],
+                model=row["model"],
+            )
+            for row in rows
+        ]
+
+    def archive_offers(
+        self, published_before: date, limit: int = 100
+    ) -> list[tuple[str | None, str | None]]:
+        with self._lock, self._connection:
+            rows = self._connection.execute(
+                "SELECT * FROM offers WHERE published_at < ? LIMIT ?",
+                (published_before.isoformat(), limit),
+            ).fetchall()
+            archived_at = datetime.now(UTC).isoformat()
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO offers_archive (id, document, archived_at) VALUES (?, ?, ?)",
+                [(row["id"], json.dumps(dict(row)), archived_at) for row in rows],
+            )
+            for row in rows:
+                self._connection.execute(
+                    "DELETE FROM offers WHERE id = ?", (row["id"],)
+                )
+                self._connection.execute(
+                    "DELETE FROM offer_bands WHERE offer_id = ?", (row["id"],)
+                )
+                self._connection.execute(
+                    "UPDATE offers SET duplicate_of = NULL WHERE duplicate_of = ?",
+                    (row["id"],),
+                )
+        return [(row["manufacturer"], row["model"]) for row in rows]
+
+    def get_model_summary(self, manufacturer: str, model: str) -> ModelSummary | None:
+        rows = self._execute(
+            "SELECT summary FROM model_summaries WHERE manufacturer = ? AND model = ?",
+            (manufacturer, model),
+        )
+        if len(rows) == 0:
+            return None
+        return ModelSummary(**json.loads(rows[0]["summary"]))
+
+    def update_model_summary(self, manufacturer: str, model: str) -> ModelSummary:
+        rows = self._execute(
+            "SELECT price_amount_in_euro AS amount_in_euro, published_at, hours, starts FROM offers "
+            "WHERE manufacturer = ? AND model = ? AND duplicate_of IS NULL",
+            (manufacturer, model),
+        )
+        summary = summarize_model_offers(
+            manufacturer, model, (dict(row) for row in rows)
+        )
+        self._execute(
+            "INSERT OR REPLACE INTO model_summaries (manufacturer, model, summary, updated_at) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                manufacturer,
+                model,
+                json.dumps(dataclasses.asdict(summary)),
+                datetime.now(UTC).isoformat(),
+            ),
+        )
+        return summary
+
+    def get_facets(self) -> Facets | None:
+        rows = self._execute("SELECT facets FROM facets WHERE id = 0")
+        if len(rows) == 0:
+            return None
+        return Facets(**json.loads(rows[0]["facets"]))
+
+    def rebuild_facets(self) -> Facets:
+        rows = self._execute(
+            "SELECT category, manufacturer, model, COUNT(*) AS offers FROM offers "
+            "WHERE duplicate_of IS NULL GROUP BY category, manufacturer, model"
+        )
+        facets = count_facets(dict(row) for row in rows)
+        self._execute(
+            "INSERT OR REPLACE INTO facets (id, facets) VALUES (0, ?)",
+            (json.dumps(dataclasses.asdict(facets)),),
+        )
+        return facets
+
+
+def _to_offer(row: sqlite3.Row, selected_fields: Collection[str]) -> Offer:
+    def _selected(field: str) -> Any:
+        return row[field] if field in selected_fields else None
+
+    return Offer(
+        id=row["id"],
+        url=_selected("url"),
+        category=_selected("category"),
+        title=_selected("title"),
+        published_at=row["published_at"],
+        price=OfferPrice(
+            amount=row["price_amount"],
+            currency=row["price_currency"],
+            amount_in_euro=row["price_amount_in_euro"],
+            exchange_rate=row["price_exchange_rate"],
+        )
+        if "price" in selected_fields
+        else None,
+        hours=_selected("hours"),
+        starts=_selected("starts"),
+        location=_selected("location"),
+        manufacturer=_selected("manufacturer"),
+        model=_selected("model"),
+        spider=_selected("spider"),
+        duplicate_of=_selected("duplicate_of"),
+        price_history=json.loads(row["price_history"])
+        if "price_history" in selected_fields and row["price_history"] is not None
+        else None,
+    )
@@ -1,3 +1,5 @@
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -14,3 +16,25 @@ def load_env() -> None:
     # So we go up 3 levels to get to backend/
     env_path = Path(__file__).parent.parent.parent / ".env"
     load_dotenv(env_path, override=False)
+
+
+def run_concurrently[T, R](
+    fn: Callable[[T], R], args: Sequence[T], max_concurrency: int = 8
+) -> list[R | Exception]:
+    """
+    Call `fn` for each of `args` using a pool of threads, meant for independent blocking I/O calls (e.g. Cosmos DB
+    writes, as its python SDK has no bulk API).
+
+    :return: results in order of `args`, exception raised by `fn` is returned in place of its result
+    """
+    if len(args) == 0:
+        return []
+
+    def call(arg: T) -> R | Exception:
+        try:
+            return fn(arg)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(args))) as executor:
+        return list(executor.map(call, args))
@@ -1,3 +1,6 @@
+import gzip
+import json
+
 import pytest
 from assertpy import assert_that
 from azure.cosmos import CosmosClient
@@ -23,6 +26,31 @@ def test_get_aircraft_models(api_client: FlaskClient) -> None:
     assert_that(response.json["PZL Bielsko"]["models"]["glider"][0]).is_equal_to(
         "SZD-9 Bocian"
     )
+    assert "Server-Timing" not in response.headers
+
+
+def test_get_aircraft_models_not_modified(api_client: FlaskClient) -> None:
+    # given
+    etag = api_client.get("/api/models").headers["ETag"]
+
+    # when
+    response = api_client.get("/api/models", headers={"If-None-Match": etag})
+
+    # then
+    assert_that(response.status_code).is_equal_to(304)
+    assert_that(response.data).is_empty()
+
+
+def test_get_gzipped_aircraft_models(api_client: FlaskClient) -> None:
+    # when
+    response = api_client.get("/api/models", headers={"Accept-Encoding": "gzip"})
+
+    # then
+    assert_that(response.status_code).is_equal_to(200)
+    assert_that(response.headers["Content-Encoding"]).is_equal_to("gzip")
+    assert_that(json.loads(gzip.decompress(response.data))).is_equal_to(
+        api_client.get("/api/models").json
+    )
 
 
 def test_get_offers_for_all_categories(api_client: FlaskClient) -> None:
@@ -57,6 +85,120 @@ def test_get_offers_for_given_category(api_client: FlaskClient) -> None:
     assert_that(api_client.get("/api/offers?category=what").json).is_length(0)
 
 
+def test_get_next_page_of_offers_with_cursor(api_client: FlaskClient) -> None:
+    # given
+    for i in range(3):
+        offers_db.store_offer(
+            sample_offer(url=f"https://offers.com/{i}"), spider="test"
+        )
+
+    # when
+    first_page = api_client.get("/api/offers?limit=2")
+    next_cursor = first_page.headers["X-Next-Cursor"]
+    second_page = api_client.get(
+        "/api/offers", query_string=dict(limit=2, cursor=next_cursor)
+    )
+
+    # then
+    assert first_page.json is not None
+    assert second_page.json is not None
+    assert_that(first_page.json).is_length(2)
+    assert_that(second_page.json).is_length(1)
+    assert_that(second_page.headers.get("X-Next-Cursor")).is_none()
+    assert_that(
+        {offer["url"] for offer in first_page.json + second_page.json}
+    ).is_length(3)
+
+
+def test_get_offers_400_for_invalid_cursor(api_client: FlaskClient) -> None:
+    assert_that(api_client.get("/api/offers?cursor=abc").status_code).is_equal_to(400)
+
+
+def test_stream_offers(api_client: FlaskClient) -> None:
+    # given
+    for i in range(3):
+        offers_db.store_offer(
+            sample_offer(url=f"https://offers.com/{i}"), spider="test"
+        )
+
+    # when
+    ndjson_response = api_client.get("/api/offers?stream=ndjson&limit=100&fields=url")
+    json_response = api_client.get("/api/offers?stream=json&limit=100")
+
+    # then
+    assert_that(ndjson_response.status_code).is_equal_to(200)
+    assert_that(ndjson_response.mimetype).is_equal_to("application/x-ndjson")
+    ndjson_lines = ndjson_response.get_data(as_text=True).splitlines()
+    assert_that(ndjson_lines).is_length(3)
+    assert_that(json.loads(ndjson_lines[0])).contains_only("url")
+    assert json_response.json is not None
+    assert_that(json_response.json).is_length(3)
+    assert_that(api_client.get("/api/offers?stream=json&category=tmg").json).is_empty()
+    assert_that(api_client.get("/api/offers?stream=csv").status_code).is_equal_to(400)
+    assert_that(
+        api_client.get("/api/offers?stream=json&cursor=abc").status_code
+    ).is_equal_to(400)
+
+
+def test_get_offers_not_modified_without_querying_db(
+    api_client: FlaskClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # given
+    monkeypatch.setitem(app.config, "SERVER_TIMING", True)
+    offers_db.store_offer(sample_offer(), spider="test")
+    etag = api_client.get("/api/offers").headers["ETag"]
+
+    # when
+    response = api_client.get("/api/offers", headers={"If-None-Match": etag})
+
+    # then
+    assert_that(response.status_code).is_equal_to(304)
+    assert_that(response.data).is_empty()
+    assert_that(response.headers["Server-Timing"]).contains("0 requests")
+
+
+def test_get_offers_with_new_etag_once_offers_changed(api_client: FlaskClient) -> None:
+    # given
+    offers_db.store_offer(sample_offer(url="https://offers.com/1"), spider="test")
+    etag = api_client.get("/api/offers").headers["ETag"]
+    offers_db.store_offer(sample_offer(url="https://offers.com/2"), spider="test")
+
+    # when
+    response = api_client.get("/api/offers", headers={"If-None-Match": etag})
+
+    # then
+    assert_that(response.status_code).is_equal_to(200)
+    assert_that(response.headers["ETag"]).is_not_equal_to(etag)
+    assert response.json is not None
+    assert_that(response.json).is_length(2)
+
+
+def test_get_only_selected_offer_fields(api_client: FlaskClient) -> None:
+    # given
+    offers_db.store_offer(sample_offer(), spider="test")
+
+    # when
+    response = api_client.get("/api/offers?fields=title,price")
+
+    # then
+    assert_that(response.status_code).is_equal_to(200)
+    assert response.json is not None
+    assert_that(response.json[0]).is_equal_to(
+        dict(
+            title="Glider A",
+            price=dict(
+                amount="29500",
+                currency="EUR",
+                amount_in_euro=None,
+                exchange_rate=None,
+            ),
+        )
+    )
+    assert_that(
+        api_client.get("/api/offers?fields=title,secret").status_code
+    ).is_equal_to(400)
+
+
 def test_get_offers_for_given_manufacturer_and_model(api_client: FlaskClient) -> None:
     # given
     offer_id = offers_db.store_offer(
@@ -80,6 +222,10 @@ def test_get_offers_for_given_manufacturer_and_model(api_client: FlaskClient) ->
     assert_that(offer["manufacturer"]).is_equal_to("PZL Bielsko")
     assert_that(offer["model"]).is_equal_to("SZD-9 Bocian")
     assert_that(offer["published_at"]).is_equal_to("2024-07-27")
+    assert_that(response.json["summary"]["offers_count"]).is_equal_to(1)
+    assert_that(response.json["summary"]["newest_published_at"]).is_equal_to(
+        "2024-07-27"
+    )
 
 
 def test_get_offers_even_when_manufacturer_website_is_not_defined(
@@ -104,3 +250,39 @@ def test_get_offers_404_for_unknown_manufacturer_or_model(
     assert_that(
         api_client.get("/api/offers/Boeing/DoesNotMatter").status_code
     ).is_equal_to(404)
+    assert_that(
+        api_client.get("/api/offers/Schempp-Hirth/NoSuch").status_code
+    ).is_equal_to(404)
+
+
+def test_get_facets(api_client: FlaskClient) -> None:
+    # given
+    offers_db.store_offer(sample_offer(), spider="test")
+    offers_db.rebuild_facets()
+
+    # when
+    response = api_client.get("/api/facets")
+
+    # then
+    assert_that(response.status_code).is_equal_to(200)
+    assert response.json is not None
+    assert_that(response.json["categories"]).is_equal_to(dict(glider=1))
+    assert_that(response.headers).contains_key("ETag")
+
+
+def test_get_facets_counted_again(api_client: FlaskClient) -> None:
+    # given
+    offers_db.store_offer(sample_offer(url="https://offers.com/1"), spider="test")
+    offers_db.rebuild_facets()
+    # stored offers are counted by the next rebuild only
+    offers_db.store_offer(sample_offer(url="https://offers.com/2"), spider="test")
+    api_client.get("/api/facets")
+    # e.g. by the job, in another process than the api
+    offers_db.rebuild_facets()
+
+    # when
+    response = api_client.get("/api/facets")
+
+    # then
+    assert response.json is not None
+    assert_that(response.json["categories"]).is_equal_to(dict(glider=2))
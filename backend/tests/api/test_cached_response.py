@@ -0,0 +1,70 @@
+import gzip
+import json
+from unittest.mock import patch
+
+from assertpy import assert_that
+
+from aerooffers.api import cached_response
+from aerooffers.api.cached_response import CachedResponse
+from aerooffers.api.flask_app import app
+
+large_response = CachedResponse.of([{"title": f"Glider {i}"} for i in range(200)])
+
+
+def test_should_not_compress_small_body() -> None:
+    # given
+    small_response = CachedResponse.of({"title": "Glider"})
+
+    # when
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        response = small_response.to_response()
+
+    # then
+    assert_that(response.content_encoding).is_none()
+    assert_that(response.get_data()).is_equal_to(small_response.body)
+
+
+def test_should_compress_body_once_for_clients_accepting_gzip() -> None:
+    # given
+    cached_response.gzipped_bodies.invalidate()
+
+    # when
+    with (
+        patch(
+            "aerooffers.api.cached_response.gzip.compress", wraps=gzip.compress
+        ) as compress,
+        app.test_request_context(headers={"Accept-Encoding": "gzip, deflate, br"}),
+    ):
+        response = large_response.to_response()
+        large_response.to_response()
+
+    # then
+    assert_that(compress.call_count).is_equal_to(1)
+    assert_that(response.content_encoding).is_equal_to("gzip")
+    assert_that(response.vary.as_set()).contains("accept-encoding")
+    assert_that(json.loads(gzip.decompress(response.get_data()))).is_length(200)
+
+
+def test_should_not_compress_body_for_clients_not_accepting_gzip() -> None:
+    # when
+    with app.test_request_context():
+        response = large_response.to_response()
+
+    # then
+    assert_that(response.content_encoding).is_none()
+    assert_that(response.get_data()).is_equal_to(large_response.body)
+
+
+def test_should_not_modify_gzipped_body_with_its_etag() -> None:
+    # given
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        etag = large_response.to_response().get_etag()[0]
+
+    # when
+    with app.test_request_context(
+        headers={"Accept-Encoding": "gzip", "If-None-Match": f'"{etag}"'}
+    ):
+        response = large_response.to_response()
+
+    # then
+    assert_that(response.status_code).is_equal_to(304)
@@ -0,0 +1,43 @@
+import dataclasses
+import json
+
+from assertpy import assert_that
+
+from aerooffers.api.serialization import dumps, offer_json
+from aerooffers.offer import Offer, OfferPrice
+
+offer = Offer(
+    id="1",
+    url="https://offers.com/1",
+    category="glider",
+    title="Segelflugzeug ASK 21",
+    published_at="2024-07-27",  # type: ignore[arg-type]  # as read from db
+    location="München",
+    hours=1200,
+    starts=3000,
+    price=OfferPrice(
+        amount="45000", currency="EUR", amount_in_euro="45000", exchange_rate=1.0
+    ),
+    manufacturer="Alexander Schleicher",
+    model="ASK 21",
+    spider="test",
+    price_history=[dict(amount_in_euro="47000", changed_at="2024-06-01")],
+)
+
+
+def test_should_serialize_all_fields_of_offer() -> None:
+    # when
+    serialized = json.loads(dumps(offer_json(offer)))
+
+    # then
+    assert_that(serialized).is_equal_to(dataclasses.asdict(offer))
+
+
+def test_should_serialize_selected_fields_of_offer() -> None:
+    # when
+    serialized = json.loads(dumps(offer_json(offer, fields=["title", "price"])))
+
+    # then
+    assert_that(serialized).is_equal_to(
+        dict(title=offer.title, price=dataclasses.asdict(offer)["price"])
+    )
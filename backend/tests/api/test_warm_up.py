@@ -0,0 +1,46 @@
+from unittest.mock import MagicMock
+
+import pytest
+from assertpy import assert_that
+from util import sample_offer
+
+from aerooffers import db, offers_db
+from aerooffers.api.warm_up import warm_up
+
+
+def test_should_cache_first_page_of_each_category(
+    sqlite_db: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # given
+    monkeypatch.setenv("OFFERS_DB", "sqlite")
+    offers_db.store_offer(sample_offer(), spider="test")
+
+    # when
+    warm_up()
+
+    # then
+    assert_that(offers_db.offers_query_cache).is_length(5)
+
+
+def test_should_size_connection_pool_for_threads_of_worker(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # given
+    monkeypatch.setenv("OFFERS_DB", "cosmos")
+    monkeypatch.setenv("COSMOSDB_URL", "https://localhost:8081")
+    monkeypatch.setenv("COSMOSDB_CREDENTIAL", "key")
+    for name in ("_database", "_offers_container", "_metadata_container"):
+        monkeypatch.setattr(db, name, None)
+    monkeypatch.setattr(db, "_connection_pool_size", 0)
+    cosmos_client = MagicMock()
+    monkeypatch.setattr(db, "CosmosClient", cosmos_client)
+    # e.g. created by the process the worker was forked from
+    db.lazy_database()
+
+    # when
+    warm_up(threads=32)
+
+    # then
+    transport = cosmos_client.call_args.kwargs["transport"]
+    adapter = transport.session.get_adapter("https://localhost:8081")
+    assert_that(adapter._pool_maxsize).is_greater_than_or_equal_to(32)
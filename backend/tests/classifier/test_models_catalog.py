@@ -0,0 +1,67 @@
+import gzip
+import json
+import os
+from pathlib import Path
+
+import pytest
+from assertpy import assert_that
+
+from aerooffers.classifier import classifiers
+from aerooffers.classifier.classifiers import models_catalog
+
+
+@pytest.fixture
+def models_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    path = tmp_path / "models.json"
+    _write_models(path, {"Schleicher": {"models": {"glider": ["ASK 21"]}}})
+    monkeypatch.setattr(classifiers, "MODELS_PATH", str(path))
+    monkeypatch.setattr(classifiers, "MODELS_RELOAD_CHECK_INTERVAL", 0)
+    monkeypatch.setattr(classifiers, "_catalog", None)
+    return path
+
+
+def _write_models(path: Path, models: dict, mtime_ns: int = 1_000_000_000) -> None:
+    path.write_text(json.dumps(models))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_should_load_catalog_once(models_file: Path) -> None:
+    # when
+    catalog = models_catalog()
+
+    # then
+    assert_that(models_catalog()).is_same_as(catalog)
+    assert_that(catalog.has_model("Schleicher", "ASK 21")).is_true()
+    assert_that(catalog.has_model("Schleicher", "ASW 28")).is_false()
+    assert_that(catalog.has_model("Grob", "ASK 21")).is_false()
+    assert_that(json.loads(gzip.decompress(catalog.gzipped_json_body))).is_equal_to(
+        catalog.manufacturers
+    )
+
+
+def test_should_reload_catalog_once_models_file_changed(models_file: Path) -> None:
+    # given
+    catalog = models_catalog()
+
+    # when
+    _write_models(
+        models_file,
+        {"Schleicher": {"models": {"glider": ["ASK 21", "ASW 28"]}}},
+        mtime_ns=2_000_000_000,
+    )
+
+    # then
+    reloaded_catalog = models_catalog()
+    assert_that(reloaded_catalog.has_model("Schleicher", "ASW 28")).is_true()
+    assert_that(reloaded_catalog.version).is_not_equal_to(catalog.version)
+
+
+def test_should_keep_catalog_when_models_file_touched_only(models_file: Path) -> None:
+    # given
+    catalog = models_catalog()
+
+    # when
+    os.utime(models_file, ns=(2_000_000_000, 2_000_000_000))
+
+    # then
+    assert_that(models_catalog()).is_same_as(catalog)
@@ -1,7 +1,5 @@
 import os
 
-from util import create_offers_container_if_not_exists
-
 os.environ["AZURE_COSMOS_EMULATOR_IMAGE"] = (
     "mcr.microsoft.com/cosmosdb/linux/azure-cosmos-emulator:vnext-EN20250122"
 )
@@ -67,6 +65,16 @@ def mock_store_page_content() -> Generator[None]:
         yield
 
 
+@pytest.fixture
+def sqlite_db(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Offers stored in a fresh in-memory SQLite database instead of Cosmos DB emulator."""
+    from aerooffers import offers_db
+    from aerooffers.sqlite_offers_db import SqliteOffersRepository
+
+    monkeypatch.setattr(offers_db, "_repository", SqliteOffersRepository())
+    offers_db.offers_query_cache.invalidate()
+
+
 @pytest.fixture
 def cosmos_db(session_cosmos_db: CosmosClient) -> CosmosClient:
     _truncate_all_tables()
@@ -74,11 +82,17 @@ def cosmos_db(session_cosmos_db: CosmosClient) -> CosmosClient:
 
 
 def _truncate_all_tables() -> None:
-    from aerooffers.db import lazy_database
+    from aerooffers import db, offers_db
+    from aerooffers.db import create_offers_container_if_not_exists, lazy_database
 
-    try:
-        lazy_database().delete_container(container="offers")
-    except CosmosResourceNotFoundError:
-        print("ntbd")
+    for container in ["offers", "offers_by_category", "metadata"]:
+        try:
+            lazy_database().delete_container(container=container)
+        except CosmosResourceNotFoundError:
+            print("ntbd")
 
     create_offers_container_if_not_exists()
+    offers_db.offers_query_cache.invalidate()
+    # recreated (or read again) on first use
+    db._metadata_container = None
+    db._offers_partition_key_path = None
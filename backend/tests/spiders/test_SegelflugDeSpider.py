@@ -1,9 +1,12 @@
 from datetime import date
+from unittest.mock import patch
 
+import pytest
 from assertpy import assert_that
-from util import fake_response_from_file
+from util import fake_response_from_file, sample_offer
 
-from aerooffers.offer import AircraftCategory, OfferPageItem
+from aerooffers import offers_db
+from aerooffers.offer import AircraftCategory, OfferPageItem, url_to_id
 from aerooffers.spiders import SegelflugDeSpider
 
 spider = SegelflugDeSpider.SegelflugDeSpider()
@@ -31,6 +34,80 @@ def test_collect_urls_of_all_offer_on_listing_page() -> None:
     )
 
 
+def test_skip_offers_known_when_spider_was_opened() -> None:
+    # given
+    known_url = "https://www.segelflug.de/index.php/de/kleinanzeigen/filterseite-de/ad/com-djclassifieds-cat-sailplanes,5/newfotosls8aneo15mjuniorenwmteamflugzeug2022,753"
+    spider_with_known_offers = SegelflugDeSpider.SegelflugDeSpider()
+    with (
+        patch(
+            "aerooffers.offers_db.get_offer_ids", return_value={url_to_id(known_url)}
+        ) as get_offer_ids,
+        patch("aerooffers.offers_db.get_archived_offer_ids", return_value=set()),
+    ):
+        spider_with_known_offers.load_known_offers()
+    listing_page_http_response = fake_response_from_file(
+        "spiders/samples/segelflug_de_listing.html",
+        url="https://www.segelflug.de/index.php/de/kleinanzeigen/filterseite-de/com-djclassifieds-cat-sailplanes,5",
+    )
+
+    # when
+    with patch(
+        "aerooffers.offers_db.existing_offer_ids", return_value=set()
+    ) as existing_offer_ids:
+        detail_pages = list(spider_with_known_offers.parse(listing_page_http_response))
+
+    # then
+    get_offer_ids.assert_called_once_with("https://www.segelflug.de")
+    assert_that(detail_pages).is_length(47)
+    assert_that([page.url for page in detail_pages]).does_not_contain(known_url)
+    # only offers missing in the index are double-checked in db
+    assert_that(existing_offer_ids.call_args.args[0]).is_length(47)
+
+
+def test_crawl_known_offers_again_when_refreshing() -> None:
+    # given
+    refreshing_spider = SegelflugDeSpider.SegelflugDeSpider()
+    refreshing_spider.refresh_known_offers = True
+    listing_page_http_response = fake_response_from_file(
+        "spiders/samples/segelflug_de_listing.html",
+        url="https://www.segelflug.de/index.php/de/kleinanzeigen/filterseite-de/com-djclassifieds-cat-sailplanes,5",
+    )
+
+    # when
+    with patch("aerooffers.offers_db.existing_offer_ids") as existing_offer_ids:
+        detail_pages = list(refreshing_spider.parse(listing_page_http_response))
+
+    # then
+    assert_that(detail_pages).is_length(48)
+    existing_offer_ids.assert_not_called()
+
+
+@pytest.mark.parametrize("refresh_known_offers", [False, True])
+def test_skip_archived_offers_still_listed(
+    sqlite_db: None, refresh_known_offers: bool
+) -> None:
+    # given
+    archived_url = "https://www.segelflug.de/index.php/de/kleinanzeigen/filterseite-de/ad/com-djclassifieds-cat-sailplanes,5/newfotosls8aneo15mjuniorenwmteamflugzeug2022,753"
+    offers_db.store_offer(
+        sample_offer(url=archived_url, published_at=date(2020, 5, 1)), spider="test"
+    )
+    offers_db.archive_offers(date(2023, 1, 1))
+    crawling_spider = SegelflugDeSpider.SegelflugDeSpider()
+    crawling_spider.refresh_known_offers = refresh_known_offers
+    crawling_spider.load_known_offers()
+    listing_page_http_response = fake_response_from_file(
+        "spiders/samples/segelflug_de_listing.html",
+        url="https://www.segelflug.de/index.php/de/kleinanzeigen/filterseite-de/com-djclassifieds-cat-sailplanes,5",
+    )
+
+    # when
+    detail_pages = list(crawling_spider.parse(listing_page_http_response))
+
+    # then
+    assert_that(detail_pages).is_length(47)
+    assert_that([page.url for page in detail_pages]).does_not_contain(archived_url)
+
+
 def test_parse_detail_page() -> None:
     item: OfferPageItem = next(
         spider._parse_detail_page(
@@ -1,10 +1,12 @@
+from unittest.mock import patch
+
 from assertpy import assert_that
 from azure.cosmos import CosmosClient
 from util import sample_offer
 
 from aerooffers import offers_db
 from aerooffers.classifier.rule_based_classifier import RuleBasedClassifier
-from aerooffers.job_classify_offers import classify_pending
+from aerooffers.job_classify_offers import classify_from_change_feed, classify_pending
 from aerooffers.offer import AircraftCategory
 
 
@@ -53,3 +55,70 @@ def test_should_persist_manufacturer_and_model_if_classified(
     assert_that(ls1_offer.category).is_equal_to(AircraftCategory.glider)
     assert_that(ls1_offer.manufacturer).is_equal_to("Rolladen Schneider")
     assert_that(ls1_offer.model).is_equal_to("LS1")
+
+
+def test_classify_offers_from_change_feed(cosmos_db: CosmosClient) -> None:
+    # given
+    classified_offer_id = offers_db.store_offer(
+        sample_offer(url="https://offers.com/1"), spider="test"
+    )
+    offers_db.classify_offer(
+        offer_id=classified_offer_id,
+        classifier_name="Manual",
+        manufacturer="PZL Bielsko",
+        model="Bocian",
+    )
+    offers_db.store_offer(
+        sample_offer(url="https://offers.com/2", title="LS-1"), spider="test"
+    )
+
+    # when
+    offers_processed = classify_from_change_feed(RuleBasedClassifier())
+
+    # then
+    assert_that(offers_processed).is_equal_to(1)
+    assert_that(offers_db.get_unclassified_offers()).is_empty()
+    assert_that(offers_db.get_lease("classify_offers")).is_not_none()
+
+
+def test_classify_only_offers_written_since_last_change_feed_run(
+    cosmos_db: CosmosClient,
+) -> None:
+    # given
+    offers_db.store_offer(sample_offer(url="https://offers.com/1"), spider="test")
+    classify_from_change_feed(RuleBasedClassifier())
+
+    offers_db.store_offer(
+        sample_offer(url="https://offers.com/2", title="LS-1"), spider="test"
+    )
+
+    # when
+    offers_processed = classify_from_change_feed(RuleBasedClassifier())
+
+    # then
+    assert_that(offers_processed).is_equal_to(1)
+    assert_that(classify_from_change_feed(RuleBasedClassifier())).is_equal_to(0)
+    ls1_offer = offers_db.get_offers(manufacturer="Rolladen Schneider", model="LS1")
+    assert_that(ls1_offer).is_length(1)
+
+
+def test_should_update_summary_of_each_model_once_per_run(sqlite_db: None) -> None:
+    # given
+    for i in range(15):
+        offers_db.store_offer(
+            sample_offer(url=f"https://offers.com/{i}", title=f"LS-1 no. {i}"),
+            spider="test",
+        )
+
+    # when
+    with patch(
+        "aerooffers.offers_db.update_model_summary",
+        wraps=offers_db.update_model_summary,
+    ) as update_model_summary:
+        classify_pending(RuleBasedClassifier())
+
+    # then
+    update_model_summary.assert_called_once_with("Rolladen Schneider", "LS1")
+    summary = offers_db.get_model_summary("Rolladen Schneider", "LS1")
+    assert summary is not None
+    assert_that(summary.offers_count).is_equal_to(15)
@@ -0,0 +1,36 @@
+import copy
+
+from assertpy import assert_that
+
+from aerooffers.db import indexing_policy_drift, OFFERS_INDEXING_POLICY
+
+
+def test_no_drift_of_expected_indexing_policy() -> None:
+    # given policy as returned by cosmos, with system paths and different letter case
+    live_policy = copy.deepcopy(OFFERS_INDEXING_POLICY)
+    live_policy["excludedPaths"].append(dict(path='/"_etag"/?'))
+    live_policy["compositeIndexes"][0][0]["order"] = "Descending"
+
+    # expect
+    assert_that(indexing_policy_drift(live_policy)).is_empty()
+
+
+def test_should_report_missing_paths_and_composite_indexes() -> None:
+    # given
+    live_policy = dict(
+        indexingMode="consistent",
+        includedPaths=[dict(path="/*")],
+        excludedPaths=[],
+        compositeIndexes=OFFERS_INDEXING_POLICY["compositeIndexes"][1:],
+    )
+
+    # when
+    drift = indexing_policy_drift(live_policy)
+
+    # then
+    assert_that(drift).is_length(3)
+    assert_that(drift[0]).starts_with("missing included paths")
+    assert_that(drift[1]).is_equal_to("missing excluded paths: ['/*']")
+    assert_that(drift[2]).contains(
+        "('/published_at', 'descending'), ('/id', 'descending')"
+    )
@@ -0,0 +1,63 @@
+from collections.abc import Callable, Iterator, Mapping
+from typing import Any
+
+from assertpy import assert_that
+
+from aerooffers.db_stats import instrumented, process_stats, scoped_stats
+
+type ResponseHook = Callable[[Mapping[str, Any], object], None]
+
+
+class FakeContainer:
+    id = "offers"
+
+    def upsert_item(self, body: dict[str, Any], response_hook: ResponseHook) -> None:
+        response_hook({"x-ms-request-charge": "10.5"}, body)
+
+    def query_items(
+        self, query: str, response_hook: ResponseHook
+    ) -> Iterator[dict[str, Any]]:
+        for page in [[dict(id="1"), dict(id="2")], [dict(id="3")]]:
+            response_hook(
+                {"x-ms-request-charge": "2.5", "x-ms-item-count": str(len(page))},
+                dict(Documents=page),
+            )
+            yield from page
+
+
+def store(container: Any) -> None:
+    container.upsert_item(body=dict(id="1"))
+
+
+def search(container: Any) -> list[dict[str, Any]]:
+    return list(container.query_items(query="SELECT * FROM offers o"))
+
+
+def test_should_aggregate_request_charge_by_call_site() -> None:
+    # given
+    process_stats.reset()
+    container = instrumented(FakeContainer())  # type: ignore[arg-type]
+
+    # when
+    with scoped_stats() as request_stats:
+        store(container)
+        store(container)
+        found = search(container)
+    store(container)
+
+    # then
+    assert_that(found).is_length(3)
+    assert_that(container.id).is_equal_to("offers")
+
+    assert_that(request_stats.by_call_site["store"].calls).is_equal_to(2)
+    assert_that(request_stats.by_call_site["store"].request_charge).is_equal_to(21.0)
+    assert_that(request_stats.by_call_site["store"].item_count).is_equal_to(2)
+    assert_that(request_stats.by_call_site["search"].calls).is_equal_to(2)
+    assert_that(request_stats.by_call_site["search"].item_count).is_equal_to(3)
+    assert_that(request_stats.by_call_site["search"].query).is_equal_to(
+        "SELECT * FROM offers o"
+    )
+    assert_that(request_stats.total().request_charge).is_equal_to(26.0)
+
+    assert_that(process_stats.total().calls).is_equal_to(5)
+    assert_that(process_stats.total().request_charge).is_equal_to(36.5)
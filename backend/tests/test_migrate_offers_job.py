@@ -0,0 +1,53 @@
+import pytest
+from assertpy import assert_that
+from azure.cosmos import CosmosClient
+from util import sample_offer
+
+from aerooffers import db, offers_db
+from aerooffers.db_stats import instrumented
+from aerooffers.job_migrate_offers import migrate_offers
+from aerooffers.offer import AircraftCategory, url_to_id
+
+
+def test_should_migrate_offers_to_container_partitioned_by_category(
+    cosmos_db: CosmosClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # given
+    glider_id = offers_db.store_offer(
+        sample_offer(url="https://offers.com/1", category=AircraftCategory.glider),
+        spider="test",
+    )
+    offers_db.store_offer(
+        sample_offer(url="https://offers.com/2", category=AircraftCategory.tmg),
+        spider="test",
+    )
+    assert_that(migrate_offers("offers_by_category")).is_equal_to(2)
+
+    # when offer stored after first run, and job run again to catch up
+    offers_db.store_offer(
+        sample_offer(url="https://offers.com/3", category=AircraftCategory.glider),
+        spider="test",
+    )
+    assert_that(migrate_offers("offers_by_category")).is_equal_to(1)
+
+    # then offers are served from migrated container
+    monkeypatch.setattr(
+        db,
+        "_offers_container",
+        instrumented(
+            db.lazy_database().get_container_client(container="offers_by_category")
+        ),
+    )
+    monkeypatch.setattr(db, "_offers_partition_key_path", None)
+    assert_that(db.offers_partition_key_path()).is_equal_to("/category")
+
+    gliders = offers_db.get_offers(category=AircraftCategory.glider)
+    assert_that(gliders).is_length(2)
+    assert_that(
+        offers_db.existing_offer_ids(["https://offers.com/2", "https://offers.com/4"])
+    ).is_equal_to({url_to_id("https://offers.com/2")})
+
+    offers_db.classify_offer(glider_id, "Manual", "Schempp-Hirth", "Discus")
+    assert_that(
+        offers_db.get_offers(manufacturer="Schempp-Hirth", model="Discus")
+    ).is_length(1)
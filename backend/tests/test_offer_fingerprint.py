@@ -0,0 +1,67 @@
+import json
+
+from assertpy import assert_that
+
+from aerooffers.offer_fingerprint import (
+    DuplicateCandidate,
+    find_duplicate,
+    fingerprint,
+    offer_features,
+    similarity,
+)
+
+
+def test_should_normalize_title_words() -> None:
+    assert_that(offer_features("Schleicher ASK-21, Motorsegler über Grün")).is_equal_to(
+        {"schleicher", "ask", "21", "motorsegler", "uber", "grun"}
+    )
+    assert_that(offer_features("ASK21")).is_equal_to(offer_features("ask 21"))
+
+
+def test_should_estimate_similarity_of_offers() -> None:
+    # given
+    offer = fingerprint(
+        offer_features("Schleicher ASK 21 Doppelsitzer", "45000", 2100, "Hamburg")
+    )
+    same_aircraft = fingerprint(
+        offer_features("ASK21 Schleicher Doppelsitzer", "44900", 2150, "Hamburg")
+    )
+    other_aircraft = fingerprint(
+        offer_features("Schempp-Hirth Discus bT", "45000", 2100, "Hamburg")
+    )
+
+    # expect
+    assert_that(similarity(offer.minhash, same_aircraft.minhash)).is_greater_than(0.8)
+    assert_that(similarity(offer.minhash, other_aircraft.minhash)).is_less_than(0.5)
+    assert_that(set(offer.bands) & set(same_aircraft.bands)).is_not_empty()
+    assert_that(fingerprint([]).bands).is_empty()
+
+
+def test_should_link_duplicate_to_first_offer_of_the_group() -> None:
+    # given
+    new_offer = fingerprint(offer_features("LS4 Segelflugzeug", "30000"))
+    duplicate = DuplicateCandidate(id="b", minhash=new_offer.minhash, duplicate_of="a")
+    unrelated = DuplicateCandidate(
+        id="c",
+        minhash=fingerprint(offer_features("DG-800 Motorsegler")).minhash,
+        duplicate_of=None,
+    )
+
+    # expect
+    assert_that(find_duplicate(new_offer, [unrelated, duplicate])).is_equal_to("a")
+    assert_that(find_duplicate(new_offer, [unrelated])).is_none()
+
+
+def test_should_keep_signature_exact_when_stored_as_json_numbers() -> None:
+    # given
+    new_offer = fingerprint(offer_features("ASK 21 Schleicher", "45000", 2100))
+
+    # when
+    # Cosmos DB stores JSON numbers as doubles
+    stored_minhash = [
+        int(float(value)) for value in json.loads(json.dumps(new_offer.minhash))
+    ]
+
+    # then
+    assert_that(stored_minhash).is_equal_to(new_offer.minhash)
+    assert_that(similarity(new_offer.minhash, stored_minhash)).is_equal_to(1)
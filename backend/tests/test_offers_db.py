@@ -1,11 +1,14 @@
 from datetime import date
+from unittest.mock import patch
 
+import pytest
 from assertpy import assert_that
 from azure.cosmos import CosmosClient
+from azure.cosmos.exceptions import CosmosResourceNotFoundError
 from util import sample_offer
 
 from aerooffers import db, offers_db
-from aerooffers.offer import AircraftCategory, Offer
+from aerooffers.offer import AircraftCategory, ClassificationResult, Offer, url_to_id
 
 
 def test_should_store_and_fetch_offer(cosmos_db: CosmosClient) -> None:
@@ -19,6 +22,7 @@ def test_should_store_and_fetch_offer(cosmos_db: CosmosClient) -> None:
     assert_that(all_offers).is_length(1)
     glider_offer = all_offers[0]
     assert_that(glider_offer.title).is_equal_to("Glider A")
+    assert glider_offer.price is not None
     assert_that(glider_offer.price.amount).is_equal_to("29500")
     assert_that(glider_offer.price.currency).is_equal_to("EUR")
 
@@ -111,6 +115,157 @@ def test_should_order_offers_by_published_date_desc(cosmos_db: CosmosClient) ->
     assert_that(orders[3].published_at).is_equal_to("2023-03-15")
 
 
+def test_should_paginate_offers_with_cursor(cosmos_db: CosmosClient) -> None:
+    # given
+    for i, published_at in enumerate(
+        [date(2024, 1, 2), date(2024, 2, 1), date(2024, 2, 1), date(2023, 3, 15)]
+    ):
+        offers_db.store_offer(
+            sample_offer(url=f"https://offers.com/{i}", published_at=published_at),
+            spider="test",
+        )
+    all_offers = offers_db.get_offers()
+
+    # when
+    first_page = offers_db.get_offers(limit=2)
+    second_page = offers_db.get_offers(
+        limit=2, cursor=offers_db.offers_cursor(first_page[-1])
+    )
+    last_page = offers_db.get_offers(
+        limit=2, cursor=offers_db.offers_cursor(second_page[-1])
+    )
+
+    # then
+    assert_that(first_page + second_page).is_equal_to(all_offers)
+    assert_that(second_page[0].published_at).is_equal_to("2024-01-02")
+    assert_that(last_page).is_empty()
+
+
+def test_should_reject_invalid_cursor(cosmos_db: CosmosClient) -> None:
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        offers_db.get_offers(cursor="not a cursor")
+
+
+def test_should_fetch_only_selected_offer_fields(cosmos_db: CosmosClient) -> None:
+    # given
+    offers_db.store_offer(sample_offer(location="Moon"), spider="test")
+
+    # when
+    slim_offers = offers_db.get_offers(fields=["title", "price"])
+
+    # then
+    assert_that(slim_offers).is_length(1)
+    slim_offer = slim_offers[0]
+    assert_that(slim_offer.title).is_equal_to("Glider A")
+    assert_that(slim_offer.price).is_not_none()
+    assert_that(slim_offer.published_at).is_equal_to("2024-07-27")
+    assert_that(slim_offer.location).is_none()
+    assert_that(slim_offer.url).is_none()
+
+
+def test_should_reject_unknown_offer_fields(cosmos_db: CosmosClient) -> None:
+    with pytest.raises(ValueError, match="Unknown offer fields"):
+        offers_db.get_offers(fields=["title", "_etag"])
+
+
+def test_should_classify_offers_in_bulk(cosmos_db: CosmosClient) -> None:
+    # given
+    ls1_offer_id = offers_db.store_offer(
+        sample_offer(url="https://offers.com/1", title="LS-1"), spider="test"
+    )
+    unknown_offer_id = offers_db.store_offer(
+        sample_offer(url="https://offers.com/2", title="Something"), spider="test"
+    )
+
+    # when
+    outcomes = offers_db.classify_offers_bulk(
+        {
+            ls1_offer_id: ClassificationResult("Rolladen Schneider", "LS1"),
+            unknown_offer_id: ClassificationResult.unknown(),
+            "not-existing-id": ClassificationResult.unknown(),
+        },
+        classifier_name="Manual",
+    )
+
+    # then
+    assert_that(outcomes[ls1_offer_id]).is_none()
+    assert_that(outcomes[unknown_offer_id]).is_none()
+    assert_that(outcomes["not-existing-id"]).is_instance_of(CosmosResourceNotFoundError)
+    assert_that(offers_db.get_unclassified_offers()).is_empty()
+    ls1_offer = offers_db.get_offers(manufacturer="Rolladen Schneider", model="LS1")
+    assert_that(ls1_offer).is_length(1)
+
+
+def test_should_count_offers_by_category_manufacturer_and_model(
+    cosmos_db: CosmosClient,
+) -> None:
+    # given
+    ls1_offer_id = offers_db.store_offer(
+        sample_offer(url="https://offers.com/1", title="LS-1"), spider="test"
+    )
+    offers_db.classify_offer(ls1_offer_id, "Manual", "Rolladen Schneider", "LS1")
+    offers_db.store_offer(
+        sample_offer(
+            url="https://offers.com/2",
+            title="Cessna 172",
+            category=AircraftCategory.airplane,
+        ),
+        spider="test",
+    )
+
+    # when
+    offers_db.rebuild_facets()
+
+    # then
+    facets = offers_db.get_facets()
+    assert_that(facets.categories).is_equal_to(dict(glider=1, airplane=1))
+    assert_that(facets.manufacturers).is_equal_to({"Rolladen Schneider": 1})
+    assert_that(facets.models).is_equal_to({"Rolladen Schneider": {"LS1": 1}})
+
+
+def test_should_link_duplicate_offers_of_other_portals(
+    cosmos_db: CosmosClient,
+) -> None:
+    # given
+    first_id = offers_db.store_offer(
+        sample_offer(url="https://offers.com/1", title="Schleicher ASK 21"),
+        spider="offers",
+    )
+
+    # when
+    duplicate_id = offers_db.store_offer(
+        sample_offer(url="https://other.com/1", title="ASK21 Schleicher"),
+        spider="other",
+    )
+
+    # then
+    offers_by_id = {offer.id: offer for offer in offers_db.get_offers()}
+    assert_that(offers_by_id[duplicate_id].duplicate_of).is_equal_to(first_id)
+    assert_that(offers_by_id[first_id].duplicate_of).is_none()
+    assert_that(
+        [offer.id for offer in offers_db.get_offers(collapse_duplicates=True)]
+    ).is_equal_to([first_id])
+
+
+def test_should_patch_only_changed_offers_when_refreshed(
+    cosmos_db: CosmosClient,
+) -> None:
+    # given
+    offer_id = offers_db.store_offer(sample_offer(price="30000"), spider="test")
+
+    # when
+    unchanged = offers_db.refresh_offer(sample_offer(price="30000"), spider="test")
+    updated = offers_db.refresh_offer(sample_offer(price="27500"), spider="test")
+
+    # then
+    assert_that(unchanged).is_equal_to(offers_db.RefreshOutcome.unchanged)
+    assert_that(updated).is_equal_to(offers_db.RefreshOutcome.updated)
+    offer_doc = db.offers_container().read_item(item=offer_id, partition_key=offer_id)
+    assert_that(offer_doc["price"]["amount"]).is_equal_to("27500")
+    assert_that(offer_doc["price_history"][0]["amount"]).is_equal_to("30000")
+    assert_that(offer_doc).contains_key("refreshed_at")
+
+
 def test_should_check_url_exists(cosmos_db: CosmosClient) -> None:
     # given offer exists in db
     offers_db.store_offer(sample_offer(url="https://offers.com/1"), spider="test")
@@ -123,6 +278,42 @@ def test_should_check_url_exists(cosmos_db: CosmosClient) -> None:
     assert_that(offers_db.offer_url_exists("https://offers.com/2")).is_false()
 
 
+def test_should_find_existing_offer_ids_in_bulk(cosmos_db: CosmosClient) -> None:
+    # given offers exist in db
+    offers_db.store_offer(sample_offer(url="https://offers.com/1"), spider="test")
+    offers_db.store_offer(sample_offer(url="https://offers.com/3"), spider="test")
+
+    # when
+    existing_ids = offers_db.existing_offer_ids(
+        [
+            "https://offers.com/1",
+            "https://offers.com/2",
+            "https://offers.com/3",
+        ]
+    )
+
+    # then
+    assert_that(existing_ids).is_equal_to(
+        {url_to_id("https://offers.com/1"), url_to_id("https://offers.com/3")}
+    )
+    assert_that(offers_db.existing_offer_ids([])).is_empty()
+
+
+def test_should_get_ids_of_all_offers_with_url_prefix(cosmos_db: CosmosClient) -> None:
+    # given
+    offers_db.store_offer(sample_offer(url="https://offers.com/1"), spider="test")
+    offers_db.store_offer(sample_offer(url="https://offers.com/2"), spider="test")
+    offers_db.store_offer(sample_offer(url="https://other.com/1"), spider="test")
+
+    # when
+    offer_ids = offers_db.get_offer_ids("https://offers.com/")
+
+    # then
+    assert_that(offer_ids).is_equal_to(
+        {url_to_id("https://offers.com/1"), url_to_id("https://offers.com/2")}
+    )
+
+
 def test_should_not_store_page_content_in_offers_container(
     cosmos_db: CosmosClient,
 ) -> None:
@@ -136,3 +327,26 @@ def test_should_not_store_page_content_in_offers_container(
     # then - page_content should NOT be in offers container
     offer_doc = db.offers_container().read_item(item=offer_id, partition_key=offer_id)
     assert_that(offer_doc).does_not_contain_key("page_content")
+
+
+def test_should_keep_ids_of_archived_offers(cosmos_db: CosmosClient) -> None:
+    # given
+    old_offer_id = offers_db.store_offer(
+        sample_offer(url="https://offers.com/1", published_at=date(2020, 5, 1)),
+        spider="test",
+    )
+    offers_db.store_offer(sample_offer(url="https://offers.com/2"), spider="test")
+
+    # when
+    with patch("aerooffers.offers_db.store_archived_offer") as store_archived_offer:
+        archived_offers = offers_db.archive_offers(date(2023, 1, 1))
+
+    # then
+    assert_that(archived_offers).is_equal_to(1)
+    store_archived_offer.assert_called_once()
+    assert_that(offers_db.get_offer_ids("https://offers.com")).does_not_contain(
+        old_offer_id
+    )
+    assert_that(offers_db.get_archived_offer_ids("https://offers.com")).is_equal_to(
+        {old_offer_id}
+    )
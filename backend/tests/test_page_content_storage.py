@@ -2,7 +2,7 @@ from unittest.mock import MagicMock, patch
 
 from assertpy import assert_that
 
-from aerooffers.page_content_storage import store_page_content
+from aerooffers.page_content_storage import store_archived_offer, store_page_content
 
 
 def test_should_store_page_content() -> None:
@@ -33,3 +33,23 @@ def test_should_store_page_content() -> None:
     )
     assert_that(call_args.kwargs["metadata"]["url"]).is_equal_to(url)
     assert_that(call_args.kwargs["metadata"]).contains_key("stored_at")
+
+
+def test_should_store_archived_offer() -> None:
+    with patch(
+        "aerooffers.page_content_storage._get_blob_service_client"
+    ) as mock_get_client:
+        mock_blob_client = MagicMock()
+        mock_get_client.return_value.get_blob_client.return_value = mock_blob_client
+
+        # when
+        store_archived_offer("test_offer_id", dict(id="test_offer_id", title="LS4"))
+
+    # then
+    mock_get_client.return_value.get_blob_client.assert_called_once_with(
+        container="offers-archive", blob="test_offer_id.json"
+    )
+    call_args = mock_blob_client.upload_blob.call_args
+    assert_that(call_args.kwargs["data"]).is_equal_to(
+        '{"id": "test_offer_id", "title": "LS4"}'
+    )
@@ -1,13 +1,15 @@
+import asyncio
 from unittest.mock import MagicMock, patch
 
 import pytest
 from assertpy import assert_that
 from azure.cosmos import CosmosClient
 from scrapy.exceptions import DropItem
+from scrapy.settings import Settings
 from util import sample_offer
 
 from aerooffers import db, offers_db, pipelines
-from aerooffers.offer import AircraftCategory, url_to_id
+from aerooffers.offer import AircraftCategory, OfferPageItem, url_to_id
 
 
 @pytest.mark.parametrize(
@@ -127,6 +129,27 @@ def test_should_store_offer(cosmos_db: CosmosClient) -> None:
     assert_that(all_gliders_in_db[0].url).is_equal_to("https://offers.com/1")
 
 
+def test_should_store_new_offer_without_reading_it_first(
+    sqlite_db: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # given
+    crawler = MagicMock()
+    crawler.settings = Settings()
+    crawler.spider.name = "awesome_spider"
+    update_changed_offer = MagicMock()
+    monkeypatch.setattr(
+        offers_db.repository(), "update_changed_offer", update_changed_offer
+    )
+
+    # when
+    with patch("aerooffers.pipelines.store_page_content"):
+        pipelines.StoreOffer(crawler).process_item(sample_offer())
+
+    # then
+    update_changed_offer.assert_not_called()
+    assert_that(offers_db.get_offers()).is_length(1)
+
+
 def test_should_store_page_content_in_pipeline(cosmos_db: CosmosClient) -> None:
     # given
     test_page_content = (
@@ -172,3 +195,109 @@ def test_should_store_offer_in_db_and_page_content_in_blob_storage(
 
     # and - page_content should be stored via blob storage
     mock_store.assert_called_once_with(offer_id, test_page_content, offer.url)
+
+
+def test_should_store_offers_in_background_in_batches(cosmos_db: CosmosClient) -> None:
+    # given
+    offers = [
+        sample_offer(url=f"https://test.com/offer/{i}", title=f"Background Offer {i}")
+        for i in range(3)
+    ]
+    crawler = MagicMock()
+    crawler.spider.name = "test_spider"
+    crawler.settings = Settings(
+        {"STORE_OFFER_BATCH_SIZE": 2, "STORE_OFFER_FLUSH_INTERVAL": 0.1}
+    )
+    pipeline = pipelines.StoreOfferInBackground(crawler)
+
+    async def store_all_and_close() -> list[OfferPageItem]:
+        stored_items = await asyncio.gather(
+            *[pipeline.process_item(offer) for offer in offers]
+        )
+        await pipeline.close_spider()
+        return stored_items
+
+    # when
+    with patch("aerooffers.pipelines.store_page_content") as mock_store:
+        stored_items = asyncio.run(store_all_and_close())
+
+    # then - first 2 offers are stored as full batch, the last one after flush interval
+    assert_that(stored_items).is_equal_to(offers)
+    for offer in offers:
+        offer_id = url_to_id(offer.url)
+        offer_doc = db.offers_container().read_item(
+            item=offer_id, partition_key=offer_id
+        )
+        assert_that(offer_doc["title"]).is_equal_to(offer.title)
+        assert_that(offer_doc["spider"]).is_equal_to("test_spider")
+    assert_that(mock_store.call_count).is_equal_to(3)
+    assert_that(crawler.stats.inc_value.call_count).is_equal_to(3)
+    crawler.stats.inc_value.assert_called_with("items_stored")
+
+
+def test_should_drop_offers_which_could_not_be_stored_in_background() -> None:
+    # given
+    crawler = MagicMock()
+    crawler.settings = Settings({"STORE_OFFER_BATCH_SIZE": 2})
+    pipeline = pipelines.StoreOfferInBackground(crawler)
+
+    async def store_and_close() -> tuple[OfferPageItem | BaseException, ...]:
+        results = await asyncio.gather(
+            pipeline.process_item(sample_offer(url="https://offers.com/1")),
+            pipeline.process_item(sample_offer(url="https://offers.com/2")),
+            return_exceptions=True,
+        )
+        await pipeline.close_spider()
+        return results
+
+    # when
+    with patch(
+        "aerooffers.pipelines.store_offers",
+        return_value=["some-id", Exception("Cosmos is down")],
+    ):
+        results = asyncio.run(store_and_close())
+
+    # then
+    assert_that(results[0]).is_instance_of(OfferPageItem)
+    assert_that(results[1]).is_instance_of(DropItem)
+    assert_that(str(results[1])).contains("Cosmos is down")
+    crawler.stats.inc_value.assert_any_call("items_stored")
+    crawler.stats.inc_value.assert_any_call("items_store_failed")
+
+
+def test_should_store_page_content_of_changed_offers_only_when_refreshing() -> None:
+    # given
+    crawler = MagicMock()
+    crawler.settings = Settings(
+        {"STORE_OFFER_BATCH_SIZE": 2, "REFRESH_KNOWN_OFFERS": True}
+    )
+    pipeline = pipelines.StoreOfferInBackground(crawler)
+    unchanged_offer = sample_offer(url="https://offers.com/1")
+    updated_offer = sample_offer(url="https://offers.com/2")
+
+    async def store_and_close() -> None:
+        await asyncio.gather(
+            pipeline.process_item(unchanged_offer),
+            pipeline.process_item(updated_offer),
+        )
+        await pipeline.close_spider()
+
+    # when
+    with (
+        patch(
+            "aerooffers.pipelines.refresh_offers",
+            return_value=[
+                offers_db.RefreshOutcome.unchanged,
+                offers_db.RefreshOutcome.updated,
+            ],
+        ),
+        patch("aerooffers.pipelines.store_page_content") as mock_store,
+    ):
+        asyncio.run(store_and_close())
+
+    # then
+    mock_store.assert_called_once_with(
+        url_to_id(updated_offer.url), updated_offer.page_content, updated_offer.url
+    )
+    crawler.stats.inc_value.assert_any_call("items_unchanged")
+    crawler.stats.inc_value.assert_any_call("items_updated")
@@ -0,0 +1,90 @@
+from unittest.mock import patch
+
+from assertpy import assert_that
+from util import sample_offer
+
+from aerooffers import offers_db
+from aerooffers.offer import AircraftCategory
+from aerooffers.query_cache import QueryCache
+
+
+def test_should_load_value_once_until_invalidated() -> None:
+    # given
+    cache = QueryCache[int]()
+    loads = []
+
+    def load() -> int:
+        loads.append(1)
+        return len(loads)
+
+    # expect
+    assert_that(cache.get_or_load("key", load)).is_equal_to(1)
+    assert_that(cache.get_or_load("key", load)).is_equal_to(1)
+    assert_that(cache.get_or_load("other key", load)).is_equal_to(2)
+
+    # when
+    cache.invalidate()
+
+    # then
+    assert_that(cache.get_or_load("key", load)).is_equal_to(3)
+
+
+def test_should_expire_values_after_ttl() -> None:
+    # given
+    cache = QueryCache[str](ttl=10)
+
+    with patch("aerooffers.query_cache.time.monotonic", return_value=100):
+        cache.get_or_load("key", lambda: "old")
+
+    # expect
+    with patch("aerooffers.query_cache.time.monotonic", return_value=109):
+        assert_that(cache.get_or_load("key", lambda: "new")).is_equal_to("old")
+    with patch("aerooffers.query_cache.time.monotonic", return_value=111):
+        assert_that(cache.get_or_load("key", lambda: "new")).is_equal_to("new")
+
+
+def test_should_evict_least_recently_used_values() -> None:
+    # given
+    cache = QueryCache[str](max_entries=2)
+    cache.get_or_load("a", lambda: "a")
+    cache.get_or_load("b", lambda: "b")
+    cache.get_or_load("a", lambda: "a2")
+
+    # when
+    cache.get_or_load("c", lambda: "c")
+
+    # then
+    assert_that(len(cache)).is_equal_to(2)
+    assert_that(cache.get_or_load("a", lambda: "a2")).is_equal_to("a")
+    assert_that(cache.get_or_load("b", lambda: "b2")).is_equal_to("b2")
+
+
+def test_should_not_cache_when_ttl_is_zero() -> None:
+    # given
+    cache = QueryCache[str](ttl=0)
+    cache.get_or_load("key", lambda: "old")
+
+    # expect
+    assert_that(cache.get_or_load("key", lambda: "new")).is_equal_to("new")
+    assert_that(len(cache)).is_equal_to(0)
+
+
+def test_should_serve_cached_offers_until_offers_are_stored(sqlite_db: None) -> None:
+    # given
+    offers_db.store_offer(sample_offer(url="https://offers.com/1"), spider="test")
+    first_page = offers_db.get_cached_offers(category=AircraftCategory.glider)
+
+    # expect served without db round-trip
+    with patch.object(offers_db.repository(), "get_offers") as get_offers:
+        assert_that(
+            offers_db.get_cached_offers(category=AircraftCategory.glider)
+        ).is_equal_to(first_page)
+        get_offers.assert_not_called()
+
+    # when
+    offers_db.store_offer(sample_offer(url="https://offers.com/2"), spider="test")
+
+    # then
+    assert_that(
+        offers_db.get_cached_offers(category=AircraftCategory.glider)
+    ).is_length(2)
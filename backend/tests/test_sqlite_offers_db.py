@@ -0,0 +1,510 @@
+from datetime import date
+
+import pytest
+from assertpy import assert_that
+from util import sample_offer
+
+from aerooffers import offers_db
+from aerooffers.job_rebuild_model_summaries import rebuild_model_summaries
+from aerooffers.offer import (
+    AircraftCategory,
+    ClassificationResult,
+    ModelSummary,
+    url_to_id,
+)
+from aerooffers.sqlite_offers_db import SqliteOffersRepository
+
+
+def test_should_store_and_fetch_offer(sqlite_db: None) -> None:
+    # given
+    offers_db.store_offer(
+        sample_offer(price="29500", currency="EUR", hours=1200), spider="test"
+    )
+
+    # when
+    all_offers = offers_db.get_offers()
+
+    # then
+    assert_that(all_offers).is_length(1)
+    glider_offer = all_offers[0]
+    assert_that(glider_offer.id).is_equal_to(url_to_id("https://offers.com/1"))
+    assert_that(glider_offer.title).is_equal_to("Glider A")
+    assert_that(glider_offer.category).is_equal_to("glider")
+    assert_that(glider_offer.published_at).is_equal_to("2024-07-27")
+    assert_that(glider_offer.hours).is_equal_to(1200)
+    assert_that(glider_offer.spider).is_equal_to("test")
+    assert glider_offer.price is not None
+    assert_that(glider_offer.price.amount).is_equal_to("29500")
+    assert_that(glider_offer.price.currency).is_equal_to("EUR")
+
+
+def test_should_filter_offers(sqlite_db: None) -> None:
+    # given
+    stored_offer_id = offers_db.store_offer(sample_offer(), spider="test")
+    offers_db.classify_offer(
+        offer_id=stored_offer_id,
+        classifier_name="Manual",
+        manufacturer="Schempp-Hirth",
+        model="Mini-Nimbus",
+    )
+
+    # expect
+    assert_that(offers_db.get_offers(category=AircraftCategory.glider)).is_length(1)
+    assert_that(offers_db.get_offers(category=AircraftCategory.airplane)).is_empty()
+    assert_that(
+        offers_db.get_offers(manufacturer="Schempp-Hirth", model="Mini-Nimbus")
+    ).is_length(1)
+    assert_that(
+        offers_db.get_offers(manufacturer="Alexander Schleicher", model="ASG 29 E")
+    ).is_empty()
+
+
+def test_should_paginate_offers_with_cursor(sqlite_db: None) -> None:
+    # given
+    for i, published_at in enumerate(
+        [date(2024, 1, 2), date(2024, 2, 1), date(2024, 2, 1), date(2023, 3, 15)]
+    ):
+        offers_db.store_offer(
+            sample_offer(url=f"https://offers.com/{i}", published_at=published_at),
+            spider="test",
+        )
+    all_offers = offers_db.get_offers()
+
+    # when
+    first_page = offers_db.get_offers(limit=2)
+    second_page = offers_db.get_offers(
+        limit=2, cursor=offers_db.offers_cursor(first_page[-1])
+    )
+    last_page = offers_db.get_offers(
+        limit=2, cursor=offers_db.offers_cursor(second_page[-1])
+    )
+
+    # then
+    assert_that([offer.published_at for offer in all_offers]).is_equal_to(
+        ["2024-02-01", "2024-02-01", "2024-01-02", "2023-03-15"]
+    )
+    assert_that(first_page + second_page).is_equal_to(all_offers)
+    assert_that(last_page).is_empty()
+    assert_that(offers_db.get_offers(offset=3)).is_equal_to(all_offers[3:])
+
+
+def test_should_iterate_offers_page_by_page(sqlite_db: None) -> None:
+    # given
+    for i in range(5):
+        offers_db.store_offer(
+            sample_offer(
+                url=f"https://offers.com/{i}", published_at=date(2024, 1, i + 1)
+            ),
+            spider="test",
+        )
+    all_offers = offers_db.get_offers()
+
+    # expect
+    assert_that(list(offers_db.iter_offers(limit=10, page_size=2))).is_equal_to(
+        all_offers
+    )
+    assert_that(
+        list(offers_db.iter_offers(offset=1, limit=3, page_size=2))
+    ).is_equal_to(all_offers[1:4])
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        next(offers_db.iter_offers(cursor="abc"))
+
+
+def test_should_link_duplicate_offers_of_other_portals(sqlite_db: None) -> None:
+    # given
+    first_id = offers_db.store_offer(
+        sample_offer(url="https://offers.com/1", title="Schleicher ASK 21"),
+        spider="offers",
+    )
+    same_portal_id = offers_db.store_offer(
+        sample_offer(url="https://offers.com/2", title="Schleicher ASK 21"),
+        spider="offers",
+    )
+
+    # when
+    duplicate_id = offers_db.store_offer(
+        sample_offer(url="https://other.com/1", title="ASK21 Schleicher"),
+        spider="other",
+    )
+
+    # then
+    offers_by_id = {offer.id: offer for offer in offers_db.get_offers()}
+    assert_that(offers_by_id[same_portal_id].duplicate_of).is_none()
+    assert_that([first_id, same_portal_id]).contains(
+        offers_by_id[duplicate_id].duplicate_of
+    )
+    assert_that(
+        [offer.id for offer in offers_db.get_offers(collapse_duplicates=True)]
+    ).does_not_contain(duplicate_id).contains(first_id, same_portal_id)
+
+
+def test_should_not_look_for_duplicates_of_offer_stored_again(
+    sqlite_db: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # given
+    first_id = offers_db.store_offer(
+        sample_offer(url="https://offers.com/1", title="ASK 21 Schleicher"),
+        spider="offers",
+    )
+    duplicate = sample_offer(url="https://other.com/1", title="ASK21 Schleicher")
+    duplicate_id = offers_db.store_offer(duplicate, spider="other")
+
+    def duplicate_candidates(*args: object) -> None:
+        raise AssertionError("duplicates looked up again")
+
+    monkeypatch.setattr(
+        offers_db.repository(), "duplicate_candidates", duplicate_candidates
+    )
+
+    # when
+    offers_db.store_offer(duplicate, spider="other")
+
+    # then
+    offers_by_id = {offer.id: offer for offer in offers_db.get_offers()}
+    assert_that(offers_by_id[duplicate_id].duplicate_of).is_equal_to(first_id)
+
+
+def test_should_update_only_changed_offers_when_refreshed(sqlite_db: None) -> None:
+    # given
+    offer_id = offers_db.store_offer(sample_offer(price="30000"), spider="test")
+
+    # when
+    unchanged = offers_db.refresh_offer(sample_offer(price="30000"), spider="test")
+    updated = offers_db.refresh_offer(
+        sample_offer(price="27500", hours=1500), spider="test"
+    )
+    stored = offers_db.refresh_offer(
+        sample_offer(url="https://offers.com/2"), spider="test"
+    )
+
+    # then
+    assert_that(unchanged).is_equal_to(offers_db.RefreshOutcome.unchanged)
+    assert_that(updated).is_equal_to(offers_db.RefreshOutcome.updated)
+    assert_that(stored).is_equal_to(offers_db.RefreshOutcome.stored)
+    offers_by_id = {offer.id: offer for offer in offers_db.get_offers()}
+    refreshed_offer = offers_by_id[offer_id]
+    assert refreshed_offer.price is not None
+    assert_that(refreshed_offer.price.amount).is_equal_to("27500")
+    assert_that(refreshed_offer.hours).is_equal_to(1500)
+    assert refreshed_offer.price_history is not None
+    assert_that(refreshed_offer.price_history).is_length(1)
+    assert_that(refreshed_offer.price_history[0]["amount"]).is_equal_to("30000")
+
+
+def test_should_update_summary_and_fingerprint_of_refreshed_offer(
+    sqlite_db: None,
+) -> None:
+    # given
+    offer = sample_offer(title="Discus 2b with trailer", hours=1000)
+    offer.price_in_euro = "30000.00"
+    offer_id = offers_db.store_offer(offer, spider="test")
+    offers_db.classify_offer(offer_id, "Manual", "Schempp-Hirth", "Discus 2")
+
+    # when
+    refreshed = sample_offer(
+        title="Discus 2b without trailer", price="27500", hours=1500
+    )
+    refreshed.price_in_euro = "27500.00"
+    offers_db.refresh_offer(refreshed, spider="test")
+
+    # then
+    summary = offers_db.get_model_summary("Schempp-Hirth", "Discus 2")
+    assert summary is not None
+    assert_that(summary.max_price_in_euro).is_equal_to("27500.00")
+    assert_that(summary.avg_hours).is_equal_to(1500)
+    duplicate_id = offers_db.store_offer(
+        sample_offer(
+            url="https://other.com/1",
+            title="Discus 2b without trailer",
+            price="27500",
+            hours=1500,
+        ),
+        spider="other",
+    )
+    offers_by_id = {offer.id: offer for offer in offers_db.get_offers()}
+    assert_that(offers_by_id[duplicate_id].duplicate_of).is_equal_to(offer_id)
+
+
+def test_should_keep_price_history_and_classification_of_offer_stored_again(
+    sqlite_db: None,
+) -> None:
+    # given
+    offer_id = offers_db.store_offer(sample_offer(price="30000"), spider="test")
+    offers_db.classify_offer(offer_id, "Manual", "Schempp-Hirth", "Discus")
+    offers_db.refresh_offer(sample_offer(price="28000"), spider="test")
+
+    # when
+    offers_db.store_offer(sample_offer(price="27500"), spider="test")
+
+    # then
+    stored_offer = offers_db.get_offers()[0]
+    assert stored_offer.price is not None
+    assert_that(stored_offer.price.amount).is_equal_to("27500")
+    assert stored_offer.price_history is not None
+    assert_that([entry["amount"] for entry in stored_offer.price_history]).is_equal_to(
+        ["30000", "28000"]
+    )
+    assert_that(stored_offer.model).is_equal_to("Discus")
+
+
+def test_should_archive_old_offers(sqlite_db: None) -> None:
+    # given
+    old_offer_id = offers_db.store_offer(
+        sample_offer(url="https://offers.com/1", published_at=date(2020, 5, 1)),
+        spider="offers",
+    )
+    duplicate_id = offers_db.store_offer(
+        sample_offer(url="https://other.com/1", published_at=date(2024, 5, 1)),
+        spider="other",
+    )
+    offers_db.classify_offer(old_offer_id, "Manual", "Schempp-Hirth", "Discus")
+
+    # when
+    archived_offers = offers_db.archive_offers(date(2023, 1, 1), batch_size=1)
+
+    # then
+    assert_that(archived_offers).is_equal_to(1)
+    assert_that([offer.id for offer in offers_db.get_offers()]).is_equal_to(
+        [duplicate_id]
+    )
+    # duplicate of archived offer is listed on its own now
+    assert_that(offers_db.get_offers(collapse_duplicates=True)).is_length(1)
+    summary = offers_db.get_model_summary("Schempp-Hirth", "Discus")
+    assert summary is not None
+    assert_that(summary.offers_count).is_equal_to(0)
+
+
+def test_should_fetch_only_selected_offer_fields(sqlite_db: None) -> None:
+    # given
+    offers_db.store_offer(sample_offer(location="Moon"), spider="test")
+
+    # when
+    slim_offer = offers_db.get_offers(fields=["title", "price"])[0]
+
+    # then
+    assert_that(slim_offer.title).is_equal_to("Glider A")
+    assert_that(slim_offer.price).is_not_none()
+    assert_that(slim_offer.published_at).is_equal_to("2024-07-27")
+    assert_that(slim_offer.location).is_none()
+    with pytest.raises(ValueError, match="Unknown offer fields"):
+        offers_db.get_offers(fields=["title", "secret"])
+
+
+def test_should_classify_and_unclassify_offers(sqlite_db: None) -> None:
+    # given
+    first_offer_id = offers_db.store_offer(
+        sample_offer(url="https://offers.com/1"), spider="test"
+    )
+    second_offer_id = offers_db.store_offer(
+        sample_offer(url="https://offers.com/2"), spider="test"
+    )
+
+    # when
+    outcomes = offers_db.classify_offers_bulk(
+        {
+            first_offer_id: ClassificationResult("PZL Bielsko", "Bocian"),
+            second_offer_id: ClassificationResult.unknown(),
+            "not-existing-id": ClassificationResult.unknown(),
+        },
+        classifier_name="Manual",
+    )
+
+    # then
+    assert_that(outcomes[first_offer_id]).is_none()
+    assert_that(outcomes[second_offer_id]).is_none()
+    assert_that(outcomes["not-existing-id"]).is_instance_of(LookupError)
+    assert_that(offers_db.get_unclassified_offers()).is_empty()
+
+    # when
+    offers_db.unclassify_offer(first_offer_id)
+
+    # then
+    unclassified_offers = offers_db.get_unclassified_offers()
+    assert_that(unclassified_offers).is_length(1)
+    assert_that(unclassified_offers[0].id).is_equal_to(first_offer_id)
+    assert_that(unclassified_offers[0].category).is_equal_to(AircraftCategory.glider)
+
+
+def test_should_find_existing_offers(sqlite_db: None) -> None:
+    # given
+    offers_db.store_offer(sample_offer(url="https://offers.com/1"), spider="test")
+    offers_db.store_offer(sample_offer(url="https://other.com/3"), spider="test")
+
+    # expect
+    assert_that(offers_db.offer_url_exists("https://offers.com/1")).is_true()
+    assert_that(offers_db.offer_url_exists("https://offers.com/2")).is_false()
+    assert_that(
+        offers_db.existing_offer_ids(["https://offers.com/1", "https://offers.com/2"])
+    ).is_equal_to({url_to_id("https://offers.com/1")})
+    assert_that(offers_db.get_offer_ids("https://offers.com/")).is_equal_to(
+        {url_to_id("https://offers.com/1")}
+    )
+
+
+def test_should_select_repository_with_env_variable(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # given
+    monkeypatch.setattr(offers_db, "_repository", None)
+    monkeypatch.setenv("OFFERS_DB", "sqlite")
+
+    # expect
+    assert_that(offers_db.repository()).is_instance_of(SqliteOffersRepository)
+    assert_that(offers_db.repository()).is_same_as(offers_db.repository())
+
+
+def test_should_maintain_model_summary_when_offers_are_classified(
+    sqlite_db: None,
+) -> None:
+    # given
+    offer_ids = []
+    for i, (price_in_euro, hours) in enumerate(
+        [("11000.00", 5000), ("45000.00", None), ("74500.00", 6200), (None, None)]
+    ):
+        offer = sample_offer(
+            url=f"https://offers.com/{i}", published_at=date(2025, 10, 10 + i)
+        )
+        offer.price_in_euro = price_in_euro
+        offer.hours = hours
+        offer_ids.append(offers_db.store_offer(offer, spider="test"))
+
+    # when
+    offers_db.classify_offer(offer_ids[0], "Manual", "Rolladen Schneider", "LS4")
+    offers_db.classify_offers_bulk(
+        {
+            offer_id: ClassificationResult("Rolladen Schneider", "LS4")
+            for offer_id in offer_ids[1:]
+        },
+        classifier_name="Manual",
+    )
+
+    # then
+    summary = offers_db.get_model_summary("Rolladen Schneider", "LS4")
+    assert_that(summary).is_equal_to(
+        ModelSummary(
+            manufacturer="Rolladen Schneider",
+            model="LS4",
+            offers_count=4,
+            min_price_in_euro="11000.00",
+            median_price_in_euro="45000.00",
+            max_price_in_euro="74500.00",
+            newest_published_at="2025-10-13",
+            avg_hours=5600,
+            avg_starts=None,
+        )
+    )
+    assert_that(offers_db.get_model_summary("Rolladen Schneider", "LS8")).is_none()
+
+
+def test_should_rebuild_summaries_of_all_models(sqlite_db: None) -> None:
+    # given
+    offer_id = offers_db.store_offer(sample_offer(), spider="test")
+    offers_db.repository().classify_offer(
+        offer_id, "Manual", "PZL Bielsko", "SZD-9 Bocian"
+    )
+
+    # when
+    models_count = rebuild_model_summaries()
+
+    # then
+    assert_that(models_count).is_greater_than(100)
+    bocian_summary = offers_db.get_model_summary("PZL Bielsko", "SZD-9 Bocian")
+    assert bocian_summary is not None
+    assert_that(bocian_summary.offers_count).is_equal_to(1)
+    ls4_summary = offers_db.get_model_summary("Rolladen Schneider", "LS4")
+    assert ls4_summary is not None
+    assert_that(ls4_summary.offers_count).is_equal_to(0)
+
+
+def test_should_count_offers_by_category_manufacturer_and_model(
+    sqlite_db: None,
+) -> None:
+    # given
+    ls1_offer_id = offers_db.store_offer(
+        sample_offer(url="https://offers.com/1", title="LS-1"), spider="test"
+    )
+    offers_db.classify_offer(ls1_offer_id, "Manual", "Rolladen Schneider", "LS1")
+    offers_db.store_offer(
+        sample_offer(
+            url="https://offers.com/2",
+            title="Cessna 172",
+            category=AircraftCategory.airplane,
+        ),
+        spider="test",
+    )
+
+    # when
+    offers_db.rebuild_facets()
+
+    # then
+    facets = offers_db.get_facets()
+    assert_that(facets.categories).is_equal_to(dict(glider=1, airplane=1))
+    assert_that(facets.manufacturers).is_equal_to({"Rolladen Schneider": 1})
+    assert_that(facets.models).is_equal_to({"Rolladen Schneider": {"LS1": 1}})
+
+
+def test_should_get_empty_facets_before_offers_were_counted(sqlite_db: None) -> None:
+    # given
+    offers_db.store_offer(sample_offer(), spider="test")
+
+    # when
+    facets = offers_db.get_facets()
+
+    # then
+    assert_that(facets.categories).is_empty()
+    assert_that(facets.updated_at).is_none()
+
+
+def test_should_update_summary_of_previous_model_when_reclassified(
+    sqlite_db: None,
+) -> None:
+    # given
+    offer_ids = [
+        offers_db.store_offer(
+            sample_offer(url=f"https://offers.com/{i}", title=f"Discus {i}"),
+            spider="test",
+        )
+        for i in range(3)
+    ]
+    for offer_id in offer_ids:
+        offers_db.classify_offer(offer_id, "Manual", "Schempp-Hirth", "Discus")
+
+    # when
+    offers_db.unclassify_offer(offer_ids[0])
+    offers_db.classify_offers_bulk(
+        {offer_ids[1]: ClassificationResult("Schempp-Hirth", "Ventus")},
+        classifier_name="Manual",
+    )
+    offers_db.classify_offer(offer_ids[2], "Manual", "Schempp-Hirth", "Ventus")
+
+    # then
+    discus_summary = offers_db.get_model_summary("Schempp-Hirth", "Discus")
+    ventus_summary = offers_db.get_model_summary("Schempp-Hirth", "Ventus")
+    assert discus_summary is not None
+    assert ventus_summary is not None
+    assert_that(discus_summary.offers_count).is_equal_to(
+        len(offers_db.get_offers(manufacturer="Schempp-Hirth", model="Discus"))
+    )
+    assert_that(discus_summary.offers_count).is_equal_to(1)
+    assert_that(ventus_summary.offers_count).is_equal_to(2)
+
+
+def test_should_not_count_duplicates_in_model_summary(sqlite_db: None) -> None:
+    # given
+    first_id = offers_db.store_offer(
+        sample_offer(url="https://offers.com/1", title="ASK 21 Schleicher"),
+        spider="offers",
+    )
+    duplicate_id = offers_db.store_offer(
+        sample_offer(url="https://other.com/1", title="ASK21 Schleicher"),
+        spider="other",
+    )
+
+    # when
+    for offer_id in (first_id, duplicate_id):
+        offers_db.classify_offer(offer_id, "Manual", "Alexander Schleicher", "ASK 21")
+
+    # then
+    summary = offers_db.get_model_summary("Alexander Schleicher", "ASK 21")
+    assert summary is not None
+    assert_that(summary.offers_count).is_equal_to(1)
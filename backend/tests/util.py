@@ -1,15 +1,8 @@
 import os
 from datetime import date
 
-from azure.cosmos import (
-    ContainerProxy,
-    IndexingMode,
-    PartitionKey,
-    ThroughputProperties,
-)
 from scrapy.http import HtmlResponse, Request
 
-from aerooffers.db import lazy_database
 from aerooffers.offer import AircraftCategory, OfferPageItem
 
 
@@ -24,10 +17,11 @@ def sample_offer(
     hours: int | None = None,
     starts: int | None = None,
     page_content: str = "<some html content>",
+    category: AircraftCategory = AircraftCategory.glider,
 ) -> OfferPageItem:
     return OfferPageItem(
         url=url,
-        category=AircraftCategory.glider,
+        category=category,
         title=title,
         published_at=published_at,
         page_content=page_content,
@@ -73,32 +67,3 @@ def fake_response_from_file(
     )
     response.meta["aircraft_category"] = AircraftCategory.glider
     return response
-
-
-def create_offers_container_if_not_exists() -> ContainerProxy:
-    return lazy_database().create_container_if_not_exists(
-        id="offers",
-        partition_key=PartitionKey(path="/id"),
-        offer_throughput=ThroughputProperties(offer_throughput="600"),
-        indexing_policy=dict(
-            automatic=True,
-            indexingMode=IndexingMode.Consistent,
-            includedPaths=[
-                dict(path="/published_at/?"),
-                dict(path="/url/?"),
-                dict(path="/classified/?"),
-            ],
-            excludedPaths=[dict(path="/*")],
-            compositeIndexes=[
-                [
-                    dict(path="/category", order="ascending"),
-                    dict(path="/published_at", order="descending"),
-                ],
-                [
-                    dict(path="/manufacturer", order="ascending"),
-                    dict(path="/model", order="ascending"),
-                    dict(path="/published_at", order="descending"),
-                ],
-            ],
-        ),
-    )
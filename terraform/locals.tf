@@ -11,6 +11,7 @@ locals {
   container_app_job_name         = "update-offers-job"
   storage_account_name           = "aerooffers"
   offer_pages_container_name     = "offer-pages"
+  offers_archive_container_name  = "offers-archive"
 
   location = "Switzerland North"
 
@@ -233,6 +233,13 @@ resource "azurerm_storage_container" "offer_pages" {
   container_access_type = "private"
 }
 
+# Storage Container for offers removed from db by archive job
+resource "azurerm_storage_container" "offers_archive" {
+  name                  = local.offers_archive_container_name
+  storage_account_name  = azurerm_storage_account.main.name
+  container_access_type = "private"
+}
+
 # Storage Management Policy for offer pages (lifecycle: archive after 7 days)
 resource "azurerm_storage_management_policy" "main" {
   storage_account_id = azurerm_storage_account.main.id
@@ -250,6 +257,20 @@ resource "azurerm_storage_management_policy" "main" {
       }
     }
   }
+
+  rule {
+    name    = "archive-offers"
+    enabled = true
+    filters {
+      blob_types   = ["blockBlob"]
+      prefix_match = ["${local.offers_archive_container_name}/"]
+    }
+    actions {
+      base_blob {
+        tier_to_archive_after_days_since_modification_greater_than = 7
+      }
+    }
+  }
 }
 
 # Alerting
@@ -26,6 +26,6 @@ describe('ModelDetails', () => {
     await vi.waitFor(() => expect(axios.get).toHaveBeenCalled())
     await wrapper.vm.$nextTick()
 
-    expect(wrapper.text()).toContain('There were 3 offer(s). Median offer price is €45,000 , average €43,500.')
+    expect(wrapper.text()).toContain('There were 3 offer(s). Median offer price is €45,000 , ranging from €11,000 to €74,500.')
   })
 })